@@ -1,26 +1,102 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
 from prisma import Prisma
 
+from lib.metrics import InstrumentedPrisma
+
+load_dotenv(override=True)
+
+# Pool configuration (one Prisma client / query engine per worker)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds the engine waits for a free connection
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "5"))  # seconds a request waits for a slot
+
+
+def build_database_url(url: str, pool_size: int, pool_timeout: int) -> str:
+    """Add the query engine pool settings to the datasource URL, keeping any explicit values."""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.setdefault("connection_limit", str(pool_size))
+    query.setdefault("pool_timeout", str(pool_timeout))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
 
 class PrismaConnection:
-    
-    def __init__(self) -> None:
-        self.prisma = Prisma()
-        
-        
+
+    def __init__(self, pool_size: int = DB_POOL_SIZE, acquire_timeout: float = DB_ACQUIRE_TIMEOUT) -> None:
+        database_url = os.getenv("DATABASE_URL")
+        if database_url:
+            self.prisma = Prisma(
+                datasource={"url": build_database_url(database_url, pool_size, DB_POOL_TIMEOUT)}
+            )
+        else:
+            self.prisma = Prisma()
+        # Handed out to requests; times every query for /metrics
+        self.client = InstrumentedPrisma(self.prisma)
+        self.pool_size = pool_size
+        self.acquire_timeout = acquire_timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self.in_use = 0
+        self.waiting = 0
+        self.max_in_use = 0
+        self.acquired_total = 0
+        self.timeouts_total = 0
+        self.wait_seconds_total = 0.0
+
     async def connect(self) -> None:
-        await self.prisma.connect()
-        
+        if not self.prisma.is_connected():
+            await self.prisma.connect()
+
     async def disconnect(self) -> None:
-        await self.prisma.disconnect()
-        
+        if self.prisma.is_connected():
+            await self.prisma.disconnect()
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Hold one pool slot for the duration of the block, failing fast when the pool is saturated."""
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts_total += 1
+            raise HTTPException(status_code=503, detail="Database pool exhausted, try again later")
+        finally:
+            self.waiting -= 1
+            self.wait_seconds_total += time.perf_counter() - started
+
+        self.in_use += 1
+        self.acquired_total += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+        try:
+            yield self.client
+        finally:
+            self.in_use -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.prisma.is_connected(),
+            "pool_size": self.pool_size,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "max_in_use": self.max_in_use,
+            "saturation": self.in_use / self.pool_size if self.pool_size else 0.0,
+            "acquired_total": self.acquired_total,
+            "timeouts_total": self.timeouts_total,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+        }
+
 
 prisma_connection = PrismaConnection()
 db=prisma_connection.prisma
 
 async def get_db():
-    db = Prisma()
-    await db.connect()
-    try:
+    async with prisma_connection.acquire() as db:
         yield db
-    finally:
-        await db.disconnect()
\ No newline at end of file
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Optional
+
+import aioboto3
+from aiobotocore.config import AioConfig
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+load_dotenv(override=True)
+
+# AWS S3 Configuration
+AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_ID")
+AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_KEY")
+AWS_S3_BUCKET_NAME = os.getenv("AWS_BUCKET_NAME")
+AWS_S3_REGION_NAME = os.getenv("AWS_REGION")
+# Set to use an S3-compatible server (e.g. MinIO on http://localhost:9000) instead of AWS
+AWS_S3_ENDPOINT_URL = os.getenv("AWS_S3_ENDPOINT_URL") or None
+
+# Client configuration (one client / connection pool per worker)
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "20"))
+S3_KEEPALIVE_SECONDS = float(os.getenv("S3_KEEPALIVE_SECONDS", "60"))  # idle connections are kept this long
+S3_CONNECT_TIMEOUT = float(os.getenv("S3_CONNECT_TIMEOUT", "5"))
+S3_READ_TIMEOUT = float(os.getenv("S3_READ_TIMEOUT", "60"))
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", "5"))  # including the first try
+S3_RETRY_MODE = os.getenv("S3_RETRY_MODE", "adaptive")  # standard or adaptive (client-side rate limiting)
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "8"))
+S3_UPLOAD_ACQUIRE_TIMEOUT = float(os.getenv("S3_UPLOAD_ACQUIRE_TIMEOUT", "30"))  # seconds an upload waits for a slot
+
+
+class S3Connection:
+    """One long-lived S3 client per worker, opened in the app lifespan.
+
+    Keeps TLS connections and resolved credentials across requests instead
+    of building a session and client for every upload.
+    """
+
+    def __init__(self, upload_concurrency: int = S3_UPLOAD_CONCURRENCY) -> None:
+        self.session = aioboto3.Session(
+            aws_access_key_id=AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+            region_name=AWS_S3_REGION_NAME
+        )
+        self.config = AioConfig(
+            max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+            connect_timeout=S3_CONNECT_TIMEOUT,
+            read_timeout=S3_READ_TIMEOUT,
+            retries={"max_attempts": S3_MAX_ATTEMPTS, "mode": S3_RETRY_MODE},
+            tcp_keepalive=True,
+            connector_args={"keepalive_timeout": S3_KEEPALIVE_SECONDS},
+            # Local stand-ins such as MinIO only serve path-style URLs
+            s3={"addressing_style": "path"} if AWS_S3_ENDPOINT_URL else None,
+        )
+        self.upload_concurrency = upload_concurrency
+        self._uploads = asyncio.Semaphore(upload_concurrency)
+        self._stack: Optional[AsyncExitStack] = None
+        self._client: Any = None
+        self._start_lock = asyncio.Lock()
+        self.uploading = 0
+        self.waiting = 0
+        self.uploads_total = 0
+        self.bytes_total = 0
+        self.failures_total = 0
+        self.timeouts_total = 0
+        self.upload_seconds_total = 0.0
+
+    def is_started(self) -> bool:
+        return self._client is not None
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self._client is not None:
+                return
+            stack = AsyncExitStack()
+            self._client = await stack.enter_async_context(
+                self.session.client("s3", config=self.config, endpoint_url=AWS_S3_ENDPOINT_URL)
+            )
+            self._stack = stack
+
+    async def close(self) -> None:
+        async with self._start_lock:
+            if self._stack is not None:
+                await self._stack.aclose()
+            self._stack = None
+            self._client = None
+
+    async def client(self) -> Any:
+        """The shared client, opened on first use outside the app (scripts, benchmarks)."""
+        if self._client is None:
+            await self.start()
+        return self._client
+
+    @asynccontextmanager
+    async def upload_slot(self):
+        """Bound concurrent uploads so a burst cannot exhaust the connection pool or memory."""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._uploads.acquire(), timeout=S3_UPLOAD_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.timeouts_total += 1
+            raise HTTPException(status_code=503, detail="Too many uploads in progress, try again later")
+        finally:
+            self.waiting -= 1
+
+        started = time.perf_counter()
+        self.uploading += 1
+        try:
+            yield await self.client()
+            self.uploads_total += 1
+        except BaseException:
+            self.failures_total += 1
+            raise
+        finally:
+            self.uploading -= 1
+            self.upload_seconds_total += time.perf_counter() - started
+            self._uploads.release()
+
+    def object_url(self, key: str) -> str:
+        if AWS_S3_ENDPOINT_URL:
+            return f"{AWS_S3_ENDPOINT_URL.rstrip('/')}/{AWS_S3_BUCKET_NAME}/{key}"
+        return f"https://s3.{AWS_S3_REGION_NAME}.amazonaws.com/{AWS_S3_BUCKET_NAME}/{key}"
+
+    def stats(self) -> dict:
+        return {
+            "started": self.is_started(),
+            "endpoint_url": AWS_S3_ENDPOINT_URL,
+            "max_pool_connections": S3_MAX_POOL_CONNECTIONS,
+            "retry_mode": S3_RETRY_MODE,
+            "max_attempts": S3_MAX_ATTEMPTS,
+            "upload_concurrency": self.upload_concurrency,
+            "uploading": self.uploading,
+            "waiting": self.waiting,
+            "uploads_total": self.uploads_total,
+            "bytes_total": self.bytes_total,
+            "failures_total": self.failures_total,
+            "timeouts_total": self.timeouts_total,
+            "upload_seconds_total": round(self.upload_seconds_total, 6),
+        }
+
+
+s3_connection = S3Connection()
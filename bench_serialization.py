@@ -0,0 +1,106 @@
+"""Time JSON encoding of a page of gonpas: FastAPI's default path against lib.serialization.
+
+    python bench_serialization.py [count] [rounds]
+
+Builds ``count`` Prisma Gonpa objects with a contact and two translations
+each (no database needed) and reports the best time over ``rounds`` runs,
+scaled to 1,000 entities.
+"""
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from prisma.models import Gonpa
+
+from lib.serialization import dump_json
+from model.gonpa import GonpaResponse
+from model.pagination import Page
+
+
+def build_gonpas(count: int) -> List[Gonpa]:
+    now = datetime.now(timezone.utc)
+    contact = {
+        "id": "contact-1",
+        "email": "contact@example.com",
+        "phone_number": "+975 2 000000",
+        "createdAt": now,
+        "updatedAt": now,
+        "translations": [
+            {
+                "id": f"contact-1-{code}",
+                "contactId": "contact-1",
+                "languageCode": code,
+                "address": "Main street",
+                "city": "Thimphu",
+                "state": "Thimphu",
+                "postal_code": "11001",
+                "country": "Bhutan",
+            }
+            for code in ("en", "bo")
+        ],
+    }
+    return [
+        Gonpa.model_validate({
+            "id": f"gonpa-{i}",
+            "image": f"https://example.com/gonpa/{i}.jpg",
+            "imageVariants": {"thumb": f"https://example.com/gonpa/{i}-thumb.webp"},
+            "geo_location": "27.4728,89.6390",
+            "latitude": 27.4728,
+            "longitude": 89.639,
+            "sect": "NYINGMA",
+            "type": "MONASTERY",
+            "contactId": "contact-1",
+            "contact": contact,
+            "createdAt": now,
+            "updatedAt": now,
+            "translations": [
+                {
+                    "id": f"gonpa-{i}-{code}",
+                    "gonpaId": f"gonpa-{i}",
+                    "languageCode": code,
+                    "name": f"Gonpa {i}",
+                    "description": "A monastery in the hills above the valley. " * 8,
+                    "description_audio": f"https://example.com/gonpa/{i}-{code}.mp3",
+                }
+                for code in ("en", "bo")
+            ],
+        })
+        for i in range(count)
+    ]
+
+
+def best_time(encode: Callable[[], Any], rounds: int) -> float:
+    times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        encode()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    page = {"items": build_gonpas(count), "limit": count, "next_cursor": None, "total": None}
+    response_type = Page[GonpaResponse]
+
+    candidates = {
+        "jsonable_encoder + json.dumps": lambda: json.dumps(jsonable_encoder(page)).encode(),
+        "jsonable_encoder + orjson": lambda: orjson.dumps(jsonable_encoder(page)),
+        "dump_json (pydantic-core)": lambda: dump_json(response_type, page),
+    }
+    dump_json(response_type, page)  # build the adapter outside the timings
+
+    baseline = None
+    for name, encode in candidates.items():
+        per_thousand = best_time(encode, rounds) * 1000 / count * 1000
+        baseline = baseline or per_thousand
+        print(f"{name:32} {per_thousand:8.2f} ms / 1k entities  ({baseline / per_thousand:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
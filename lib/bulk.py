@@ -0,0 +1,312 @@
+import json
+import os
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Type, Union
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from prisma import Json, Prisma
+from pydantic import BaseModel, ValidationError
+
+from lib.geo import coordinates_data
+from lib.ids import new_id
+from lib.media import image_variants_by_url
+from lib.recurrence import recurrence_data
+from model.festival import FestivalCreate
+from model.gonpa import GonpaCreate
+from model.pilgrim import PilgrimSiteCreate
+from model.statue import StatueCreate
+
+load_dotenv(override=True)
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "1000"))
+# Most of a JSON array body, or of one NDJSON line, held in memory at once
+BULK_MAX_BUFFER_BYTES = int(os.getenv("BULK_MAX_BUFFER_MB", "64")) * 1024 * 1024
+
+
+class _Importer(NamedTuple):
+    model: Type[BaseModel]
+    delegate: str
+    translation_delegate: str
+    foreign_key: str
+    contact_required: Optional[bool]  # None when the kind has no contact
+    parent_data: Callable[[Any], Dict[str, Any]]
+
+
+IMPORTERS: Dict[str, _Importer] = {
+    "gonpa": _Importer(
+        GonpaCreate, "gonpa", "gonpatranslation", "gonpaId", True,
+        lambda r: {
+            "image": r.image,
+            "geo_location": r.geo_location,
+            **coordinates_data(r.geo_location),
+            "sect": r.sect,
+            "type": r.type,
+            "contactId": r.contactId,
+        },
+    ),
+    "festival": _Importer(
+        FestivalCreate, "festival", "festivaltranslation", "festivalId", None,
+        lambda r: recurrence_data({
+            "start_date": r.start_date,
+            "end_date": r.end_date,
+            "image": r.image,
+            "recurrence": r.recurrence,
+            **({"lunar_month": r.lunar_month, "lunar_day": r.lunar_day} if r.lunar_month is not None else {}),
+        }),
+    ),
+    "statue": _Importer(
+        StatueCreate, "statue", "statuetranslation", "statueId", None,
+        lambda r: {"image": r.image},
+    ),
+    "pilgrim": _Importer(
+        PilgrimSiteCreate, "pilgrimsite", "pilgrimsitetranslation", "pilgrimSiteId", False,
+        lambda r: {
+            "image": r.image,
+            "geo_location": r.geo_location,
+            **coordinates_data(r.geo_location),
+            "contactId": r.contactId,
+        },
+    ),
+}
+
+
+class MalformedRecord(ValueError):
+    """A line or element of the input that is not a JSON object."""
+
+
+RawRecord = Union[Dict[str, Any], MalformedRecord]
+
+
+def _buffer_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Body too large, the limit is {BULK_MAX_BUFFER_BYTES // (1024 * 1024)} MB for a JSON array "
+        "or one NDJSON line; send larger imports as NDJSON",
+    )
+
+
+async def read_request_records(request: Request) -> AsyncIterator[RawRecord]:
+    """Records of a request body: a JSON array, or NDJSON parsed line by line as it streams in.
+
+    A JSON array is held whole and an NDJSON line until it ends; either
+    growing past BULK_MAX_BUFFER_BYTES is refused with 413.
+    """
+    buffer = bytearray()
+    is_array: Optional[bool] = None
+    async for chunk in request.stream():
+        scan_from = len(buffer)
+        buffer += chunk
+        if len(buffer) > BULK_MAX_BUFFER_BYTES:
+            raise _buffer_too_large()
+        if is_array is None:
+            stripped = buffer.lstrip()
+            if not stripped:
+                buffer.clear()
+                continue
+            is_array = stripped.startswith(b"[")
+        if is_array:
+            continue
+        end = buffer.rfind(b"\n", scan_from)
+        if end < 0:
+            continue
+        for line in bytes(buffer[:end]).split(b"\n"):
+            if line.strip():
+                yield _parse_line(line)
+        del buffer[:end + 1]
+
+    if is_array:
+        try:
+            items = json.loads(buffer)
+        except ValueError as e:
+            yield MalformedRecord(f"Invalid JSON array: {e}")
+            return
+        for item in items:
+            yield item if isinstance(item, dict) else MalformedRecord("Expected a JSON object")
+    elif buffer.strip():
+        yield _parse_line(bytes(buffer))
+
+
+def read_ndjson_file(path: str) -> Iterable[RawRecord]:
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield _parse_line(line)
+
+
+def _parse_line(line: bytes) -> RawRecord:
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return MalformedRecord(f"Invalid JSON: {e}")
+    return record if isinstance(record, dict) else MalformedRecord("Expected a JSON object")
+
+
+async def _aiter(records: Union[Iterable[RawRecord], AsyncIterable[RawRecord]]) -> AsyncIterator[RawRecord]:
+    if hasattr(records, "__aiter__"):
+        async for record in records:
+            yield record
+    else:
+        for record in records:
+            yield record
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'record'}: {err['msg']}"
+        for err in error.errors(include_url=False)
+    )
+
+
+class BulkReport:
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def fail(self, index: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < BULK_MAX_ERRORS:
+            self.errors.append({"index": index, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+async def import_records(
+    db: Prisma,
+    kind: str,
+    records: Union[Iterable[RawRecord], AsyncIterable[RawRecord]],
+    batch_size: int = BULK_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """Validate and insert records in chunks, each chunk one transaction of two ``create_many`` calls.
+
+    A record that fails validation or references an unknown language or
+    contact is reported by its zero-based position in the input and skipped.
+    If a chunk's transaction fails anyway, its records are retried one by one
+    so only the offending ones are rejected.
+    """
+    importer = IMPORTERS[kind]
+    languages = {language.code for language in await db.language.find_many()}
+    report = BulkReport()
+    batch: List[Tuple[int, Any]] = []
+
+    async for raw in _aiter(records):
+        index = report.received
+        report.received += 1
+        if isinstance(raw, MalformedRecord):
+            report.fail(index, str(raw))
+            continue
+        try:
+            record = importer.model.model_validate(raw)
+        except ValidationError as e:
+            report.fail(index, _validation_message(e))
+            continue
+        error = _check_translations(record, languages)
+        if error:
+            report.fail(index, error)
+            continue
+        batch.append((index, record))
+        if len(batch) >= batch_size:
+            await _write_batch(db, importer, batch, report)
+            batch = []
+
+    if batch:
+        await _write_batch(db, importer, batch, report)
+    return report.as_dict()
+
+
+def _check_translations(record: Any, languages: Set[str]) -> Optional[str]:
+    if not record.translations:
+        return "translations: at least one translation is required"
+    codes = [t.languageCode for t in record.translations]
+    unknown = sorted(set(codes) - languages)
+    if unknown:
+        return f"translations: unknown language {', '.join(unknown)}"
+    if len(set(codes)) != len(codes):
+        return "translations: more than one translation for the same language"
+    return None
+
+
+async def _write_batch(db: Prisma, importer: _Importer, batch: List[Tuple[int, Any]], report: BulkReport) -> None:
+    if importer.contact_required is not None:
+        batch = await _check_contacts(db, importer, batch, report)
+    if not batch:
+        return
+
+    variants = await image_variants_by_url(db, [record.image for _, record in batch])
+    rows, prepared = [], []
+    for index, record in batch:
+        try:
+            rows.append(_rows(importer, record, variants))
+            prepared.append((index, record))
+        except HTTPException as e:
+            report.fail(index, e.detail)
+    batch = prepared
+    if not rows:
+        return
+    try:
+        await _insert(db, importer, rows)
+        report.imported += len(rows)
+        return
+    except Exception:
+        pass
+
+    for (index, _), row in zip(batch, rows):
+        try:
+            await _insert(db, importer, [row])
+            report.imported += 1
+        except Exception as e:
+            report.fail(index, str(e))
+
+
+async def _check_contacts(db: Prisma, importer: _Importer, batch: List[Tuple[int, Any]], report: BulkReport) -> List[Tuple[int, Any]]:
+    wanted = list({record.contactId for _, record in batch if record.contactId})
+    found = {contact.id for contact in await db.contact.find_many(where={"id": {"in": wanted}})} if wanted else set()
+    valid = []
+    for index, record in batch:
+        if record.contactId:
+            if record.contactId not in found:
+                report.fail(index, f"contactId: contact {record.contactId} not found")
+                continue
+        elif importer.contact_required:
+            report.fail(index, "contactId: a contact is required")
+            continue
+        valid.append((index, record))
+    return valid
+
+
+def _rows(importer: _Importer, record: Any, variants: Dict[str, Dict[str, str]]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    parent_id = new_id()
+    parent = {
+        "id": parent_id,
+        **importer.parent_data(record),
+        "imageVariants": Json(variants.get(record.image, {})),
+    }
+    translations = [
+        {
+            importer.foreign_key: parent_id,
+            "languageCode": t.languageCode,
+            "name": t.name,
+            "description": t.description,
+            "description_audio": t.description_audio,
+        }
+        for t in record.translations
+    ]
+    return parent, translations
+
+
+async def _insert(db: Prisma, importer: _Importer, rows: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> None:
+    async with db.batch_() as batcher:
+        getattr(batcher, importer.delegate).create_many(data=[parent for parent, _ in rows])
+        getattr(batcher, importer.translation_delegate).create_many(
+            data=[translation for _, translations in rows for translation in translations]
+        )
@@ -0,0 +1,120 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from prisma import Prisma
+
+from lib.pagination import keyset_chunks
+from lib.translation import project_translations, translations_include
+
+load_dotenv(override=True)
+
+BUNDLE_DIR = os.getenv("BUNDLE_DIR", os.path.join(tempfile.gettempdir(), "gompa-tour-bundles"))
+BUNDLE_CHUNK_SIZE = int(os.getenv("BUNDLE_CHUNK_SIZE", "500"))
+
+# Sections of the bundle: (key, Prisma delegate, embeds contact)
+SECTIONS = [
+    ("gonpas", "gonpa", True),
+    ("festivals", "festival", False),
+    ("statues", "statue", False),
+    ("pilgrim_sites", "pilgrimsite", True),
+    ("contacts", "contact", False),
+]
+
+_TABLES = ["Gonpa", "Festival", "Statue", "PilgrimSite", "Contact"]
+
+_build_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def catalog_version(db: Prisma) -> str:
+    """Short hash of row counts and newest updatedAt per table, read in one query.
+
+    Translation writes bump their parent's updatedAt, so this moves on any
+    catalog change.
+    """
+    columns = ", ".join(
+        f'(SELECT COUNT(*) FROM "{table}") AS "{table}_count", '
+        f'(SELECT MAX("updatedAt") FROM "{table}") AS "{table}_updated"'
+        for table in _TABLES
+    )
+    row = await db.query_first(f"SELECT {columns}")
+    parts = [f"{key}={row[key]}" for key in sorted(row)]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def bundle_path(language_key: str, version: str) -> str:
+    return os.path.join(BUNDLE_DIR, f"catalog-{language_key}-{version}.json.gz")
+
+
+async def get_bundle(db: Prisma, languages: List[str], version: str) -> str:
+    """Path of the bundle for this language chain and catalog version, building it at most once."""
+    language_key = "_".join(languages) or "all"
+    path = bundle_path(language_key, version)
+    if os.path.exists(path):
+        return path
+
+    lock = _build_locks.setdefault(language_key, asyncio.Lock())
+    async with lock:
+        if not os.path.exists(path):
+            await _build(db, languages, version, path)
+            await asyncio.to_thread(_remove_stale, language_key, path)
+    return path
+
+
+async def _build(db: Prisma, languages: List[str], version: str, path: str) -> None:
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=BUNDLE_DIR, suffix=".tmp")
+    os.close(fd)
+    out = await asyncio.to_thread(gzip.open, tmp_path, "wt", encoding="utf-8", compresslevel=9)
+    try:
+        header = {
+            "version": version,
+            "languages": languages,
+            "generatedAt": datetime.now(timezone.utc).isoformat(),
+        }
+        # Leave the object open; each section is appended as it is read
+        await asyncio.to_thread(out.write, json.dumps(header, ensure_ascii=False)[:-1])
+        for key, delegate_name, embeds_contact in SECTIONS:
+            await asyncio.to_thread(out.write, f', "{key}": [')
+            first = True
+            async for chunk in _chunks(getattr(db, delegate_name), languages, embeds_contact):
+                text = ", ".join(json.dumps(item, ensure_ascii=False) for item in chunk)
+                await asyncio.to_thread(out.write, text if first else ", " + text)
+                first = False
+            await asyncio.to_thread(out.write, "]")
+        await asyncio.to_thread(out.write, "}")
+    except BaseException:
+        out.close()
+        os.remove(tmp_path)
+        raise
+    await asyncio.to_thread(out.close)
+    os.replace(tmp_path, path)
+
+
+async def _chunks(delegate: Any, languages: List[str], embeds_contact: bool):
+    translations = translations_include(languages)
+    include: Dict[str, Any] = {"translations": translations}
+    if embeds_contact:
+        include["contact"] = {"include": {"translations": translations}}
+
+    async for rows in keyset_chunks(delegate.find_many, BUNDLE_CHUNK_SIZE, include=include):
+        yield [jsonable_encoder(project_translations(row, languages)) for row in rows]
+
+
+def _remove_stale(language_key: str, keep: str) -> None:
+    pattern = re.compile(rf"catalog-{re.escape(language_key)}-[0-9a-f]{{16}}\.json\.gz")
+    for name in os.listdir(BUNDLE_DIR):
+        path = os.path.join(BUNDLE_DIR, name)
+        if pattern.fullmatch(name) and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,172 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "tags")
+
+    def __init__(self, value: Any, expires_at: float, tags: Set[str]) -> None:
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class ResponseCache:
+    """Bounded LRU cache with a per-entry TTL and tag based invalidation.
+
+    Every entry is tagged with the entities it contains (``gonpa:<id>``) and,
+    for list pages, with the list tag of its kind (``gonpa:list``), so a write
+    only drops the entries that can actually have changed. The cache lives in
+    the worker process; the TTL bounds how stale other workers can be.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        # Bumped on every invalidation so a load that raced with a write is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry.value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()) -> None:
+        if self.max_entries <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+        entry = _Entry(value, time.monotonic() + self.ttl_seconds, set(tags))
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Callable[[Any], Iterable[str]],
+    ) -> Any:
+        """Read-through lookup; ``tags`` derives the entry's tags from the loaded value."""
+        hit, value = self.get(key)
+        if hit:
+            return value
+        return await self.load(key, loader, tags)
+
+    async def load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Callable[[Any], Iterable[str]],
+    ) -> Any:
+        """Run ``loader`` and store its value, unless a write invalidated the cache meanwhile."""
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self.set(key, value, tags(value))
+        return value
+
+    def invalidate(self, *tags: str) -> None:
+        self._generation += 1
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._tags.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache()
+
+
+def entity_tag(kind: str, entity_id: Optional[str]) -> str:
+    return f"{kind}:{entity_id}"
+
+
+def list_tag(kind: str) -> str:
+    return f"{kind}:list"
+
+
+def entity_tags(kind: str, entity: Any) -> Set[str]:
+    """Tags for one cached entity, including the contact it embeds."""
+    tags = {entity_tag(kind, entity.id)}
+    contact_id = getattr(entity, "contactId", None)
+    if contact_id:
+        tags.add(entity_tag("contact", contact_id))
+    return tags
+
+
+def page_tags(kind: str, page: Dict[str, Any]) -> Set[str]:
+    tags = {list_tag(kind)}
+    for entity in page["items"]:
+        tags |= entity_tags(kind, entity)
+    return tags
+
+
+def invalidate_entity(kind: str, entity_id: str, lists: bool = False) -> None:
+    """Drop the entity's detail entries and every cached list page that contains it.
+
+    ``lists`` also drops all list pages of the kind, for writes that can move
+    the entity into other pages or filters (create, delete, filtered fields).
+    """
+    tags = [entity_tag(kind, entity_id)]
+    if lists:
+        tags.append(list_tag(kind))
+    response_cache.invalidate(*tags)
@@ -0,0 +1,214 @@
+import asyncio
+import os
+import zlib
+from typing import Dict, Optional, Tuple
+
+import brotli
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+load_dotenv(override=True)
+
+# Bodies smaller than this are sent as they are; compressing them saves less than the headers cost
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip")
+
+# Compressing bodies above this size moves off the event loop
+_THREAD_SIZE = 256 * 1024
+
+_COMPRESSIBLE_TYPES = {"application/json", "application/x-ndjson", "application/javascript", "application/xml"}
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Content coding to use for an Accept-Encoding header, or None for identity."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type in _COMPRESSIBLE_TYPES
+        or media_type.endswith(("+json", "+xml"))
+    )
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+    return compressor.compress(data) + compressor.flush()
+
+
+async def compress_async(data: bytes, encoding: str) -> bytes:
+    if len(data) > _THREAD_SIZE:
+        return await asyncio.to_thread(compress, data, encoding)
+    return compress(data, encoding)
+
+
+def weak_etag(etag: str) -> str:
+    """A compressed body is a different representation, so a strong ETag no longer holds for its bytes."""
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+def add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if vary is None:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower() and vary.strip() != "*":
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressedBody:
+    """JSON bytes of a cached response, plus each compressed form once it has been asked for.
+
+    Lives in the response cache entry, so a hot list page is compressed once
+    per encoding rather than once per request.
+    """
+    __slots__ = ("body", "_encoded")
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self._encoded: Dict[str, bytes] = {}
+
+    async def encoded(self, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """(bytes, content coding) to send; identity when nothing is accepted or the body is small."""
+        if encoding is None or len(self.body) < COMPRESSION_MIN_SIZE:
+            return self.body, None
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = await compress_async(self.body, encoding)
+            self._encoded[encoding] = data
+        return data, encoding
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._gzip = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flushed per chunk so a streamed export reaches the client as it is produced
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._gzip.flush()
+
+
+class CompressionMiddleware:
+    """Brotli or gzip for text and JSON responses, as negotiated by Accept-Encoding.
+
+    Responses that already carry a Content-Encoding (the precompressed cache
+    entries served by `conditional_get`, the gzip bundle) pass through as they
+    are. Single-body responses below COMPRESSION_MIN_SIZE are left alone;
+    streamed ones are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        await _Responder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _Responder:
+    def __init__(self, app: ASGIApp, encoding: Optional[str], minimum_size: int) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[_StreamCompressor] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or not compressible(headers.get("content-type", ""))
+            if self.passthrough:
+                await self.send(message)
+            else:
+                # Held back until the first body shows whether it is worth compressing
+                self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            add_vary(headers)
+            if self.encoding is None or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            headers["Content-Encoding"] = self.encoding
+            if "etag" in headers:
+                headers["ETag"] = weak_etag(headers["etag"])
+            if not more_body:
+                body = await compress_async(body, self.encoding)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            self.compressor = _StreamCompressor(self.encoding)
+            await self.send(start)
+
+        data = self.compressor.chunk(body) if body else b""
+        if not more_body:
+            data += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+def encoded_headers(headers: Dict[str, str], encoding: Optional[str]) -> Dict[str, str]:
+    """Headers of a response sent with ``encoding`` (None for identity), varying on Accept-Encoding."""
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        etag = headers.pop("ETag", None) or headers.pop("etag", None)
+        if etag is not None:
+            headers["ETag"] = weak_etag(etag)
+    return headers
+
@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple, TypeVar
+
+from fastapi import Request, Response
+from prisma import Prisma
+
+from lib.cache import response_cache
+from lib.compression import CompressedBody, encoded_headers, negotiate
+from lib.serialization import dump_json
+
+# kind -> (table, translation table, translation foreign key, embeds contact)
+TABLES: Dict[str, Tuple[str, str, str, bool]] = {
+    "gonpa": ("Gonpa", "GonpaTranslation", "gonpaId", True),
+    "festival": ("Festival", "FestivalTranslation", "festivalId", False),
+    "pilgrim": ("PilgrimSite", "PilgrimSiteTranslation", "pilgrimSiteId", True),
+    "statue": ("Statue", "StatueTranslation", "statueId", False),
+    "contact": ("Contact", "ContactTranslation", "contactId", False),
+}
+
+# kind -> Prisma delegate name, and the Contact relation that points back at it
+DELEGATES = {
+    "gonpa": "gonpa",
+    "festival": "festival",
+    "pilgrim": "pilgrimsite",
+    "statue": "statue",
+    "contact": "contact",
+}
+CONTACT_RELATIONS = {"gonpa": "gonpas", "pilgrim": "pilgrim_sites"}
+
+T = TypeVar("T")
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime]
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _millis(value: Any) -> int:
+    value = _as_datetime(value)
+    return int(value.timestamp() * 1000) if value else 0
+
+
+def _latest(*values: Any) -> Optional[datetime]:
+    dates = [d for d in (_as_datetime(v) for v in values) if d is not None]
+    return max(dates) if dates else None
+
+
+def make_etag(parts: Iterable[Any], weak: bool = False) -> str:
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def _translation_set(translations: Optional[List[Any]]) -> str:
+    return ",".join(sorted(f"{t.id}:{t.languageCode}" for t in translations or []))
+
+
+def entity_validators(kind: str, entity: Any, languages: List[str]) -> Validators:
+    """Strong validators for a loaded entity, taken before its translations are projected."""
+    parts = [kind, entity.id, _millis(entity.updatedAt), _translation_set(entity.translations)]
+    contact = getattr(entity, "contact", None)
+    last_modified = entity.updatedAt
+    if TABLES[kind][3]:
+        if contact is not None:
+            parts += [contact.id, _millis(contact.updatedAt), _translation_set(contact.translations)]
+            last_modified = _latest(entity.updatedAt, contact.updatedAt)
+        else:
+            parts += ["", 0, ""]
+    parts.append(",".join(languages))
+    return Validators(make_etag(parts), _as_datetime(last_modified))
+
+
+async def fetch_entity_validators(db: Prisma, kind: str, entity_id: str, languages: List[str]) -> Optional[Validators]:
+    """Compute the same validators as `entity_validators` without loading any translation text."""
+    table, translation_table, foreign_key, embeds_contact = TABLES[kind]
+    language_filter = ""
+    if languages:
+        placeholders = ", ".join(f"${i}" for i in range(2, len(languages) + 2))
+        language_filter = f'AND t."languageCode" IN ({placeholders})'
+
+    contact_columns = ""
+    contact_join = ""
+    if embeds_contact:
+        contact_columns = f"""
+            , c."id" AS "contactId", c."updatedAt" AS "contactUpdatedAt",
+            (SELECT COALESCE(string_agg(t."id" || ':' || t."languageCode", ',' ORDER BY t."id" || ':' || t."languageCode" COLLATE "C"), '')
+               FROM "ContactTranslation" t WHERE t."contactId" = c."id" {language_filter}) AS "contactTranslations"
+        """
+        contact_join = 'LEFT JOIN "Contact" c ON c."id" = p."contactId"'
+
+    row = await db.query_first(
+        f"""
+        SELECT p."updatedAt" AS "updatedAt",
+            (SELECT COALESCE(string_agg(t."id" || ':' || t."languageCode", ',' ORDER BY t."id" || ':' || t."languageCode" COLLATE "C"), '')
+               FROM "{translation_table}" t WHERE t."{foreign_key}" = p."id" {language_filter}) AS "translations"
+            {contact_columns}
+        FROM "{table}" p {contact_join}
+        WHERE p."id" = $1
+        """,
+        entity_id,
+        *languages,
+    )
+    if not row:
+        return None
+
+    parts = [kind, entity_id, _millis(row["updatedAt"]), row["translations"]]
+    last_modified = row["updatedAt"]
+    if embeds_contact:
+        if row["contactId"]:
+            parts += [row["contactId"], _millis(row["contactUpdatedAt"]), row["contactTranslations"]]
+            last_modified = _latest(row["updatedAt"], row["contactUpdatedAt"])
+        else:
+            parts += ["", 0, ""]
+    parts.append(",".join(languages))
+    return Validators(make_etag(parts), _as_datetime(last_modified))
+
+
+async def fetch_list_validators(db: Prisma, kind: str, where: Dict[str, Any], key: Hashable) -> Validators:
+    """Weak validators for a list: row count and newest updatedAt of the filtered set (and its contacts).
+
+    The newest deletion of the kind counts too, so Last-Modified moves
+    forward when a row leaves the list, not only when one changes.
+    """
+    delegate = getattr(db, DELEGATES[kind])
+    queries = [
+        delegate.count(where=where),
+        delegate.find_first(where=where, order={"updatedAt": "desc"}),
+        db.tombstone.find_first(where={"entityType": kind}, order={"deletedAt": "desc"}),
+    ]
+    relation = CONTACT_RELATIONS.get(kind)
+    if relation:
+        queries.append(
+            db.contact.find_first(where={relation: {"some": where}}, order={"updatedAt": "desc"})
+        )
+    count, latest, deletion, *contact = await asyncio.gather(*queries)
+
+    latest_contact = contact[0] if contact else None
+    entity_updated = latest.updatedAt if latest else None
+    contact_updated = latest_contact.updatedAt if latest_contact else None
+    deleted = deletion.deletedAt if deletion else None
+    parts = [kind, count, _millis(entity_updated), _millis(contact_updated), _millis(deleted), repr(key)]
+    return Validators(make_etag(parts, weak=True), _latest(entity_updated, contact_updated, deleted))
+
+
+def fetch_once(fetch: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[T]]:
+    """Share one call of ``fetch``, so the validators a conditional miss fetched are reused by ``load``."""
+    result: Optional["asyncio.Future[T]"] = None
+
+    async def shared() -> T:
+        nonlocal result
+        if result is None:
+            result = asyncio.ensure_future(fetch())
+        return await result
+
+    return shared
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def not_modified(request: Request, validators: Validators) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match uses the weak comparison and takes precedence over If-Modified-Since
+        current = validators.etag.removeprefix("W/")
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or current in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validators.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return validators.last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified_response(validators: Validators) -> Response:
+    # A 304 carries the Vary the full response would have
+    return Response(status_code=304, headers={**validators.headers(), "Vary": "Accept-Encoding"})
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    key: Hashable,
+    load: Callable[[], Awaitable[Tuple[Any, Validators]]],
+    tags: Callable[[Any], Iterable[str]],
+    fetch_validators: Callable[[], Awaitable[Optional[Validators]]],
+    response_type: Any,
+) -> Response:
+    """Serve a cached GET with ETag/Last-Modified, answering 304 when the client copy is current.
+
+    ``load`` returns ``(body, validators)``; ``tags`` receives the body. On a
+    cache miss a conditional request is checked with ``fetch_validators``, a
+    metadata-only query, before anything heavy is loaded. The body is
+    serialized once as ``response_type`` and the cache keeps the JSON bytes
+    along with their gzip/brotli forms, so a hit does no encoding or
+    compression at all.
+    """
+    async def load_json():
+        body, validators = await load()
+        return (CompressedBody(dump_json(response_type, body)), set(tags(body))), validators
+
+    entry_tags = lambda entry: entry[0][1]
+
+    if not is_conditional(request):
+        (content, _), validators = await response_cache.get_or_load(key, load_json, entry_tags)
+    else:
+        hit, entry = response_cache.get(key)
+        if hit:
+            (content, _), validators = entry
+        else:
+            current = await fetch_validators()
+            if current is not None and not_modified(request, current):
+                return not_modified_response(current)
+            (content, _), validators = await response_cache.load(key, load_json, entry_tags)
+        if not_modified(request, validators):
+            return not_modified_response(validators)
+
+    data, encoding = await content.encoded(negotiate(request.headers.get("accept-encoding", "")))
+    # Returning a Response skips FastAPI's own encoding; copy any headers the route set
+    headers = encoded_headers({**response.headers, **validators.headers()}, encoding)
+    return Response(content=data, media_type="application/json", headers=headers)
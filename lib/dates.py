@@ -0,0 +1,56 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+# Calendar listings order by when things happen; id keeps the order total for cursors
+START_ORDER = [{"start_date": "asc"}, {"id": "asc"}]
+
+
+def parse_day(value: str, name: str) -> datetime:
+    """Start (UTC midnight) of the day given as YYYY-MM-DD or an ISO timestamp."""
+    try:
+        if len(value) == 10:
+            day = date.fromisoformat(value)
+        else:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc)
+            day = parsed.date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a date (YYYY-MM-DD)")
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def today() -> datetime:
+    return datetime.combine(datetime.now(timezone.utc).date(), time.min, tzinfo=timezone.utc)
+
+
+def day_window(on: Optional[str], from_: Optional[str], to: Optional[str]) -> Optional[Tuple[Optional[datetime], Optional[datetime]]]:
+    """[start, end) of the requested days: ``on`` one day, ``from``/``to`` an inclusive range (either side open)."""
+    if on is not None:
+        if from_ is not None or to is not None:
+            raise HTTPException(status_code=400, detail="Use either on or from/to, not both")
+        start = parse_day(on, "on")
+        return start, start + timedelta(days=1)
+    if from_ is None and to is None:
+        return None
+    start = parse_day(from_, "from") if from_ is not None else None
+    end = parse_day(to, "to") + timedelta(days=1) if to is not None else None
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="to must not be before from")
+    return start, end
+
+
+def overlap_where(start: Optional[datetime], end: Optional[datetime]) -> Dict[str, Any]:
+    """Prisma filter for date ranges that share at least one day with [start, end).
+
+    A festival overlaps when it starts before the window ends and ends on or
+    after the day the window starts, so ones spanning either edge are kept.
+    """
+    conditions: List[Dict[str, Any]] = []
+    if end is not None:
+        conditions.append({"start_date": {"lt": end}})
+    if start is not None:
+        conditions.append({"end_date": {"gte": start}})
+    return {"AND": conditions} if conditions else {}
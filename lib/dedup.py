@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+from typing import Any, Dict, Optional
+
+from prisma import Prisma
+from prisma.errors import UniqueViolationError
+
+from Config.s3 import AWS_S3_BUCKET_NAME, s3_connection
+from lib.stream_upload import MIB
+
+HASH_CHUNK_SIZE = MIB
+
+
+async def hash_object(key: str) -> str:
+    """SHA-256 of an object already in the bucket, read back in chunks."""
+    digest = hashlib.sha256()
+    client = await s3_connection.client()
+    response = await client.get_object(Bucket=AWS_S3_BUCKET_NAME, Key=key)
+    async with response["Body"] as body:
+        while chunk := await body.read(HASH_CHUNK_SIZE):
+            await asyncio.to_thread(digest.update, chunk)
+    return digest.hexdigest()
+
+
+async def find_existing(db: Prisma, sha256: str) -> Optional[str]:
+    """URL of an already stored object with this content, counting the upload it saves."""
+    stored = await db.storedobject.update(where={"sha256": sha256}, data={"uploads": {"increment": 1}})
+    return stored.url if stored else None
+
+
+async def record_object(db: Prisma, sha256: str, key: str, content_type: str, size: int) -> str:
+    """Index a freshly written object by its hash; returns the URL to hand out.
+
+    When an identical upload finished first, the object just written is
+    removed and the earlier one is returned instead.
+    """
+    url = s3_connection.object_url(key)
+    try:
+        await db.storedobject.create(
+            data={"sha256": sha256, "key": key, "url": url, "contentType": content_type, "size": size}
+        )
+        return url
+    except UniqueViolationError:
+        existing = await find_existing(db, sha256)
+        if existing is None:
+            return url
+        client = await s3_connection.client()
+        await client.delete_object(Bucket=AWS_S3_BUCKET_NAME, Key=key)
+        return existing
+
+
+async def dedup_report(db: Prisma) -> Dict[str, Any]:
+    row = await db.query_first(
+        """
+        SELECT
+            COUNT(*) AS "objects",
+            COALESCE(SUM("uploads"), 0) AS "uploads",
+            COALESCE(SUM("size"::bigint), 0) AS "bytes_stored",
+            COALESCE(SUM("size"::bigint * ("uploads" - 1)), 0) AS "bytes_saved"
+        FROM "StoredObject"
+        """
+    )
+    objects, uploads = int(row["objects"]), int(row["uploads"])
+    bytes_stored, bytes_saved = int(row["bytes_stored"]), int(row["bytes_saved"])
+    return {
+        "objects": objects,
+        "uploads": uploads,
+        "duplicate_uploads": uploads - objects,
+        "bytes_stored": bytes_stored,
+        "bytes_saved": bytes_saved,
+        "saved_ratio": round(bytes_saved / (bytes_stored + bytes_saved), 4) if bytes_stored + bytes_saved else 0.0,
+    }
@@ -0,0 +1,34 @@
+from typing import Any
+
+from lib.cache import invalidate_entity, list_tag, response_cache
+from lib.search import search_index
+
+# Write handlers report what they changed here once the database write has
+# succeeded; this keeps the response cache and the search index in step.
+
+
+def entity_saved(kind: str, entity: Any, lists: bool = False) -> None:
+    """An entity was created or updated; ``entity`` should carry its translations."""
+    invalidate_entity(kind, entity.id, lists=lists)
+    search_index.index_entity(kind, entity.id, getattr(entity, "translations", None))
+
+
+def entity_deleted(kind: str, entity_id: str) -> None:
+    invalidate_entity(kind, entity_id, lists=True)
+    search_index.remove_entity(kind, entity_id)
+
+
+def translation_saved(kind: str, entity_id: str, translation: Any) -> None:
+    invalidate_entity(kind, entity_id)
+    search_index.index_translation(kind, entity_id, translation)
+
+
+def translation_deleted(kind: str, entity_id: str, language_code: str) -> None:
+    invalidate_entity(kind, entity_id)
+    search_index.remove_translation(kind, entity_id, language_code)
+
+
+def entities_imported(kind: str) -> None:
+    """A bulk import added entities of this kind; cheaper to rebuild the search index than patch it."""
+    response_cache.invalidate(list_tag(kind))
+    search_index.invalidate()
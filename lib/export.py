@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from Config.connection import prisma_connection
+from lib.pagination import keyset_chunks
+from lib.translation import pick_translation, project_translations, translations_include
+
+load_dotenv(override=True)
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "500"))
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# kind -> (Prisma delegate, entity columns written to CSV)
+EXPORTS: Dict[str, Any] = {
+    "gonpa": ("gonpa", ["id", "image", "geo_location", "latitude", "longitude", "sect", "type", "contactId", "createdAt", "updatedAt"]),
+    "festival": ("festival", ["id", "start_date", "end_date", "recurrence", "lunar_month", "lunar_day", "image", "createdAt", "updatedAt"]),
+    "statue": ("statue", ["id", "image", "createdAt", "updatedAt"]),
+    "pilgrim": ("pilgrimsite", ["id", "image", "geo_location", "latitude", "longitude", "contactId", "createdAt", "updatedAt"]),
+}
+TRANSLATION_COLUMNS = ["languageCode", "name", "description", "description_audio"]
+
+
+async def _find_many(delegate_name: str, **query: Any) -> List[Any]:
+    # Hold a pool slot per chunk only, so a slow reader does not pin one for the whole export
+    async with prisma_connection.acquire() as db:
+        return await getattr(db, delegate_name).find_many(**query)
+
+
+async def _chunks(kind: str, languages: List[str]) -> AsyncIterator[List[Any]]:
+    delegate_name, _ = EXPORTS[kind]
+    find_many = lambda **query: _find_many(delegate_name, **query)
+    include = {"translations": translations_include(languages)}
+    async for rows in keyset_chunks(find_many, EXPORT_CHUNK_SIZE, include=include):
+        yield rows
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+
+async def ndjson_lines(kind: str, languages: List[str]) -> AsyncIterator[bytes]:
+    async for rows in _chunks(kind, languages):
+        lines = [
+            json.dumps(jsonable_encoder(project_translations(row, languages)), ensure_ascii=False)
+            for row in rows
+        ]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def csv_lines(kind: str, languages: List[str]) -> AsyncIterator[bytes]:
+    """One CSV row per translation, the entity columns repeated on each."""
+    _, columns = EXPORTS[kind]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns + TRANSLATION_COLUMNS)
+    async for rows in _chunks(kind, languages):
+        for row in rows:
+            entity = [_csv_value(getattr(row, column)) for column in columns]
+            translations = pick_translation(row.translations, languages) or []
+            if not translations:
+                writer.writerow(entity + [""] * len(TRANSLATION_COLUMNS))
+            for translation in translations:
+                writer.writerow(entity + [_csv_value(getattr(translation, column)) for column in TRANSLATION_COLUMNS])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_response(kind: str, export_format: str, languages: List[str]) -> StreamingResponse:
+    """Stream a whole collection, EXPORT_CHUNK_SIZE rows at a time, as NDJSON or CSV."""
+    lines = csv_lines if export_format == "csv" else ndjson_lines
+    return StreamingResponse(
+        lines(kind, languages),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{kind}-export.{export_format}"'},
+    )
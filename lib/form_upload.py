@@ -0,0 +1,141 @@
+import hashlib
+import tempfile
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart before 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from lib.stream_upload import MIB, S3_MAX_UPLOAD_BYTES, check_declared_size, too_large
+
+# Kept in memory up to this size, then on disk (as Starlette does for UploadFile)
+SPOOL_MAX_SIZE = MIB
+
+
+class SpooledUpload:
+    """A file field of a multipart form, spooled to a temporary file and hashed as it arrived."""
+
+    def __init__(self) -> None:
+        self.file: Any = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self.filename = ""
+        self.content_type = "application/octet-stream"
+        self.size = 0
+        self.sha256 = ""
+        self._digest = hashlib.sha256()
+
+    @property
+    def in_memory(self) -> bool:
+        return not getattr(self.file, "_rolled", True)
+
+    async def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > S3_MAX_UPLOAD_BYTES:
+            raise too_large()
+        self._digest.update(data)
+        if self.in_memory:
+            self.file.write(data)
+        else:
+            await run_in_threadpool(self.file.write, data)
+
+    async def read(self) -> bytes:
+        """The whole file, from the start."""
+        self.file.seek(0)
+        if self.in_memory:
+            return self.file.read()
+        return await run_in_threadpool(self.file.read)
+
+    def finish(self) -> None:
+        self.sha256 = self._digest.hexdigest()
+        self.file.seek(0)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _FormParser:
+    """Collects the parser's callbacks; the writes they ask for are awaited between body chunks."""
+
+    def __init__(self, field: str) -> None:
+        self.field = field.encode()
+        self.upload = SpooledUpload()
+        self.found = False
+        self.pending: List[bytes] = []
+        self._headers: List[Tuple[bytes, bytes]] = []
+        self._header_field = b""
+        self._header_value = b""
+        self._target = False
+
+    def on_part_begin(self) -> None:
+        self._headers = []
+        self._target = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers.append((self._header_field.lower(), self._header_value))
+        self._header_field = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        headers = dict(self._headers)
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        if options.get(b"name") != self.field or b"filename" not in options or self.found:
+            return
+        self._target = self.found = True
+        self.upload.filename = options[b"filename"].decode("utf-8", "replace")
+        content_type = headers.get(b"content-type")
+        if content_type:
+            self.upload.content_type = content_type.decode("latin-1").strip()
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._target:
+            self.pending.append(data[start:end])
+
+
+async def receive_form_file(request: Request, field: str = "file") -> SpooledUpload:
+    """Read a multipart/form-data body, keeping the file in ``field``.
+
+    The file is hashed while it is spooled, so it is not read again to
+    find its SHA-256, and one over S3_MAX_UPLOAD_BYTES is refused as soon
+    as it passes the limit. The caller closes the returned upload.
+    """
+    check_declared_size(request.headers.get("content-length"))
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary: Optional[bytes] = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    form = _FormParser(field)
+    callbacks = {
+        name: getattr(form, name)
+        for name in (
+            "on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+            "on_headers_finished", "on_part_data",
+        )
+    }
+    parser = MultipartParser(boundary, callbacks)
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for data in form.pending:
+                await form.upload.write(data)
+            form.pending.clear()
+        parser.finalize()
+    except ValueError:  # the parser's MultipartParseError
+        form.upload.close()
+        raise HTTPException(status_code=400, detail="Malformed multipart body")
+    except BaseException:
+        form.upload.close()
+        raise
+    if not form.found:
+        form.upload.close()
+        raise HTTPException(status_code=400, detail=f"The form has no file in the {field!r} field")
+    form.upload.finish()
+    return form.upload
@@ -0,0 +1,79 @@
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+_NUMBER = r"(-?\d{1,3}(?:\.\d+)?)"
+# Tried in order: Google "!3d<lat>!4d<lon>" place data, "@<lat>,<lon>" map centre, then any "<lat>,<lon>" pair
+_PATTERNS = [
+    re.compile(rf"!3d{_NUMBER}!4d{_NUMBER}"),
+    re.compile(rf"@{_NUMBER},\s*{_NUMBER}"),
+    re.compile(rf"{_NUMBER}\s*,\s*{_NUMBER}"),
+]
+
+
+def parse_geo_location(geo_location: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Extract (latitude, longitude) from a map URL or a "lat,lon" string."""
+    if not geo_location:
+        return None
+    for pattern in _PATTERNS:
+        for match in pattern.finditer(geo_location):
+            latitude, longitude = float(match.group(1)), float(match.group(2))
+            if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+                return latitude, longitude
+    return None
+
+
+def coordinates_data(geo_location: Optional[str]) -> Dict[str, Optional[float]]:
+    """Prisma data for the numeric coordinate columns; unparseable locations clear them."""
+    coordinates = parse_geo_location(geo_location)
+    if coordinates is None:
+        return {"latitude": None, "longitude": None}
+    return {"latitude": coordinates[0], "longitude": coordinates[1]}
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box_where(latitude: float, longitude: float, radius_km: float) -> Dict[str, Any]:
+    """Prisma filter for the lat/lon box enclosing the search circle, so the (latitude, longitude) index does the pruning."""
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - d_lat, latitude + d_lat
+    where: Dict[str, Any] = {"latitude": {"gte": max(min_lat, -90.0), "lte": min(max_lat, 90.0)}}
+
+    # Near the poles the box covers every longitude
+    if min_lat <= -90 or max_lat >= 90:
+        where["longitude"] = {"not": None}
+        return where
+
+    d_lon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(latitude))))
+    if d_lon >= 180:
+        where["longitude"] = {"not": None}
+        return where
+
+    min_lon, max_lon = longitude - d_lon, longitude + d_lon
+    if min_lon < -180:
+        where["OR"] = [{"longitude": {"gte": min_lon + 360}}, {"longitude": {"lte": max_lon}}]
+    elif max_lon > 180:
+        where["OR"] = [{"longitude": {"gte": min_lon}}, {"longitude": {"lte": max_lon - 360}}]
+    else:
+        where["longitude"] = {"gte": min_lon, "lte": max_lon}
+    return where
+
+
+async def nearest(delegate: Any, latitude: float, longitude: float, radius_km: float, k: int) -> List[Tuple[float, str]]:
+    """(distance_km, id) of the k closest rows within radius_km, closest first."""
+    candidates = await delegate.find_many(where=bounding_box_where(latitude, longitude, radius_km))
+    ranked = []
+    for row in candidates:
+        distance = haversine_km(latitude, longitude, row.latitude, row.longitude)
+        if distance <= radius_km:
+            ranked.append((distance, row.id))
+    ranked.sort()
+    return ranked[:k]
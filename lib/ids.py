@@ -0,0 +1,41 @@
+import os
+import secrets
+import socket
+import threading
+import time
+
+_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+_BLOCK = 36 ** 4
+
+
+def _base36(number: int, width: int = 0) -> str:
+    digits = ""
+    while number:
+        number, digit = divmod(number, 36)
+        digits = _ALPHABET[digit] + digits
+    return (digits or "0").rjust(width, "0")[-width:] if width else digits or "0"
+
+
+_fingerprint = _base36((os.getpid() * 31 + sum(socket.gethostname().encode())) % _BLOCK, 4)
+_counter = secrets.randbelow(_BLOCK)
+_counter_lock = threading.Lock()
+
+
+def new_id() -> str:
+    """A 25 character, cuid-like id: 'c' + time + counter + host fingerprint + random.
+
+    Same shape as the ids Prisma's ``@default(cuid())`` produces, so rows
+    written with ``create_many`` can be given their ids (and their children
+    linked) before the insert.
+    """
+    global _counter
+    with _counter_lock:
+        _counter = (_counter + 1) % _BLOCK
+        count = _counter
+    return (
+        "c"
+        + _base36(int(time.time() * 1000), 8)
+        + _base36(count, 4)
+        + _fingerprint
+        + _base36(secrets.randbelow(_BLOCK * _BLOCK), 8)
+    )
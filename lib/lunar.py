@@ -0,0 +1,168 @@
+"""Tibetan (Phugpa) lunar calendar, after S. Janson, "Tibetan Calendar Mathematics".
+
+Every lunar day is located by the exact rational formula for the moment its
+tithi ends; the calendar day it ends on carries its number. The whole span
+of years is computed once (integer arithmetic, a fraction of a second) and
+kept in memory, so conversions in both directions are table lookups.
+"""
+import bisect
+import os
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+LUNAR_FIRST_YEAR = int(os.getenv("LUNAR_FIRST_YEAR", "1900"))
+LUNAR_LAST_YEAR = int(os.getenv("LUNAR_LAST_YEAR", "2200"))
+
+# Epoch E806 (Phugpa): month count M* = 12 (Y - 806) + M - 3; the intercalation
+# index ix = (67 M* + BETA) mod 65 makes M a doubled month when ix is 48 or 49,
+# the leap month coming first. BETA is fixed by the observed Losar and Saga
+# Dawa dates from 2010 on.
+_EPOCH_YEAR = 806
+_EPOCH_MONTH = 3
+_BETA = 59
+_LEAP_INDEXES = (48, 49)
+
+# True date of lunar day d in true month n, in days from the Julian Day epoch:
+#   mean date  m0 + m1 n + m2 d,  m0 = 2015501 + 4783/5656, m1 = 167025/5656, m2 = m1/30
+#   mean sun   s0 + s1 n + s2 d,  s0 = 743/804, s1 = 65/804, s2 = 13/4824
+#   anomaly    a0 + a1 n + a2 d,  a0 = 475/3528, a1 = 253/3528, a2 = 1/28
+#   true date = mean date + moon_tab(28 anomaly)/60 - sun_tab(12 (mean sun - 1/4))/60
+# All terms are kept as integers over the common denominator _SCALE.
+_SCALE = 102317040  # lcm(169680, 7560, 24120)
+_MEAN_UNIT = _SCALE // 169680
+_MOON_UNIT = _SCALE // 7560
+_SUN_UNIT = _SCALE // 24120
+
+_MOON_QUARTER = [0, 5, 10, 15, 19, 22, 24, 25]
+_SUN_QUARTER = [0, 6, 10, 11]
+_MOON_TAB = [
+    _MOON_QUARTER[i] if i <= 7 else _MOON_QUARTER[14 - i] if i <= 14 else
+    -_MOON_QUARTER[i - 14] if i <= 21 else -_MOON_QUARTER[28 - i]
+    for i in range(29)
+]
+_SUN_TAB = [
+    _SUN_QUARTER[i] if i <= 3 else _SUN_QUARTER[6 - i] if i <= 6 else
+    -_SUN_QUARTER[i - 6] if i <= 9 else -_SUN_QUARTER[12 - i]
+    for i in range(13)
+]
+
+_JD_OFFSET = 1721425  # Julian Day Number of date.fromordinal(0)
+
+
+class LunarDate(NamedTuple):
+    year: int  # Gregorian year in which this Tibetan year starts
+    month: int
+    day: int
+    leap_month: bool = False
+    leap_day: bool = False  # first of a doubled day
+
+
+class LunarMonth(NamedTuple):
+    year: int
+    month: int
+    leap: bool
+    day_ends: Tuple[int, ...]  # Julian day on which each lunar day 0..30 ends; 0 is the previous month's 30
+
+
+def day_end(day: int, true_month: int) -> int:
+    """Julian Day Number of the calendar day on which lunar day ``day`` of true month ``true_month`` ends."""
+    mean = (2015501 * 169680 + 4783 * 30) + 167025 * 30 * true_month + 167025 * day
+    index, fraction = divmod((475 + 253 * true_month + 126 * day) % 3528, 126)
+    moon = _MOON_TAB[index] * 126 + (_MOON_TAB[index + 1] - _MOON_TAB[index]) * fraction
+    index, fraction = divmod((3252 + 390 * true_month + 13 * day) % 4824, 402)
+    sun = _SUN_TAB[index] * 402 + (_SUN_TAB[index + 1] - _SUN_TAB[index]) * fraction
+    return (mean * _MEAN_UNIT + moon * _MOON_UNIT - sun * _SUN_UNIT) // _SCALE
+
+
+def _true_months(year: int, month: int) -> List[Tuple[bool, int]]:
+    """(leap, true month count) of the month(s) named ``month`` in ``year``, in calendar order."""
+    count = 12 * (year - _EPOCH_YEAR) + month - _EPOCH_MONTH
+    index = 67 * count + _BETA
+    true_month = (index + 17) // 65
+    if index % 65 in _LEAP_INDEXES:
+        return [(True, true_month - 1), (False, true_month)]
+    return [(False, true_month)]
+
+
+class _Table(NamedTuple):
+    months: List[LunarMonth]
+    starts: List[int]  # first Julian day of each month, for bisecting
+    index: Dict[Tuple[int, int, bool], int]
+
+
+@lru_cache(maxsize=1)
+def lunar_table() -> _Table:
+    """Every month from LUNAR_FIRST_YEAR to LUNAR_LAST_YEAR, built once per process."""
+    months: List[LunarMonth] = []
+    for year in range(LUNAR_FIRST_YEAR, LUNAR_LAST_YEAR + 1):
+        for month in range(1, 13):
+            for leap, true_month in _true_months(year, month):
+                day_ends = (day_end(30, true_month - 1),) + tuple(day_end(day, true_month) for day in range(1, 31))
+                months.append(LunarMonth(year, month, leap, day_ends))
+    starts = [month.day_ends[0] + 1 for month in months]
+    index = {(month.year, month.month, month.leap): position for position, month in enumerate(months)}
+    return _Table(months, starts, index)
+
+
+def to_julian_day(day: date) -> int:
+    return day.toordinal() + _JD_OFFSET
+
+
+def from_julian_day(julian_day: int) -> date:
+    return date.fromordinal(julian_day - _JD_OFFSET)
+
+
+def lunar_month(year: int, month: int, leap: bool = False) -> Optional[LunarMonth]:
+    table = lunar_table()
+    position = table.index.get((year, month, leap))
+    return table.months[position] if position is not None else None
+
+
+def from_gregorian(day: date) -> Optional[LunarDate]:
+    """Tibetan date of a Gregorian day; None outside the table."""
+    table = lunar_table()
+    julian_day = to_julian_day(day)
+    position = bisect.bisect_right(table.starts, julian_day) - 1
+    if position < 0 or julian_day > table.months[-1].day_ends[30]:
+        return None
+    month = table.months[position]
+    # The day is named after the first lunar day that ends on or after it
+    lunar_day = bisect.bisect_left(month.day_ends, julian_day, 1)
+    return LunarDate(month.year, month.month, lunar_day, month.leap, month.day_ends[lunar_day] > julian_day)
+
+
+def to_gregorian(year: int, month: int, day: int, leap_month: bool = False, leap_day: bool = False) -> Optional[date]:
+    """Gregorian day of a Tibetan date; None when the month is not in the table or the day is omitted."""
+    found = lunar_month(year, month, leap_month)
+    if found is None or not 1 <= day <= 30:
+        return None
+    end, previous = found.day_ends[day], found.day_ends[day - 1]
+    if end == previous:
+        return None
+    if leap_day:
+        return from_julian_day(end - 1) if end - previous == 2 else None
+    return from_julian_day(end)
+
+
+def observed_date(year: int, month: int, day: int) -> Optional[date]:
+    """Day on which a yearly observance of (month, day) falls in ``year``.
+
+    Always the regular (second) month of a doubled month. An omitted day is
+    observed on the calendar day its lunar day ends on (the one named after the
+    previous day); of a doubled day, the regular (second) one.
+    """
+    found = lunar_month(year, month)
+    if found is None or not 1 <= day <= 30:
+        return None
+    return from_julian_day(found.day_ends[day])
+
+
+def losar(year: int) -> Optional[date]:
+    """Tibetan New Year: first day of the year's first month (the leap one when it is doubled)."""
+    found = lunar_month(year, 1, True) or lunar_month(year, 1)
+    return from_julian_day(found.day_ends[0] + 1) if found else None
@@ -0,0 +1,207 @@
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from PIL import Image, UnidentifiedImageError
+from prisma import Json, Prisma
+
+from Config.s3 import AWS_S3_BUCKET_NAME, s3_connection
+from lib.cache import invalidate_entity
+from lib.stream_upload import MIB
+
+load_dotenv(override=True)
+
+logger = logging.getLogger(__name__)
+
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+MEDIA_MAX_IMAGE_BYTES = int(os.getenv("MEDIA_MAX_IMAGE_MB", "25")) * MIB  # larger images get no variants
+MEDIA_THUMB_SIZE = int(os.getenv("MEDIA_THUMB_SIZE", "320"))
+MEDIA_MEDIUM_SIZE = int(os.getenv("MEDIA_MEDIUM_SIZE", "1024"))
+MEDIA_QUALITY = int(os.getenv("MEDIA_QUALITY", "80"))
+
+# name -> (longest side in pixels, Pillow format)
+VARIANTS: Dict[str, Tuple[int, str]] = {
+    "thumb": (MEDIA_THUMB_SIZE, "JPEG"),
+    "thumb_webp": (MEDIA_THUMB_SIZE, "WEBP"),
+    "medium": (MEDIA_MEDIUM_SIZE, "JPEG"),
+    "medium_webp": (MEDIA_MEDIUM_SIZE, "WEBP"),
+}
+_FORMATS = {"JPEG": ("jpg", "image/jpeg"), "WEBP": ("webp", "image/webp")}
+
+# Entities that show an image: Prisma delegate and the cache kind
+IMAGE_DELEGATES = {"gonpa": "gonpa", "festival": "festival", "statue": "statue", "pilgrim": "pilgrimsite"}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS)
+    return _pool
+
+
+def shutdown_media_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def render_variants(data: bytes, variants: Dict[str, Tuple[int, str]], quality: int) -> Tuple[int, int, List[Tuple[str, bytes, int, int]]]:
+    """Decode an image once and encode every variant; runs in a worker process.
+
+    Returns the original (width, height) and (name, bytes, width, height)
+    per variant. Variants never upscale.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        original_size = image.size
+        largest = max(size for size, _ in variants.values())
+        # Let the JPEG decoder scale down by 1/2..1/8 while decoding
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        rendered = []
+        for name, (size, image_format) in sorted(variants.items(), key=lambda item: -item[1][0]):
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if image_format == "JPEG" and variant.mode != "RGB":
+                variant = variant.convert("RGB")
+            out = io.BytesIO()
+            if image_format == "JPEG":
+                variant.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+            else:
+                variant.save(out, "WEBP", quality=quality, method=4)
+            rendered.append((name, out.getvalue(), variant.width, variant.height))
+    return original_size[0], original_size[1], rendered
+
+
+def variant_key(key: str, name: str, image_format: str) -> str:
+    stem = key.rsplit(".", 1)[0]
+    return f"variants/{stem}/{name}.{_FORMATS[image_format][0]}"
+
+
+def is_image(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith("image/") and content_type != "image/svg+xml"
+
+
+async def create_variants(db: Prisma, key: str, content_type: str, data: bytes) -> Dict[str, str]:
+    """Render, store and record the variants of an uploaded image; returns variant name -> URL.
+
+    Decoding and encoding run in a process pool, so the event loop is free
+    while a large photo is resized. Entities already pointing at the image
+    pick up the new variants. An image Pillow cannot decode (an unsupported
+    format, a truncated file, a decompression bomb) gets no variants; the
+    upload itself has already succeeded.
+    """
+    if not is_image(content_type) or len(data) > MEDIA_MAX_IMAGE_BYTES:
+        return {}
+    loop = asyncio.get_running_loop()
+    try:
+        width, height, rendered = await loop.run_in_executor(_get_pool(), render_variants, data, VARIANTS, MEDIA_QUALITY)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        logger.warning("No variants for %s (%s): %s: %s", key, content_type, type(e).__name__, e)
+        return {}
+
+    client = await s3_connection.client()
+    variants: Dict[str, Dict[str, Any]] = {}
+    uploads = []
+    for name, body, variant_width, variant_height in rendered:
+        image_format = VARIANTS[name][1]
+        object_key = variant_key(key, name, image_format)
+        variant_type = _FORMATS[image_format][1]
+        uploads.append(client.put_object(
+            Bucket=AWS_S3_BUCKET_NAME,
+            Key=object_key,
+            Body=body,
+            ContentType=variant_type,
+            CacheControl="public, max-age=31536000, immutable",
+        ))
+        variants[name] = {
+            "url": s3_connection.object_url(object_key),
+            "width": variant_width,
+            "height": variant_height,
+            "size": len(body),
+            "contentType": variant_type,
+        }
+    await asyncio.gather(*uploads)
+
+    url = s3_connection.object_url(key)
+    asset = {
+        "url": url,
+        "contentType": content_type,
+        "size": len(data),
+        "width": width,
+        "height": height,
+        "variants": Json(variants),
+    }
+    await db.mediaasset.upsert(where={"key": key}, data={"create": {"key": key, **asset}, "update": asset})
+
+    urls = {name: variant["url"] for name, variant in variants.items()}
+    await attach_variants(db, url, urls)
+    return urls
+
+
+async def create_variants_from_s3(db: Prisma, key: str, content_type: str, size: int) -> Dict[str, str]:
+    """Variants for an object uploaded straight to S3 (presigned); it is read back once."""
+    if not is_image(content_type) or size > MEDIA_MAX_IMAGE_BYTES:
+        return {}
+    client = await s3_connection.client()
+    response = await client.get_object(Bucket=AWS_S3_BUCKET_NAME, Key=key)
+    async with response["Body"] as body:
+        data = await body.read()
+    return await create_variants(db, key, content_type, data)
+
+
+async def image_bytes(chunks: AsyncIterator[bytes], content_type: str, kept: bytearray) -> AsyncIterator[bytes]:
+    """Pass a byte stream through, keeping a copy in ``kept`` when it is an image small enough for variants."""
+    keep = is_image(content_type)
+    async for chunk in chunks:
+        if keep:
+            kept += chunk
+            if len(kept) > MEDIA_MAX_IMAGE_BYTES:
+                keep = False
+                kept.clear()
+        yield chunk
+
+
+async def attach_variants(db: Prisma, url: str, urls: Dict[str, str]) -> None:
+    """Copy the variant URLs onto every entity whose image is ``url``."""
+    for kind, delegate_name in IMAGE_DELEGATES.items():
+        delegate = getattr(db, delegate_name)
+        entities = await delegate.find_many(where={"image": url})
+        if not entities:
+            continue
+        await delegate.update_many(where={"id": {"in": [e.id for e in entities]}}, data={"imageVariants": Json(urls)})
+        for entity in entities:
+            invalidate_entity(kind, entity.id, lists=True)
+
+
+async def variant_urls(db: Prisma, image: Optional[str]) -> Dict[str, str]:
+    """Variant name -> URL already generated for an image URL."""
+    if not image:
+        return {}
+    asset = await db.mediaasset.find_unique(where={"url": image})
+    return {name: variant["url"] for name, variant in asset.variants.items()} if asset else {}
+
+
+async def image_variants(db: Prisma, image: Optional[str]) -> Dict[str, Any]:
+    """Prisma data for an entity's ``imageVariants`` column, looked up from its image URL."""
+    return {"imageVariants": Json(await variant_urls(db, image))}
+
+
+async def image_variants_by_url(db: Prisma, images: List[str]) -> Dict[str, Dict[str, str]]:
+    """Variant URLs for many images in one query (bulk import)."""
+    wanted = list({image for image in images if image})
+    if not wanted:
+        return {}
+    assets = await db.mediaasset.find_many(where={"url": {"in": wanted}})
+    return {asset.url: {name: variant["url"] for name, variant in asset.variants.items()} for asset in assets}
@@ -0,0 +1,295 @@
+"""In-process metrics in the Prometheus text format.
+
+Counters and histograms are plain dicts keyed by label values, updated
+without locks (everything runs on the event loop) and rendered only when
+/metrics is scraped. Each worker process keeps its own numbers; with several
+workers, scrape each one or aggregate in Prometheus.
+"""
+import bisect
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+UPLOAD_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Route label of requests that match no route, so stray paths cannot grow the label set
+UNMATCHED = "unmatched"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        REGISTRY.append(self)
+
+    def _labels(self, values: Labels, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """The metric's sample lines, without its HELP and TYPE lines."""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, labels: Labels = (), value: float = 0) -> None:
+        """Take the value from a total kept elsewhere (the pool and cache stats)."""
+        self._values[labels] = value
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(labels)} {_number(value)}" for labels, value in list(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (the last one past every bound), sum]
+        self._series: Dict[Labels, List[Any]] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            cumulative += counts[-1]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requests handled, by route template and status.", ["method", "route", "status"])
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "Requests being handled.", ["method", "route"])
+HTTP_DURATION = Histogram("http_request_duration_seconds", "Time from request to the last body byte.", ["method", "route"])
+HTTP_RESPONSE_SIZE = Histogram("http_response_size_bytes", "Response body bytes as sent (after compression).", ["method", "route"], SIZE_BUCKETS)
+REQUEST_DB_QUERIES = Histogram("http_request_db_queries", "Database queries made by one request.", ["method", "route"], QUERY_COUNT_BUCKETS)
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Time one request spent waiting on the database.", ["method", "route"])
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "Prisma query time, by model and operation.", ["model", "operation"])
+S3_UPLOAD_BYTES = Counter("s3_upload_bytes_total", "Bytes written to S3.", ["method"])
+S3_UPLOAD_DURATION = Histogram("s3_upload_duration_seconds", "Time to write one object to S3.", ["method"], UPLOAD_BUCKETS)
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_seconds", "queries")
+
+    def __init__(self) -> None:
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        # (model, operation, start, end) of each query, perf_counter times, for lib.tracing
+        self.queries: List[Tuple[str, str, float, float]] = []
+
+
+# Stats of the request being handled; tasks and threads it starts share the same object
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def record_query(model: str, operation: str, seconds: float) -> None:
+    DB_QUERY_DURATION.observe((model, operation), seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        ended = time.perf_counter()
+        stats.db_queries += 1
+        stats.db_seconds += seconds
+        stats.queries.append((model, operation, ended - seconds, ended))
+
+
+def record_upload(method: str, size: int, seconds: float) -> None:
+    S3_UPLOAD_BYTES.inc((method,), size)
+    S3_UPLOAD_DURATION.observe((method,), seconds)
+
+
+def _timed(call: Callable[..., Awaitable[Any]], model: str, operation: str) -> Callable[..., Awaitable[Any]]:
+    async def timed(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await call(*args, **kwargs)
+        finally:
+            record_query(model, operation, time.perf_counter() - started)
+    return timed
+
+
+class _InstrumentedActions:
+    """A model delegate (``db.gonpa``) whose queries are timed."""
+
+    def __init__(self, actions: Any, model: str) -> None:
+        self._actions = actions
+        self._model = model
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._actions, name)
+        if name.startswith("_") or not callable(value):
+            return value
+        timed = _timed(value, self._model, name)
+        setattr(self, name, timed)  # wrapped once per delegate
+        return timed
+
+
+class _InstrumentedContext:
+    """``db.tx()`` / ``db.batch_()``: the commit on leaving the block counts as one query."""
+
+    def __init__(self, manager: Any, operation: str) -> None:
+        self._manager = manager
+        self._operation = operation
+
+    async def __aenter__(self) -> Any:
+        entered = await self._manager.__aenter__()
+        return InstrumentedPrisma(entered) if self._operation == "transaction" else entered
+
+    async def __aexit__(self, *exc_info: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await self._manager.__aexit__(*exc_info)
+        finally:
+            record_query(self._operation, "commit", time.perf_counter() - started)
+
+
+class InstrumentedPrisma:
+    """Prisma client proxy that records every query's duration, overall and for the current request.
+
+    Model delegates, raw queries, transactions and batches are wrapped on
+    first access and the wrappers kept, so the per-query cost is one
+    ``perf_counter`` pair and a few dict updates.
+    """
+
+    _RAW = ("query_raw", "query_first", "execute_raw")
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._client, name)
+        if name in self._RAW:
+            wrapped: Any = _timed(value, "raw", name)
+        elif name == "tx":
+            wrapped = lambda *args, **kwargs: _InstrumentedContext(value(*args, **kwargs), "transaction")
+        elif name == "batch_":
+            wrapped = lambda *args, **kwargs: _InstrumentedContext(value(*args, **kwargs), "batch")
+        elif not name.startswith("_") and hasattr(value, "find_many"):
+            wrapped = _InstrumentedActions(value, name)
+        else:
+            return value
+        setattr(self, name, wrapped)
+        return wrapped
+
+
+def route_template(routes: Sequence[BaseRoute], scope: Scope) -> str:
+    """Path template of the route a request goes to (``/gonpa/{gonpa_id}``), resolved as the router does."""
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED)
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(route, "path", UNMATCHED)
+    return partial or UNMATCHED
+
+
+class MetricsMiddleware:
+    """Count, time and size every HTTP request by route template, with the database work it caused.
+
+    Added last so it is the outermost middleware: durations include the
+    other middleware and sizes are the bytes actually sent.
+    """
+
+    def __init__(self, app: ASGIApp, routes: Sequence[BaseRoute]) -> None:
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        labels = (method, route_template(self.routes, scope))
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        HTTP_IN_PROGRESS.inc(labels)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_PROGRESS.dec(labels)
+            _request_stats.reset(token)
+            HTTP_REQUESTS.inc((*labels, str(status)))
+            HTTP_DURATION.observe(labels, elapsed)
+            HTTP_RESPONSE_SIZE.observe(labels, size)
+            REQUEST_DB_QUERIES.observe(labels, stats.db_queries)
+            REQUEST_DB_SECONDS.observe(labels, stats.db_seconds)
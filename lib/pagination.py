@@ -0,0 +1,102 @@
+import base64
+import binascii
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Query
+
+from model.pagination import PageParams
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Stable keyset order for tables that carry a non-null creation timestamp
+CREATED_ORDER = [{"createdAt": "asc"}, {"id": "asc"}]
+# For tables without one (Festival.createdAt is nullable, and NULLs break the keyset)
+ID_ORDER = [{"id": "asc"}]
+
+
+def encode_cursor(record_id: str, **position: Any) -> str:
+    """Opaque cursor for the last row of a page; ``position`` adds the other sort keys."""
+    raw = json.dumps({"id": record_id, **position}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor_position(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))
+        position["id"]
+        return position
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_cursor(cursor: str) -> str:
+    return decode_cursor_position(cursor)["id"]
+
+
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+) -> PageParams:
+    return PageParams(limit=limit, cursor=cursor, include_total=include_total)
+
+
+async def paginate(
+    delegate: Any,
+    page: PageParams,
+    where: Optional[Dict[str, Any]] = None,
+    include: Optional[Dict[str, Any]] = None,
+    order: Optional[List[Dict[str, str]]] = None,
+) -> Dict[str, Any]:
+    """Fetch one keyset page from a Prisma model delegate.
+
+    One extra row is requested to know whether another page exists; the
+    cursor points at the last row returned, and Prisma resumes right after it.
+    """
+    query: Dict[str, Any] = {
+        "where": where or {},
+        "take": page.limit + 1,
+        "order": order or CREATED_ORDER,
+    }
+    if include:
+        query["include"] = include
+    if page.cursor:
+        query["cursor"] = {"id": decode_cursor(page.cursor)}
+        query["skip"] = 1
+
+    rows = await delegate.find_many(**query)
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = encode_cursor(rows[-1].id)
+
+    total = await delegate.count(where=where or {}) if page.include_total else None
+    return {"items": rows, "limit": page.limit, "next_cursor": next_cursor, "total": total}
+
+
+async def keyset_chunks(
+    find_many: Callable[..., Awaitable[List[Any]]],
+    chunk_size: int,
+    **query: Any,
+) -> AsyncIterator[List[Any]]:
+    """Walk a whole table in id order, ``chunk_size`` rows per ``find_many`` call.
+
+    Each chunk starts after the last id seen rather than at a Prisma cursor:
+    a cursor row deleted between chunks would end the walk early.
+    """
+    last_id: Optional[str] = None
+    while True:
+        args: Dict[str, Any] = {"take": chunk_size, "order": {"id": "asc"}, **query}
+        if last_id:
+            after = {"id": {"gt": last_id}}
+            args["where"] = {"AND": [query["where"], after]} if "where" in query else after
+        rows = await find_many(**args)
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1].id
@@ -0,0 +1,258 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import math
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from prisma import Prisma
+from prisma.errors import UniqueViolationError
+
+from Config.s3 import AWS_S3_BUCKET_NAME, s3_connection
+from lib.dedup import find_existing, hash_object, record_object
+from lib.stream_upload import MIB, S3_MAX_UPLOAD_BYTES, S3_PART_SIZE, too_large
+
+load_dotenv(override=True)
+
+S3_PRESIGN_EXPIRES = int(os.getenv("S3_PRESIGN_EXPIRES", "900"))  # seconds a presigned URL stays valid
+# Above this size uploads are always multipart (a single POST tops out at 5 GB, and retries get expensive)
+S3_PRESIGN_SINGLE_MAX = int(os.getenv("S3_PRESIGN_SINGLE_MAX_MB", "100")) * MIB
+UPLOAD_ALLOWED_TYPES = [
+    prefix.strip() for prefix in os.getenv("UPLOAD_ALLOWED_TYPES", "image/,audio/").split(",") if prefix.strip()
+]
+# Signs the upload tokens; must be the same on every worker
+UPLOAD_TOKEN_SECRET = os.getenv("UPLOAD_TOKEN_SECRET", "").encode()
+# A /complete call that has not finished after this many seconds (e.g. its worker died) can be taken over
+COMPLETE_CLAIM_TIMEOUT = int(os.getenv("COMPLETE_CLAIM_TIMEOUT", "300"))
+
+MAX_PARTS = 10000
+
+
+def _check_configured() -> None:
+    """Presigned uploads are unavailable, rather than the whole app, when no token secret is set."""
+    if not UPLOAD_TOKEN_SECRET:
+        raise HTTPException(status_code=503, detail="Presigned uploads are not configured (UPLOAD_TOKEN_SECRET is not set)")
+
+
+def _sign(payload: bytes) -> str:
+    return hmac.new(UPLOAD_TOKEN_SECRET, payload, hashlib.sha256).hexdigest()
+
+
+def encode_upload_token(claims: Dict[str, Any]) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps(claims, separators=(",", ":")).encode()).decode().rstrip("=")
+    return f"{payload}.{_sign(payload.encode())}"
+
+
+def decode_upload_token(token: str, allow_expired: bool = False) -> Dict[str, Any]:
+    """The claims of a token from /presign, if it is authentic (and not expired, unless allowed)."""
+    try:
+        payload, signature = token.rsplit(".", 1)
+        if not hmac.compare_digest(signature, _sign(payload.encode())):
+            raise ValueError("bad signature")
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        expired = claims["exp"] < time.time()
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid upload token")
+    if expired and not allow_expired:
+        raise HTTPException(status_code=400, detail="Upload token expired")
+    return claims
+
+
+def _check_request(content_type: str, size: int) -> None:
+    if not any(content_type.startswith(prefix) for prefix in UPLOAD_ALLOWED_TYPES):
+        raise HTTPException(status_code=415, detail=f"Content type {content_type} is not allowed")
+    if size > S3_MAX_UPLOAD_BYTES:
+        raise too_large()
+
+
+async def presign_upload(
+    db: Prisma,
+    filename: str,
+    content_type: str,
+    size: int,
+    sha256: str,
+    multipart: bool = False,
+) -> Dict[str, Any]:
+    """Presigned request(s) that let the client send the file straight to S3.
+
+    When a file with this SHA-256 is already stored, nothing is presigned
+    and its URL comes back with ``deduplicated`` set. Otherwise single
+    uploads get a presigned POST whose policy pins the content type, the
+    exact size and the SHA-256 checksum; larger ones get a multipart upload
+    with one presigned PUT URL per part. The returned token is what
+    /complete needs to finish.
+    """
+    _check_configured()
+    _check_request(content_type, size)
+    sha256 = sha256.lower()
+    existing = await find_existing(db, sha256)
+    if existing is not None:
+        return {"deduplicated": True, "file_url": existing}
+
+    client = await s3_connection.client()
+    key = f"{uuid.uuid4()}.{filename.split('.')[-1]}"
+    expires_at = int(time.time()) + S3_PRESIGN_EXPIRES
+    claims: Dict[str, Any] = {"key": key, "size": size, "content_type": content_type, "sha256": sha256, "exp": expires_at}
+
+    if not multipart and size <= S3_PRESIGN_SINGLE_MAX:
+        # S3 refuses the POST unless the file hashes to the declared checksum
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        fields = {"Content-Type": content_type, "x-amz-checksum-algorithm": "SHA256", "x-amz-checksum-sha256": checksum}
+        post = await client.generate_presigned_post(
+            Bucket=AWS_S3_BUCKET_NAME,
+            Key=key,
+            Fields=fields,
+            Conditions=[*({name: value} for name, value in fields.items()), ["content-length-range", size, size]],
+            ExpiresIn=S3_PRESIGN_EXPIRES,
+        )
+        return {
+            "deduplicated": False,
+            "method": "POST",
+            "url": post["url"],
+            "fields": post["fields"],
+            "token": encode_upload_token(claims),
+            "expires_at": expires_at,
+        }
+
+    part_size = max(S3_PART_SIZE, math.ceil(size / MAX_PARTS))
+    part_count = math.ceil(size / part_size)
+    created = await client.create_multipart_upload(Bucket=AWS_S3_BUCKET_NAME, Key=key, ContentType=content_type)
+    claims["upload_id"] = created["UploadId"]
+    parts = []
+    for number in range(1, part_count + 1):
+        url = await client.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": AWS_S3_BUCKET_NAME, "Key": key, "UploadId": created["UploadId"], "PartNumber": number},
+            ExpiresIn=S3_PRESIGN_EXPIRES,
+        )
+        parts.append({"PartNumber": number, "url": url, "size": min(part_size, size - (number - 1) * part_size)})
+    return {
+        "deduplicated": False,
+        "method": "PUT",
+        "part_size": part_size,
+        "parts": parts,
+        "token": encode_upload_token(claims),
+        "expires_at": expires_at,
+    }
+
+
+async def _claim(db: Prisma, claims: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Claim the token's key for this /complete call; the earlier result when it was already completed."""
+    key = claims["key"]
+    try:
+        await db.completedupload.create(data={"key": key, "contentType": claims["content_type"], "size": claims["size"]})
+        return None
+    except UniqueViolationError:
+        pass
+    previous = await db.completedupload.find_unique(where={"key": key})
+    if previous is not None and previous.url is not None:
+        return _result(key, previous.url, previous.contentType, previous.size, repeated=True)
+    stale = datetime.now(timezone.utc) - timedelta(seconds=COMPLETE_CLAIM_TIMEOUT)
+    taken = await db.completedupload.update_many(
+        where={"key": key, "url": None, "claimedAt": {"lt": stale}},
+        data={"claimedAt": datetime.now(timezone.utc)},
+    )
+    if not taken:
+        raise HTTPException(status_code=409, detail="This upload is already being completed")
+    return None
+
+
+def _result(key: str, url: str, content_type: str, size: int, repeated: bool = False) -> Dict[str, Any]:
+    return {
+        "file_url": url,
+        "key": key,
+        "content_type": content_type,
+        "size": size,
+        # Another upload of the same content was stored first; the object at ``key`` is gone
+        "deduplicated": url != s3_connection.object_url(key),
+        "repeated": repeated,
+    }
+
+
+async def complete_upload(db: Prisma, token: str, parts: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Finish a presigned upload, check the stored object against what was presigned.
+
+    Returns the object's URL, key, content type and size, whether the URL
+    is that of an identical file stored earlier (``deduplicated``) and
+    whether an earlier call had already completed it (``repeated``).
+
+    Each token completes once: the first call claims its key and records
+    the result, and later calls get that result back without touching S3.
+    The object must have been written before the token expired, which S3
+    enforces for the upload itself; the /complete call may come later.
+    An object whose size, type or SHA-256 does not match is deleted; one
+    that matches is recorded by its hash for deduplication.
+    """
+    _check_configured()
+    claims = decode_upload_token(token, allow_expired=True)
+    key = claims["key"]
+    previous = await _claim(db, claims)
+    if previous is not None:
+        return previous
+
+    try:
+        result = await _complete(db, claims, parts)
+    except BaseException:
+        # Released so the client can fix the upload and call again
+        await db.completedupload.delete(where={"key": key})
+        raise
+    await db.completedupload.update(
+        where={"key": key},
+        data={"url": result["file_url"], "completedAt": datetime.now(timezone.utc)},
+    )
+    return result
+
+
+async def _complete(db: Prisma, claims: Dict[str, Any], parts: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    client = await s3_connection.client()
+    key = claims["key"]
+
+    try:
+        if "upload_id" in claims:
+            if not parts:
+                raise HTTPException(status_code=400, detail="Parts are required to complete a multipart upload")
+            await client.complete_multipart_upload(
+                Bucket=AWS_S3_BUCKET_NAME,
+                Key=key,
+                UploadId=claims["upload_id"],
+                MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])},
+            )
+        head = await client.head_object(Bucket=AWS_S3_BUCKET_NAME, Key=key, ChecksumMode="ENABLED")
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code", "")
+        if code in ("404", "NoSuchKey", "NoSuchUpload"):
+            if claims["exp"] < time.time():
+                raise HTTPException(status_code=400, detail="Upload token expired")
+            raise HTTPException(status_code=404, detail="Upload not found; send the file before completing")
+        raise HTTPException(status_code=400, detail=f"Could not complete upload: {code or e}")
+
+    # For a multipart upload this is when it was started, which the token's expiry also bounds
+    if head["LastModified"].timestamp() > claims["exp"]:
+        await client.delete_object(Bucket=AWS_S3_BUCKET_NAME, Key=key)
+        raise HTTPException(status_code=400, detail="Upload token expired before the file was uploaded")
+    if head["ContentLength"] != claims["size"] or head.get("ContentType") != claims["content_type"]:
+        await client.delete_object(Bucket=AWS_S3_BUCKET_NAME, Key=key)
+        raise HTTPException(status_code=400, detail="Uploaded file does not match the presigned size or content type")
+
+    # A presigned POST carries the checksum S3 verified; multipart objects have no whole-file SHA-256, so read it back
+    checksum = head.get("ChecksumSHA256")
+    if checksum and "-" not in checksum:
+        sha256 = base64.b64decode(checksum).hex()
+    else:
+        sha256 = await hash_object(key)
+    if sha256 != claims["sha256"]:
+        await client.delete_object(Bucket=AWS_S3_BUCKET_NAME, Key=key)
+        raise HTTPException(status_code=400, detail="Uploaded file does not match the presigned SHA-256")
+
+    s3_connection.uploads_total += 1
+    s3_connection.bytes_total += head["ContentLength"]
+    url = await record_object(db, sha256, key, claims["content_type"], head["ContentLength"])
+    return _result(key, url, claims["content_type"], head["ContentLength"])
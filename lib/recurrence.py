@@ -0,0 +1,248 @@
+import asyncio
+import heapq
+import itertools
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from prisma import Prisma
+
+from lib.dates import START_ORDER, overlap_where
+from lib.lunar import LUNAR_FIRST_YEAR, LUNAR_LAST_YEAR, from_gregorian, observed_date
+from lib.pagination import decode_cursor_position, encode_cursor
+from model.enum import Recurrence
+from model.pagination import PageParams
+
+ONE_OFF = {"recurrence": Recurrence.NONE}
+RECURRING = {"recurrence": {"not": Recurrence.NONE}}
+
+Window = Tuple[Optional[datetime], Optional[datetime]]
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def recurrence_data(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Festival columns with the Tibetan date of the start date filled in.
+
+    The lunar month and day are stored for every festival whose start date is
+    written, unless given explicitly; yearly lunar festivals recur on them.
+    """
+    data = dict(values)
+    if ("lunar_month" in data) != ("lunar_day" in data):
+        raise HTTPException(status_code=400, detail="lunar_month and lunar_day must be given together")
+    if data.get("start_date") is not None and data.get("lunar_month") is None:
+        lunar = from_gregorian(_utc(data["start_date"]).date())
+        if lunar is None and data.get("recurrence") == Recurrence.YEARLY_LUNAR:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Lunar dates are supported from {LUNAR_FIRST_YEAR} to {LUNAR_LAST_YEAR}"
+            )
+        data["lunar_month"] = lunar.month if lunar else None
+        data["lunar_day"] = lunar.day if lunar else None
+    return data
+
+
+def _same_day(day: date, year: int) -> date:
+    try:
+        return day.replace(year=year)
+    except ValueError:  # 29 February
+        return day.replace(year=year, day=28)
+
+
+def occurrences(festival: Any, start: Optional[datetime], end: Optional[datetime]) -> Iterator[Tuple[datetime, datetime]]:
+    """(start, end) of each occurrence of a recurring festival overlapping [start, end), in order, one year at a time.
+
+    Occurrences keep the duration and time of day of the stored dates and
+    never come before them. Without an end they run to LUNAR_LAST_YEAR.
+    """
+    anchor = _utc(festival.start_date)
+    duration = _utc(festival.end_date) - anchor
+    lunar: Optional[Tuple[int, int]] = None
+    if festival.recurrence == Recurrence.YEARLY_LUNAR:
+        if festival.lunar_month is not None and festival.lunar_day is not None:
+            lunar = (festival.lunar_month, festival.lunar_day)
+        else:
+            found = from_gregorian(anchor.date())
+            if found is None:
+                return
+            lunar = (found.month, found.day)
+
+    # A Tibetan year's last months fall in the next Gregorian year, so start one year early
+    first_year = anchor.year - 1
+    if start is not None:
+        first_year = max(first_year, (start - duration).year - 1)
+    last_year = min(end.year if end is not None else LUNAR_LAST_YEAR, LUNAR_LAST_YEAR)
+    for year in range(first_year, last_year + 1):
+        day = observed_date(year, *lunar) if lunar else _same_day(anchor.date(), year)
+        if day is None:
+            continue
+        occurrence = datetime.combine(day, anchor.timetz())
+        if occurrence < anchor:
+            continue
+        if end is not None and occurrence >= end:
+            return
+        if start is None or occurrence + duration >= start:
+            yield occurrence, occurrence + duration
+
+
+class RecurringFestival(NamedTuple):
+    """The columns of a recurring festival that its occurrences are computed from."""
+    id: str
+    start_date: datetime
+    end_date: datetime
+    recurrence: Recurrence
+    lunar_month: Optional[int]
+    lunar_day: Optional[int]
+
+
+def _as_utc(value: Any) -> datetime:
+    # Raw query results may carry timestamps as ISO strings
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return _utc(value)
+
+
+def _sql_time(value: Any) -> str:
+    # The columns are TIMESTAMP(3) in UTC, without a zone
+    if isinstance(value, datetime):
+        return _utc(value).replace(tzinfo=None).isoformat()
+    return str(value)
+
+
+_SQL_OPERATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+async def recurring_festivals(db: Prisma, where: Dict[str, Any], end: Optional[datetime]) -> List[RecurringFestival]:
+    """Recurring festivals matching ``where`` that start before ``end``, without translations or other columns.
+
+    ``where`` is a Prisma filter of date bounds, such as
+    ``{"start_date": {"gte": ...}, "end_date": {"lte": ...}}``, the only kind
+    the festival lists pass.
+    """
+    conditions = ['"recurrence" <> \'NONE\'']
+    args: List[str] = []
+    bounds = [(column, operator, value) for column, ops in where.items() for operator, value in ops.items()]
+    if end is not None:
+        bounds.append(("start_date", "lt", end))
+    for column, operator, value in bounds:
+        if column not in ("start_date", "end_date") or operator not in _SQL_OPERATORS:
+            raise ValueError(f"Unsupported festival filter: {column} {operator}")
+        args.append(_sql_time(value))
+        conditions.append(f'"{column}" {_SQL_OPERATORS[operator]} CAST(${len(args)} AS TIMESTAMP(3))')
+    rows = await db.query_raw(
+        f"""
+        SELECT "id", "start_date", "end_date", "recurrence"::text AS "recurrence", "lunar_month", "lunar_day"
+        FROM "Festival"
+        WHERE {" AND ".join(conditions)}
+        """,
+        *args,
+    )
+    return [
+        RecurringFestival(
+            row["id"], _as_utc(row["start_date"]), _as_utc(row["end_date"]),
+            Recurrence(row["recurrence"]), row["lunar_month"], row["lunar_day"],
+        )
+        for row in rows
+    ]
+
+
+def _tagged_occurrences(
+    festival: RecurringFestival,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    after: Optional[Tuple[datetime, str]],
+) -> Iterator[Tuple[datetime, str, Any, datetime]]:
+    if after is not None:
+        # Begin at the cursor's year instead of the window's
+        start = after[0] if start is None else max(start, after[0])
+    for occurrence_start, occurrence_end in occurrences(festival, start, end):
+        if after is None or (occurrence_start, festival.id) > after:
+            yield occurrence_start, festival.id, festival, occurrence_end
+
+
+def window_where(where: Dict[str, Any], window: Window) -> Dict[str, Any]:
+    """Every festival that may occur in the window: overlapping one-offs and recurring ones already started."""
+    start, end = window
+    recurring: List[Dict[str, Any]] = [where, RECURRING]
+    if end is not None:
+        recurring.append({"start_date": {"lt": end}})
+    return {"OR": [{"AND": [where, ONE_OFF, overlap_where(start, end)]}, {"AND": recurring}]}
+
+
+def validators_where(where: Dict[str, Any]) -> Dict[str, Any]:
+    """Filter for the validators of an occurrence list: the rows it may show plus every recurring festival.
+
+    Editing a recurring festival can move it out of the window's filter,
+    and then neither the count nor the newest updatedAt of that filter
+    would change; counting all recurring rows catches it.
+    """
+    return {"OR": [where, RECURRING]}
+
+
+async def occurrence_page(
+    db: Prisma,
+    page: PageParams,
+    where: Dict[str, Any],
+    window: Window,
+    include: Dict[str, Any],
+) -> Dict[str, Any]:
+    """One page of festival occurrences in the window, ordered by start date.
+
+    One-off festivals come from the (end_date, start_date) index a page at a
+    time; recurring ones (a row per festival, not per year) are read without
+    their translations, expanded lazily from the cursor's date and merged
+    in, so only the occurrences on the page are produced. The recurring
+    festivals on the page are then loaded in full and carry the dates of
+    the occurrence.
+    """
+    start, end = window
+    after: Optional[Tuple[datetime, str]] = None
+    if page.cursor:
+        position = decode_cursor_position(page.cursor)
+        try:
+            after = (_utc(datetime.fromisoformat(position["start"])), position["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    one_off_where: List[Dict[str, Any]] = [where, ONE_OFF, overlap_where(start, end)]
+    if after is not None:
+        one_off_where.append({"OR": [
+            {"start_date": {"gt": after[0]}},
+            {"start_date": after[0], "id": {"gt": after[1]}},
+        ]})
+    one_offs, recurring = await asyncio.gather(
+        db.festival.find_many(where={"AND": one_off_where}, order=START_ORDER, take=page.limit + 1, include=include),
+        recurring_festivals(db, where, end),
+    )
+
+    streams = [((_utc(f.start_date), f.id, f, _utc(f.end_date)) for f in one_offs)]
+    streams.extend(_tagged_occurrences(festival, start, end, after) for festival in recurring)
+    merged = heapq.merge(*streams, key=lambda item: (item[0], item[1]))
+    selected = list(itertools.islice(merged, page.limit + 1))
+
+    next_cursor = None
+    if len(selected) > page.limit:
+        selected = selected[:page.limit]
+        next_cursor = encode_cursor(selected[-1][1], start=selected[-1][0].isoformat())
+
+    # Only the recurring festivals on the page are loaded in full, with their translations
+    recurring_ids = list({festival.id for _, _, festival, _ in selected if festival.recurrence != Recurrence.NONE})
+    loaded: Dict[str, Any] = {}
+    if recurring_ids:
+        rows = await db.festival.find_many(where={"id": {"in": recurring_ids}}, include=include)
+        loaded = {row.id: row for row in rows}
+
+    items = [
+        festival if festival.recurrence == Recurrence.NONE
+        else loaded[festival_id].model_copy(update={"start_date": occurrence_start, "end_date": occurrence_end})
+        for occurrence_start, festival_id, festival, occurrence_end in selected
+        if festival.recurrence == Recurrence.NONE or festival_id in loaded  # deleted meanwhile
+    ]
+
+    total = None
+    if page.include_total:
+        one_off_total = await db.festival.count(where={"AND": [where, ONE_OFF, overlap_where(start, end)]})
+        total = one_off_total + sum(1 for festival in recurring for _ in occurrences(festival, start, end))
+    return {"items": items, "limit": page.limit, "next_cursor": next_cursor, "total": total}
@@ -0,0 +1,283 @@
+import asyncio
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from prisma import Prisma
+
+from lib.bundle import catalog_version
+
+load_dotenv(override=True)
+
+# kind -> (Prisma translation delegate, foreign key to the parent)
+SEARCHABLE: Dict[str, Tuple[str, str]] = {
+    "gonpa": ("gonpatranslation", "gonpaId"),
+    "festival": ("festivaltranslation", "festivalId"),
+    "statue": ("statuetranslation", "statueId"),
+    "pilgrim": ("pilgrimsitetranslation", "pilgrimSiteId"),
+}
+
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+BUILD_CHUNK_SIZE = 1000
+
+# Seconds between checks of the catalog version; writes made through other
+# workers reach this worker's index within this long
+SEARCH_INDEX_CHECK_INTERVAL = float(os.getenv("SEARCH_INDEX_CHECK_INTERVAL", "30"))
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Tibetan (also used for Dzongkha) syllables and numbers run until a tsheg, shad or space;
+# Devanagari words until a danda or space; everything else is split on non-word characters.
+_TOKEN = re.compile(
+    "[\u0f20-\u0f33\u0f40-\u0fbc]+"
+    "|[\u0900-\u0963\u0966-\u097f]+"
+    "|[^\\W_\u0900-\u097f\u0f00-\u0fff]+"
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    tokens = []
+    for token in _TOKEN.findall(unicodedata.normalize("NFC", text)):
+        if "\u0900" <= token[0] <= "\u097f" or "\u0f00" <= token[0] <= "\u0fff":
+            tokens.append(token)
+        else:
+            # Latin and other scripts: case and accent insensitive
+            folded = unicodedata.normalize("NFKD", token.casefold())
+            tokens.append("".join(c for c in folded if not unicodedata.combining(c)))
+    return tokens
+
+
+DocKey = Tuple[str, str, str]  # (kind, entity id, language code)
+
+
+class SearchHit(NamedTuple):
+    type: str
+    id: str
+    languageCode: str
+    name: str
+    score: float
+
+
+class SearchIndex:
+    """In-memory inverted index over the name and description of every translation.
+
+    Built from the database on first use and kept current by the write
+    handlers through `lib.events`. Each worker holds its own copy, so at most
+    every SEARCH_INDEX_CHECK_INTERVAL seconds a search compares the catalog
+    version with the one the index was built at and rebuilds when another
+    worker has written since. The old index keeps serving during a rebuild,
+    and changes reported meanwhile are replayed onto the new one.
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[DocKey, float]] = defaultdict(dict)
+        self._doc_terms: Dict[DocKey, Dict[str, float]] = {}
+        self._doc_length: Dict[DocKey, float] = {}
+        self._doc_name: Dict[DocKey, str] = {}
+        self._entity_docs: Dict[Tuple[str, str], Set[DocKey]] = defaultdict(set)
+        self._total_length = 0.0
+        self._lock = asyncio.Lock()
+        # Changes reported during a rebuild, as (method name, arguments), replayed onto the new index
+        self._pending: Optional[List[Tuple[str, tuple]]] = None
+        self._checked_at = 0.0
+        self.version: Optional[str] = None
+        self.built = False
+
+    # --- maintenance -----------------------------------------------------
+
+    async def ensure_built(self, db: Prisma) -> None:
+        if self.built and (self._lock.locked() or not self._check_due()):
+            return
+        async with self._lock:
+            if self.built and not self._check_due():
+                return
+            version = await catalog_version(db)
+            self._checked_at = time.monotonic()
+            if self.built and version == self.version:
+                return
+            await self._rebuild(db)
+            self.version = version
+
+    def _check_due(self) -> bool:
+        return time.monotonic() - self._checked_at >= SEARCH_INDEX_CHECK_INTERVAL
+
+    async def _rebuild(self, db: Prisma) -> None:
+        fresh = SearchIndex()
+        self._pending = []
+        try:
+            for kind, (delegate_name, foreign_key) in SEARCHABLE.items():
+                delegate = getattr(db, delegate_name)
+                last_id = None
+                while True:
+                    query: Dict[str, Any] = {"take": BUILD_CHUNK_SIZE, "order": {"id": "asc"}}
+                    if last_id:
+                        query["where"] = {"id": {"gt": last_id}}
+                    rows = await delegate.find_many(**query)
+                    for row in rows:
+                        fresh._add(kind, getattr(row, foreign_key), row)
+                    if len(rows) < BUILD_CHUNK_SIZE:
+                        break
+                    last_id = rows[-1].id
+            fresh.built = True
+            # Writes reported while the chunks were read may or may not be in them; applying them again is harmless
+            for method, args in self._pending:
+                getattr(fresh, method)(*args)
+        finally:
+            self._pending = None
+        if not fresh.built:
+            return  # invalidated meanwhile: the next search builds again
+        self._postings = fresh._postings
+        self._doc_terms = fresh._doc_terms
+        self._doc_length = fresh._doc_length
+        self._doc_name = fresh._doc_name
+        self._entity_docs = fresh._entity_docs
+        self._total_length = fresh._total_length
+        self.built = True
+
+    def _defer(self, method: str, *args: Any) -> None:
+        if self._pending is not None:
+            self._pending.append((method, args))
+
+    def invalidate(self) -> None:
+        """Force a rebuild on the next search, e.g. after a bulk write."""
+        self._defer("invalidate")
+        self.built = False
+
+    def index_entity(self, kind: str, entity_id: str, translations: Optional[Iterable[Any]]) -> None:
+        if kind not in SEARCHABLE or translations is None:
+            return
+        translations = list(translations)
+        self._defer("index_entity", kind, entity_id, translations)
+        if not self.built:
+            return
+        self._remove_entity(kind, entity_id)
+        for translation in translations:
+            self._add(kind, entity_id, translation)
+
+    def index_translation(self, kind: str, entity_id: str, translation: Any) -> None:
+        if kind not in SEARCHABLE:
+            return
+        self._defer("index_translation", kind, entity_id, translation)
+        if not self.built:
+            return
+        self._remove((kind, entity_id, translation.languageCode))
+        self._add(kind, entity_id, translation)
+
+    def remove_entity(self, kind: str, entity_id: str) -> None:
+        self._defer("remove_entity", kind, entity_id)
+        self._remove_entity(kind, entity_id)
+
+    def remove_translation(self, kind: str, entity_id: str, language_code: str) -> None:
+        self._defer("remove_translation", kind, entity_id, language_code)
+        self._remove((kind, entity_id, language_code))
+
+    def _remove_entity(self, kind: str, entity_id: str) -> None:
+        for key in list(self._entity_docs.get((kind, entity_id), ())):
+            self._remove(key)
+
+    def _add(self, kind: str, entity_id: str, translation: Any) -> None:
+        key = (kind, entity_id, translation.languageCode)
+        terms: Dict[str, float] = defaultdict(float)
+        for token in tokenize(translation.name):
+            terms[token] += NAME_WEIGHT
+        for token in tokenize(translation.description):
+            terms[token] += DESCRIPTION_WEIGHT
+        if not terms:
+            return
+        length = sum(terms.values())
+        for token, weight in terms.items():
+            self._postings[token][key] = weight
+        self._doc_terms[key] = dict(terms)
+        self._doc_length[key] = length
+        self._doc_name[key] = translation.name
+        self._entity_docs[(kind, entity_id)].add(key)
+        self._total_length += length
+
+    def _remove(self, key: DocKey) -> None:
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        for token in terms:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[token]
+        self._total_length -= self._doc_length.pop(key)
+        self._doc_name.pop(key, None)
+        docs = self._entity_docs.get(key[:2])
+        if docs is not None:
+            docs.discard(key)
+            if not docs:
+                del self._entity_docs[key[:2]]
+
+    # --- querying --------------------------------------------------------
+
+    def search(
+        self,
+        query: str,
+        languages: Optional[List[str]] = None,
+        types: Optional[List[str]] = None,
+    ) -> List[SearchHit]:
+        """Rank entities by BM25 over their translations, best matching translation per entity.
+
+        Entities that match more of the query terms always rank above those
+        that match fewer.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self._doc_terms:
+            return []
+
+        doc_count = len(self._doc_terms)
+        average_length = self._total_length / doc_count
+        scores: Dict[DocKey, float] = defaultdict(float)
+        matched: Dict[DocKey, int] = defaultdict(int)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, tf in postings.items():
+                kind, _, language_code = key
+                if types and kind not in types:
+                    continue
+                if languages and language_code not in languages:
+                    continue
+                norm = K1 * (1 - B + B * self._doc_length[key] / average_length)
+                scores[key] += idf * tf * (K1 + 1) / (tf + norm)
+                matched[key] += 1
+
+        best: Dict[Tuple[str, str], DocKey] = {}
+        for key in scores:
+            entity = key[:2]
+            current = best.get(entity)
+            if current is None or (matched[key], scores[key]) > (matched[current], scores[current]):
+                best[entity] = key
+
+        ranked = sorted(best.values(), key=lambda key: (-matched[key], -scores[key], key))
+        return [
+            SearchHit(key[0], key[1], key[2], self._doc_name[key], round(scores[key], 4))
+            for key in ranked
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "built": self.built,
+            "version": self.version,
+            "documents": len(self._doc_terms),
+            "entities": len(self._entity_docs),
+            "terms": len(self._postings),
+        }
+
+
+search_index = SearchIndex()
@@ -0,0 +1,21 @@
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def type_adapter(response_type: Any) -> TypeAdapter:
+    """One adapter per response type, so its pydantic-core validator and serializer are built once."""
+    return TypeAdapter(response_type)
+
+
+def dump_json(response_type: Any, value: Any) -> bytes:
+    """JSON bytes of ``value`` (Prisma objects, dicts or lists of them) in the shape of ``response_type``.
+
+    Both steps run in pydantic-core: reading the attributes of the Prisma
+    objects into the response model, then writing JSON straight from it.
+    This skips ``jsonable_encoder``, which walks every field in Python.
+    """
+    adapter = type_adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from Config.s3 import AWS_S3_BUCKET_NAME, s3_connection
+from lib.metrics import record_upload
+
+load_dotenv(override=True)
+
+MIB = 1024 * 1024
+# S3 parts must be at least 5 MiB, except the last one
+S3_PART_SIZE = max(int(os.getenv("S3_PART_SIZE_MB", "8")) * MIB, 5 * MIB)
+S3_PART_CONCURRENCY = int(os.getenv("S3_PART_CONCURRENCY", "4"))  # parts uploading at once per upload
+S3_MAX_UPLOAD_BYTES = int(os.getenv("S3_MAX_UPLOAD_MB", "200")) * MIB
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large, the limit is {S3_MAX_UPLOAD_BYTES // MIB} MB")
+
+
+def check_declared_size(content_length: Optional[str]) -> None:
+    """Reject an upload from its Content-Length before reading any of it."""
+    if content_length is None:
+        return
+    try:
+        size = int(content_length)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if size > S3_MAX_UPLOAD_BYTES:
+        raise too_large()
+
+
+class _MultipartUpload:
+
+    def __init__(self, client: Any, key: str, content_type: str) -> None:
+        self.client = client
+        self.key = key
+        self.content_type = content_type
+        self.upload_id: Optional[str] = None
+        self.parts: List[Dict[str, Any]] = []
+        self.part_seconds: List[float] = []
+        self._tasks: List["asyncio.Task[None]"] = []
+        # Buffered memory is bounded by (S3_PART_CONCURRENCY + 1) parts
+        self._slots = asyncio.Semaphore(S3_PART_CONCURRENCY)
+
+    async def add_part(self, body: bytes) -> None:
+        if self.upload_id is None:
+            created = await self.client.create_multipart_upload(
+                Bucket=AWS_S3_BUCKET_NAME, Key=self.key, ContentType=self.content_type
+            )
+            self.upload_id = created["UploadId"]
+        await self._slots.acquire()
+        # Surface a failed part now rather than after the whole body has been read
+        for task in self._tasks:
+            if task.done() and task.exception():
+                self._slots.release()
+                raise task.exception()
+        part_number = len(self._tasks) + 1
+        self._tasks.append(asyncio.create_task(self._upload_part(part_number, body)))
+
+    async def _upload_part(self, part_number: int, body: bytes) -> None:
+        started = time.perf_counter()
+        try:
+            response = await self.client.upload_part(
+                Bucket=AWS_S3_BUCKET_NAME,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
+            self.parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+            self.part_seconds.append(time.perf_counter() - started)
+        finally:
+            self._slots.release()
+
+    async def complete(self) -> None:
+        await asyncio.gather(*self._tasks)
+        await self.client.complete_multipart_upload(
+            Bucket=AWS_S3_BUCKET_NAME,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": sorted(self.parts, key=lambda part: part["PartNumber"])},
+        )
+
+    async def abort(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.upload_id is not None:
+            await self.client.abort_multipart_upload(
+                Bucket=AWS_S3_BUCKET_NAME, Key=self.key, UploadId=self.upload_id
+            )
+
+
+async def stream_to_s3(
+    chunks: AsyncIterator[bytes],
+    key: str,
+    content_type: str,
+    find_existing: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+) -> Dict[str, Any]:
+    """Upload a byte stream to S3 without spooling it, several multipart parts at a time.
+
+    Bodies smaller than one part go up with a single PutObject. The body is
+    hashed as it passes; when ``find_existing`` knows the SHA-256 the object
+    is never created (the PutObject is skipped or the multipart upload
+    aborted) and the existing URL is returned. Returns the object URL with
+    the hash, size and timing of the upload.
+    """
+    started = time.perf_counter()
+    async with s3_connection.upload_slot() as client:
+        upload = _MultipartUpload(client, key, content_type)
+        buffer = bytearray()
+        digest = hashlib.sha256()
+        existing: Optional[str] = None
+        size = 0
+        first_byte: Optional[float] = None
+        try:
+            async for chunk in chunks:
+                if first_byte is None and chunk:
+                    first_byte = time.perf_counter() - started
+                size += len(chunk)
+                if size > S3_MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge()
+                digest.update(chunk)
+                buffer += chunk
+                while len(buffer) >= S3_PART_SIZE:
+                    await upload.add_part(bytes(buffer[:S3_PART_SIZE]))
+                    del buffer[:S3_PART_SIZE]
+
+            if find_existing is not None:
+                existing = await find_existing(digest.hexdigest())
+            if existing is not None:
+                await upload.abort()
+            elif upload.upload_id is None:
+                await client.put_object(
+                    Bucket=AWS_S3_BUCKET_NAME, Key=key, Body=bytes(buffer), ContentType=content_type
+                )
+            else:
+                if buffer:
+                    await upload.add_part(bytes(buffer))
+                await upload.complete()
+        except BaseException as e:
+            await upload.abort()
+            if isinstance(e, UploadTooLarge):
+                raise too_large()
+            raise
+
+    seconds = time.perf_counter() - started
+    if existing is None:
+        s3_connection.bytes_total += size
+        record_upload("stream", size, seconds)
+    part_seconds = upload.part_seconds
+    return {
+        "file_url": existing or s3_connection.object_url(key),
+        "sha256": digest.hexdigest(),
+        "deduplicated": existing is not None,
+        "size": size,
+        "parts": len(part_seconds) or 1,
+        "seconds": round(seconds, 3),
+        "throughput_mb_s": round(size / MIB / seconds, 3) if seconds else None,
+        "first_byte_seconds": round(first_byte, 3) if first_byte is not None else None,
+        "part_seconds_max": round(max(part_seconds), 3) if part_seconds else None,
+        "part_seconds_avg": round(sum(part_seconds) / len(part_seconds), 3) if part_seconds else None,
+    }
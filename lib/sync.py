@@ -0,0 +1,165 @@
+import base64
+import binascii
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from prisma import Prisma
+
+from lib.translation import project_translations, translations_include
+
+load_dotenv(override=True)
+
+DEFAULT_SYNC_LIMIT = 200
+MAX_SYNC_LIMIT = 1000
+# Rows committed within this window may still be in flight in other
+# transactions; they are left for the next round so none are skipped.
+SYNC_SAFETY_SECONDS = float(os.getenv("SYNC_SAFETY_SECONDS", "2"))
+
+# Phases of one sync round: (kind, Prisma delegate), then the tombstones
+PHASES = [
+    ("gonpa", "gonpa"),
+    ("festival", "festival"),
+    ("statue", "statue"),
+    ("pilgrim", "pilgrimsite"),
+    ("contact", "contact"),
+    ("tombstone", "tombstone"),
+]
+
+
+async def record_deletion(client: Any, entity_type: str, entity_id: str, language_code: Optional[str] = None) -> None:
+    """Leave a tombstone for a hard delete; call it inside the deleting transaction."""
+    data: Dict[str, Any] = {"entityType": entity_type, "entityId": entity_id}
+    if language_code is not None:
+        data["languageCode"] = language_code
+    await client.tombstone.create(data=data)
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def encode_token(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(since: Optional[str]) -> Dict[str, Any]:
+    """Read ``since``: empty for a full sync, an ISO timestamp, or a token from a previous response."""
+    state: Dict[str, Any] = {"since": None, "upto": None, "phase": 0, "after": None}
+    if not since:
+        return state
+    try:
+        state["since"] = _parse_time(since).isoformat()
+        return state
+    except ValueError:
+        pass
+    try:
+        padded = since + "=" * (-len(since) % 4)
+        decoded = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        state.update({key: decoded[key] for key in state})
+        for key in ("since", "upto"):
+            if state[key] is not None:
+                _parse_time(state[key])
+        if not 0 <= int(state["phase"]) < len(PHASES):
+            raise ValueError(state["phase"])
+        if state["after"] is not None:
+            _parse_time(state["after"][0])
+    except (binascii.Error, ValueError, TypeError, KeyError, IndexError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return state
+
+
+def _window(field: str, since: Optional[datetime], upto: datetime, after: Optional[List[str]]) -> Dict[str, Any]:
+    conditions: List[Dict[str, Any]] = [{field: {"lte": upto}}]
+    if since is not None:
+        conditions.append({field: {"gt": since}})
+    if after is not None:
+        after_time, after_id = _parse_time(after[0]), after[1]
+        conditions.append({
+            "OR": [
+                {field: {"gt": after_time}},
+                {field: after_time, "id": {"gt": after_id}},
+            ]
+        })
+    return {"AND": conditions}
+
+
+def _tombstone_data(tombstone: Any) -> Dict[str, Any]:
+    return {
+        "type": tombstone.entityType,
+        "id": tombstone.entityId,
+        "languageCode": tombstone.languageCode,
+        "deletedAt": tombstone.deletedAt,
+    }
+
+
+async def changes_since(db: Prisma, since: Optional[str], limit: int, languages: List[str]) -> Dict[str, Any]:
+    """One page of the change feed: rows with since < updatedAt <= upto, kind by kind, then tombstones.
+
+    Each kind is walked in (updatedAt, id) order. ``upto`` is fixed when a
+    round starts and carried in the token, so paging through a round never
+    skips or repeats a row; the last page's token starts the next round at
+    ``upto``. A full sync (no ``since``) has nothing to delete and skips the
+    tombstones.
+    """
+    state = decode_token(since)
+    if state["upto"] is None:
+        upto = datetime.now(timezone.utc) - timedelta(seconds=SYNC_SAFETY_SECONDS)
+        state["upto"] = upto.isoformat()
+    since_time = _parse_time(state["since"]) if state["since"] else None
+    upto_time = _parse_time(state["upto"])
+
+    changes: Dict[str, List[Any]] = {kind: [] for kind, _ in PHASES[:-1]}
+    tombstones: List[Dict[str, Any]] = []
+    phase, after = int(state["phase"]), state["after"]
+    remaining = limit
+    while phase < len(PHASES) and remaining > 0:
+        kind, delegate_name = PHASES[phase]
+        if kind == "tombstone":
+            if since_time is None:
+                phase += 1
+                continue
+            field, query = "deletedAt", {}
+        else:
+            field = "updatedAt"
+            query = {"include": {"translations": translations_include(languages)}}
+
+        rows = await getattr(db, delegate_name).find_many(
+            where=_window(field, since_time, upto_time, after),
+            order=[{field: "asc"}, {"id": "asc"}],
+            take=remaining + 1,
+            **query,
+        )
+        more = len(rows) > remaining
+        rows = rows[:remaining]
+        remaining -= len(rows)
+        if kind == "tombstone":
+            tombstones.extend(_tombstone_data(row) for row in rows)
+        else:
+            changes[kind].extend(project_translations(row, languages) for row in rows)
+
+        if more:
+            last = rows[-1]
+            after = [getattr(last, field).isoformat(), last.id]
+            break
+        phase, after = phase + 1, None
+
+    has_more = phase < len(PHASES)
+    if has_more:
+        next_state = {"since": state["since"], "upto": state["upto"], "phase": phase, "after": after}
+    else:
+        next_state = {"since": state["upto"], "upto": None, "phase": 0, "after": None}
+    return {
+        "changes": changes,
+        "tombstones": tombstones,
+        "next": encode_token(next_state),
+        "has_more": has_more,
+        "upto": upto_time,
+    }
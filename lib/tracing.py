@@ -0,0 +1,127 @@
+"""Per-request query traces: a Server-Timing header and a round-trip budget.
+
+The queries come from the request's `RequestStats`, filled in by the
+instrumented Prisma client (lib/metrics.py). Queries that overlap in time
+(``asyncio.gather``) count as one round trip, since the request waits on
+them once; the budget is about how many times it waits in sequence.
+"""
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+from dotenv import load_dotenv
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from lib.metrics import UNMATCHED, current_request_stats
+
+load_dotenv(override=True)
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+# Sequential database round trips a request may make before a warning is logged; 0 turns the check off
+DB_ROUND_TRIP_BUDGET = int(os.getenv("DB_ROUND_TRIP_BUDGET", "6"))
+# Times one model/operation may run in a request before it is reported as a likely N+1
+DB_REPEATED_QUERY_LIMIT = int(os.getenv("DB_REPEATED_QUERY_LIMIT", "5"))
+# Per-route budgets, e.g. "POST /gonpa/bulk=0,PUT /gonpa/{gonpa_id}=4"
+DB_ROUND_TRIP_BUDGETS: Dict[str, int] = {
+    route.strip(): int(budget)
+    for route, _, budget in (
+        item.rpartition("=") for item in os.getenv("DB_ROUND_TRIP_BUDGETS", "").split(",") if "=" in item
+    )
+}
+
+# Server-Timing entries beyond the slowest few are folded into the db total only
+_TIMING_ENTRIES = 8
+
+Query = Tuple[str, str, float, float]
+
+
+def round_trips(queries: Sequence[Query]) -> int:
+    """Number of sequential waits: overlapping queries share one."""
+    trips = 0
+    wave_end = float("-inf")
+    for _, _, start, end in sorted(queries, key=lambda query: query[2]):
+        if start >= wave_end:
+            trips += 1
+            wave_end = end
+        else:
+            wave_end = max(wave_end, end)
+    return trips
+
+
+def query_summary(queries: Sequence[Query]) -> Dict[str, Tuple[int, float]]:
+    """``model.operation`` -> (count, total seconds)."""
+    summary: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+    for model, operation, start, end in queries:
+        entry = summary[f"{model}.{operation}"]
+        entry[0] += 1
+        entry[1] += end - start
+    return {name: (int(count), seconds) for name, (count, seconds) in summary.items()}
+
+
+def server_timing(queries: Sequence[Query], elapsed: float) -> str:
+    """Server-Timing value: database total, the slowest query kinds and the time to the response start."""
+    summary = query_summary(queries)
+    db_seconds = sum(seconds for _, seconds in summary.values())
+    entries = [
+        f'db;dur={db_seconds * 1000:.1f};desc="{len(queries)} queries, {round_trips(queries)} round trips"'
+    ]
+    slowest = sorted(summary.items(), key=lambda item: item[1][1], reverse=True)[:_TIMING_ENTRIES]
+    entries += [f'{name};dur={seconds * 1000:.1f};desc="x{count}"' for name, (count, seconds) in slowest]
+    entries.append(f"app;dur={elapsed * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def check_budget(method: str, route: str, queries: Sequence[Query]) -> None:
+    """Log a warning when a request waited on the database too often or repeated one query too many times."""
+    budget = DB_ROUND_TRIP_BUDGETS.get(f"{method} {route}", DB_ROUND_TRIP_BUDGET)
+    if budget <= 0 or not queries:
+        return
+    trips = round_trips(queries)
+    summary = query_summary(queries)
+    if trips > budget:
+        logger.warning(
+            "%s %s made %d sequential database round trips (budget %d): %s",
+            method, route, trips, budget,
+            ", ".join(f"{name} x{count}" for name, (count, _) in summary.items()),
+        )
+    for name, (count, _) in summary.items():
+        if count >= DB_REPEATED_QUERY_LIMIT:
+            logger.warning("%s %s ran %s %d times in one request; likely an N+1 query", method, route, name, count)
+
+
+class TracingMiddleware:
+    """Add a Server-Timing header with the request's queries and enforce the round-trip budget.
+
+    Runs inside `MetricsMiddleware`, which starts the request's stats. Only
+    queries made before the response starts can appear in the header; the
+    budget check at the end sees all of them.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stats = current_request_stats() if scope["type"] == "http" else None
+        if stats is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and SERVER_TIMING:
+                headers = MutableHeaders(raw=message["headers"])
+                headers.append("Server-Timing", server_timing(stats.queries, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # FastAPI puts the matched route in the scope, so the template costs nothing here
+            route = getattr(scope.get("route"), "path", UNMATCHED)
+            check_budget(scope["method"], route, stats.queries)
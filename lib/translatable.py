@@ -0,0 +1,247 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from prisma import Prisma
+from prisma.errors import ForeignKeyViolationError, UniqueViolationError
+
+from lib.conditional import TABLES
+from lib.ids import new_id
+from lib.media import image_variants
+from lib.sync import record_deletion
+
+
+class Translatable(NamedTuple):
+    label: str
+    delegate: str
+    translation_delegate: str
+    foreign_key: str
+    fields: Tuple[str, ...]  # translation content columns
+    required: Tuple[str, ...]  # needed to create a translation
+    include: Dict[str, Any]  # what a write returns
+
+
+_TEXT_FIELDS = ("name", "description", "description_audio")
+
+TRANSLATABLES: Dict[str, Translatable] = {
+    "gonpa": Translatable(
+        "Gonpa", "gonpa", "gonpatranslation", "gonpaId", _TEXT_FIELDS, _TEXT_FIELDS,
+        {"translations": True, "contact": True},
+    ),
+    "festival": Translatable(
+        "Festival", "festival", "festivaltranslation", "festivalId", _TEXT_FIELDS, _TEXT_FIELDS,
+        {"translations": True},
+    ),
+    "statue": Translatable(
+        "Statue", "statue", "statuetranslation", "statueId", _TEXT_FIELDS, _TEXT_FIELDS,
+        {"translations": True},
+    ),
+    "pilgrim": Translatable(
+        "Pilgrim site", "pilgrimsite", "pilgrimsitetranslation", "pilgrimSiteId", _TEXT_FIELDS, _TEXT_FIELDS,
+        {"translations": True, "contact": True},
+    ),
+    "contact": Translatable(
+        "Contact", "contact", "contacttranslation", "contactId",
+        ("address", "city", "state", "postal_code", "country"),
+        ("address", "city", "state", "country"),
+        {"translations": True},
+    ),
+}
+
+
+def translation_key(spec: Translatable, entity_id: str, language_code: str) -> Dict[str, Any]:
+    """Where clause on the translation's ``@@unique([<parent>Id, languageCode])`` key."""
+    return {f"{spec.foreign_key}_languageCode": {spec.foreign_key: entity_id, "languageCode": language_code}}
+
+
+def _parent_changes(existing: Any, values: Dict[str, Any]) -> Dict[str, Any]:
+    changes = {key: value for key, value in values.items() if getattr(existing, key, None) != value}
+    # Relations are written through the relation field, not the scalar key
+    if "contactId" in changes:
+        contact_id = changes.pop("contactId")
+        changes["contact"] = {"connect": {"id": contact_id}} if contact_id else {"disconnect": True}
+    return changes
+
+
+def _translation_ops(
+    spec: Translatable,
+    existing: List[Any],
+    translations: Optional[List[Dict[str, Any]]],
+    replace: bool,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[str]]:
+    """Per-language diff: (creates, updates, removed language codes).
+
+    Each create and update keeps its ``languageCode``; updates only carry the
+    fields whose value actually changed.
+    """
+    if translations is None:
+        return [], [], []
+    if replace and not translations:
+        raise HTTPException(status_code=400, detail=f"{spec.label} must have at least one translation")
+    codes = [t["languageCode"] for t in translations]
+    if len(set(codes)) != len(codes):
+        raise HTTPException(status_code=400, detail="More than one translation for the same language")
+
+    current = {t.languageCode: t for t in existing}
+    creates, updates = [], []
+    for translation in translations:
+        code = translation["languageCode"]
+        fields = {key: translation[key] for key in spec.fields if key in translation}
+        if code in current:
+            changed = {key: value for key, value in fields.items() if getattr(current[code], key) != value}
+            if changed:
+                updates.append({"languageCode": code, **changed})
+        else:
+            missing = [key for key in spec.required if fields.get(key) is None]
+            if missing:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Translation for language {code} is new and needs: {', '.join(missing)}"
+                )
+            creates.append({"languageCode": code, **fields})
+
+    removed = [code for code in current if code not in codes] if replace else []
+    return creates, updates, removed
+
+
+async def update_translatable(
+    db: Prisma,
+    kind: str,
+    entity_id: str,
+    values: Dict[str, Any],
+    translations: Optional[List[Dict[str, Any]]] = None,
+    replace: bool = False,
+) -> Any:
+    """Apply only what changed to an entity and its translations, in one transaction.
+
+    ``values`` holds the parent columns to set. ``translations`` (when not
+    None) are upserted by language on the ``@@unique`` key; with ``replace``
+    they are the complete set and languages left out are deleted, with
+    tombstones for offline sync. A request that changes nothing writes nothing.
+    """
+    spec = TRANSLATABLES[kind]
+    existing = await getattr(db, spec.delegate).find_unique(where={"id": entity_id}, include=spec.include)
+    if not existing:
+        raise HTTPException(status_code=404, detail=f"{spec.label} not found")
+
+    changes = _parent_changes(existing, values)
+    if "image" in changes:
+        changes.update(await image_variants(db, changes["image"]))
+    creates, updates, removed = _translation_ops(spec, existing.translations or [], translations, replace)
+    if not (changes or creates or updates or removed):
+        return existing
+
+    async with db.tx() as tx:
+        translation_delegate = getattr(tx, spec.translation_delegate)
+        for create in creates:
+            code = create["languageCode"]
+            fields = {key: value for key, value in create.items() if key != "languageCode"}
+            # Upsert so a translation added concurrently is updated instead of failing
+            await translation_delegate.upsert(
+                where=translation_key(spec, entity_id, code),
+                data={
+                    "create": {spec.foreign_key: entity_id, "languageCode": code, **fields},
+                    "update": fields,
+                },
+            )
+        for update in updates:
+            code = update["languageCode"]
+            await translation_delegate.update(
+                where=translation_key(spec, entity_id, code),
+                data={key: value for key, value in update.items() if key != "languageCode"},
+            )
+        if removed:
+            await translation_delegate.delete_many(
+                where={spec.foreign_key: entity_id, "languageCode": {"in": removed}}
+            )
+            for code in removed:
+                await record_deletion(tx, kind, entity_id, code)
+
+        # Always touch updatedAt: translation edits must move list ETags and the sync feed too
+        return await getattr(tx, spec.delegate).update(
+            where={"id": entity_id},
+            data={**changes, "updatedAt": datetime.now(timezone.utc)},
+            include=spec.include,
+        )
+
+
+async def add_translation(db: Prisma, kind: str, entity_id: str, translation: Dict[str, Any]) -> Any:
+    """Create one translation and touch the parent in a single nested update.
+
+    The constraints do the checking: a missing parent makes the update return
+    None (404), an existing language trips the unique key (409) and an unknown
+    language the foreign key (404).
+    """
+    spec = TRANSLATABLES[kind]
+    code = translation["languageCode"]
+    fields = {key: translation[key] for key in spec.fields if key in translation}
+    try:
+        parent = await getattr(db, spec.delegate).update(
+            where={"id": entity_id},
+            data={
+                "updatedAt": datetime.now(timezone.utc),
+                "translations": {"create": {"languageCode": code, **fields}},
+            },
+            include={"translations": {"where": {"languageCode": code}}},
+        )
+    except UniqueViolationError:
+        raise HTTPException(status_code=409, detail=f"Translation for language {code} already exists")
+    except ForeignKeyViolationError:
+        raise HTTPException(status_code=404, detail=f"Language {code} not found")
+    if parent is None:
+        raise HTTPException(status_code=404, detail=f"{spec.label} not found")
+    return parent.translations[0]
+
+
+async def delete_translation(db: Prisma, kind: str, entity_id: str, language_code: str) -> Dict[str, Any]:
+    """Delete one translation unless it is the entity's last, in a single statement.
+
+    The statement first locks every translation of the entity in id order, so
+    concurrent deletes on the same entity queue up instead of each seeing the
+    other's row and leaving it with none. The same statement touches the
+    parent and writes the sync tombstone (Postgres runs data-modifying CTEs
+    whether or not the final SELECT reads them).
+    """
+    spec = TRANSLATABLES[kind]
+    table, translation_table, foreign_key, _ = TABLES[kind]
+    row = await db.query_first(
+        f"""
+        WITH locked AS (
+            SELECT "id", "languageCode" FROM "{translation_table}"
+            WHERE "{foreign_key}" = $1
+            ORDER BY "id"
+            FOR UPDATE
+        ), deleted AS (
+            DELETE FROM "{translation_table}" t
+            WHERE t."id" IN (SELECT "id" FROM locked WHERE "languageCode" = $2)
+              AND (SELECT COUNT(*) FROM locked) > 1
+            RETURNING t.*
+        ), touched AS (
+            UPDATE "{table}" SET "updatedAt" = now() AT TIME ZONE 'UTC'
+            WHERE "id" = $1 AND EXISTS (SELECT 1 FROM deleted)
+            RETURNING "id"
+        ), tombstone AS (
+            INSERT INTO "Tombstone" ("id", "entityType", "entityId", "languageCode", "deletedAt")
+            SELECT $3, $4, $1, $2, now() AT TIME ZONE 'UTC' FROM deleted
+            RETURNING "id"
+        )
+        SELECT
+            EXISTS (SELECT 1 FROM "{table}" WHERE "id" = $1) AS "parentFound",
+            EXISTS (SELECT 1 FROM locked WHERE "languageCode" = $2) AS "found",
+            (SELECT row_to_json(deleted) FROM deleted) AS "translation"
+        """,
+        entity_id,
+        language_code,
+        new_id(),
+        kind,
+    )
+    if not row["parentFound"]:
+        raise HTTPException(status_code=404, detail=f"{spec.label} not found")
+    if not row["found"]:
+        raise HTTPException(status_code=404, detail=f"Translation for language {language_code} not found")
+    if row["translation"] is None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Cannot delete the last translation. {spec.label} must have at least one translation"
+        )
+    return row["translation"]
@@ -0,0 +1,60 @@
+from typing import Any, Dict, List, Optional, Union
+
+from fastapi import Query
+
+
+def language_preference(
+    lang: Optional[str] = Query(
+        None,
+        description="Comma separated language codes in order of preference, e.g. bo,en",
+    )
+) -> List[str]:
+    return parse_lang(lang)
+
+
+def parse_lang(lang: Optional[str]) -> List[str]:
+    """Turn "bo, en,bo" into ["bo", "en"], keeping the order of preference."""
+    if not lang:
+        return []
+    languages: List[str] = []
+    for code in lang.split(","):
+        code = code.strip()
+        if code and code not in languages:
+            languages.append(code)
+    return languages
+
+
+def translations_include(languages: List[str]) -> Union[bool, Dict[str, Any]]:
+    """Nested include that only loads the translations the client may receive."""
+    if not languages:
+        return True
+    return {"where": {"languageCode": {"in": languages}}}
+
+
+def pick_translation(translations: Optional[List[Any]], languages: List[str]) -> Optional[List[Any]]:
+    """Keep the single translation that ranks highest in the fallback chain."""
+    if not languages or translations is None:
+        return translations
+    by_language = {t.languageCode: t for t in translations}
+    for code in languages:
+        if code in by_language:
+            return [by_language[code]]
+    return []
+
+
+def project_translations(entity: Any, languages: List[str]) -> Any:
+    """Reduce an entity (and its contact, if loaded) to one translation per the fallback chain."""
+    if entity is None or not languages:
+        return entity
+    entity.translations = pick_translation(entity.translations, languages)
+    contact = getattr(entity, "contact", None)
+    if contact is not None:
+        contact.translations = pick_translation(contact.translations, languages)
+    return entity
+
+
+def project_page(page: Dict[str, Any], languages: List[str]) -> Dict[str, Any]:
+    if languages:
+        for entity in page["items"]:
+            project_translations(entity, languages)
+    return page
@@ -0,0 +1,509 @@
+"""Drive mixed read/write traffic at the API and report latency percentiles per route.
+
+    python -m loadtest.run [--url URL] [--duration 60] [--concurrency 32] [--out results.json]
+                           [--baseline previous.json] [--threshold 0.2]
+
+Without --url the app is started from main.py with uvicorn, using the
+settings in loadtest/loadtest.env (the local Postgres and MinIO of
+docker-compose.yml), and stopped afterwards. The database must already be
+migrated and seeded; run.sh does the whole sequence.
+
+Traffic is closed-loop: each of --concurrency workers sends its next
+request as soon as the previous one finishes, picking the route by the
+weights in SCENARIOS (about 85% reads, some conditional, and 15% writes and
+uploads). Requests in the first --warmup seconds are not counted. Before
+the run, every scenario is tried once and any that fails stops it.
+
+The report (JSON, one entry per route template) has count, errors,
+throughput and p50/p95/p99/mean/max latency in milliseconds, plus the git
+commit and settings of the run. With --baseline, routes whose p95 grew by
+more than --threshold are listed and the exit status is 1.
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from PIL import Image, ImageDraw
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ENV_FILE = Path(__file__).resolve().parent / "loadtest.env"
+
+LANGS = [None, None, "en", "bo", "bo,en"]
+BUNDLE_LANGS = ["en", "bo", "bo,en"]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.counting = False
+
+    def record(self, route: str, seconds: float, status: int) -> None:
+        if not self.counting:
+            return
+        self.latencies[route].append(seconds * 1000)
+        self.statuses[route][str(status)] += 1
+        if status >= 400:
+            self.errors[route] += 1
+
+    def report(self, seconds: float) -> Dict[str, Any]:
+        routes = {}
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            routes[route] = {
+                "count": len(values),
+                "errors": self.errors[route],
+                "rps": round(len(values) / seconds, 2),
+                "p50_ms": round(percentile(values, 0.50), 2),
+                "p95_ms": round(percentile(values, 0.95), 2),
+                "p99_ms": round(percentile(values, 0.99), 2),
+                "mean_ms": round(sum(values) / len(values), 2),
+                "max_ms": round(values[-1], 2),
+                "status": dict(self.statuses[route]),
+            }
+        total = sum(route["count"] for route in routes.values())
+        every = sorted(value for values in self.latencies.values() for value in values)
+        return {
+            "totals": {
+                "requests": total,
+                "errors": sum(route["errors"] for route in routes.values()),
+                "rps": round(total / seconds, 2),
+                "p50_ms": round(percentile(every, 0.50), 2),
+                "p95_ms": round(percentile(every, 0.95), 2),
+                "p99_ms": round(percentile(every, 0.99), 2),
+            },
+            "routes": routes,
+        }
+
+
+class Catalog:
+    """Ids to address, read from the list routes before the run and grown by the writes."""
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+        self.ids: Dict[str, List[str]] = defaultdict(list)
+        self.contact_ids: List[str] = []
+        self.etags: Dict[str, str] = {}
+        self.images = [_image(rng, i) for i in range(16)]
+
+    async def load(self, client: httpx.AsyncClient, per_kind: int = 500) -> None:
+        for kind in ("gonpa", "festival", "statue", "pilgrim"):
+            cursor = None
+            while len(self.ids[kind]) < per_kind:
+                params = {"limit": 100, **({"cursor": cursor} if cursor else {})}
+                page = (await client.get(f"/{kind}/", params=params)).raise_for_status().json()
+                self.ids[kind] += [item["id"] for item in page["items"]]
+                for item in page["items"]:
+                    contact_id = item.get("contactId")
+                    if contact_id and contact_id not in self.contact_ids:
+                        self.contact_ids.append(contact_id)
+                cursor = page.get("next_cursor")
+                if not cursor:
+                    break
+        missing = [kind for kind in ("gonpa", "festival", "statue", "pilgrim") if not self.ids[kind]]
+        if missing or not self.contact_ids:
+            raise SystemExit(f"No {', '.join(missing) or 'contacts'} to address; seed the database first (loadtest/seed_catalog.py)")
+
+    def pick(self, kind: str) -> str:
+        return self.rng.choice(self.ids[kind])
+
+
+def _image(rng: random.Random, index: int) -> bytes:
+    image = Image.new("RGB", (800, 600), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(800), rng.randrange(600)
+        draw.rectangle([x, y, x + rng.randrange(20, 200), y + rng.randrange(20, 200)],
+                       fill=tuple(rng.randrange(256) for _ in range(3)))
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+
+def _lang(rng: random.Random) -> Dict[str, str]:
+    lang = rng.choice(LANGS)
+    return {"lang": lang} if lang else {}
+
+
+def _translation(rng: random.Random, code: str, name: str) -> Dict[str, Any]:
+    return {
+        "languageCode": code,
+        "name": name,
+        "description": " ".join(rng.choice(("lama", "valley", "stupa", "assembly", "prayer", "river")) for _ in range(150)),
+        "description_audio": f"https://example.com/audio/{name.replace(' ', '-')}-{code}.mp3",
+    }
+
+
+Response = Tuple[str, httpx.Response]
+
+
+async def _get(client: httpx.AsyncClient, catalog: Catalog, route: str, url: str, params: Dict[str, Any]) -> Response:
+    """GET that revalidates a copy it has seen before a third of the time, as caching clients do."""
+    key = f"{url}?{sorted(params.items())}"
+    headers = {}
+    if key in catalog.etags and catalog.rng.random() < 0.3:
+        headers["If-None-Match"] = catalog.etags[key]
+    response = await client.get(url, params=params, headers=headers)
+    if "etag" in response.headers:
+        catalog.etags[key] = response.headers["etag"]
+    return route, response
+
+
+async def list_gonpas(client, catalog, rng):
+    return await _get(client, catalog, "GET /gonpa/", "/gonpa/", {"limit": 20, **_lang(rng)})
+
+
+async def get_gonpa(client, catalog, rng):
+    return await _get(client, catalog, "GET /gonpa/{gonpa_id}", f"/gonpa/{catalog.pick('gonpa')}", _lang(rng))
+
+
+async def nearby_gonpas(client, catalog, rng):
+    params = {"lat": round(rng.uniform(26.5, 35.5), 4), "lon": round(rng.uniform(76, 97), 4), "radius": 100}
+    return "GET /gonpa/nearby", await client.get("/gonpa/nearby", params=params)
+
+
+async def list_festivals(client, catalog, rng):
+    params: Dict[str, Any] = {"limit": 20, **_lang(rng)}
+    if rng.random() < 0.5:
+        start = datetime.now(timezone.utc).date() + timedelta(days=rng.randint(-60, 300))
+        params.update({"from": start.isoformat(), "to": (start + timedelta(days=30)).isoformat()})
+    return await _get(client, catalog, "GET /festival/", "/festival/", params)
+
+
+async def upcoming_festivals(client, catalog, rng):
+    return await _get(client, catalog, "GET /festival/upcoming", "/festival/upcoming", {"limit": 20, **_lang(rng)})
+
+
+async def get_festival(client, catalog, rng):
+    return await _get(client, catalog, "GET /festival/{festival_id}", f"/festival/{catalog.pick('festival')}", _lang(rng))
+
+
+async def list_statues(client, catalog, rng):
+    return await _get(client, catalog, "GET /statue/", "/statue/", {"limit": 20, **_lang(rng)})
+
+
+async def get_statue(client, catalog, rng):
+    return await _get(client, catalog, "GET /statue/{statue_id}", f"/statue/{catalog.pick('statue')}", _lang(rng))
+
+
+async def list_pilgrim_sites(client, catalog, rng):
+    return await _get(client, catalog, "GET /pilgrim/", "/pilgrim/", {"limit": 20, **_lang(rng)})
+
+
+async def get_pilgrim_site(client, catalog, rng):
+    return await _get(client, catalog, "GET /pilgrim/{site_id}", f"/pilgrim/{catalog.pick('pilgrim')}", _lang(rng))
+
+
+async def get_contact(client, catalog, rng):
+    contact_id = rng.choice(catalog.contact_ids)
+    return await _get(client, catalog, "GET /contact/{contact_id}", f"/contact/{contact_id}", _lang(rng))
+
+
+SEARCH_TERMS = ["monastery", "lama lineage", "stupa", "festival mask dances", "Gonpa 12", "valley river", "དགོན་པ"]
+
+
+async def search(client, catalog, rng):
+    params = {"q": rng.choice(SEARCH_TERMS), "limit": 20, **_lang(rng)}
+    if rng.random() < 0.3:
+        params["types"] = rng.choice(["gonpa", "festival", "statue,pilgrim"])
+    return "GET /search/", await client.get("/search/", params=params)
+
+
+async def bundle_manifest(client, catalog, rng):
+    return "GET /bundle/{lang}/manifest", await client.get(f"/bundle/{rng.choice(BUNDLE_LANGS)}/manifest")
+
+
+async def bundle_file(client, catalog, rng):
+    lang = rng.choice(BUNDLE_LANGS)
+    return await _get(client, catalog, "GET /bundle/{lang}", f"/bundle/{lang}", {})
+
+
+async def sync_changes(client, catalog, rng):
+    # Mostly the incremental sync of a client that was online recently, sometimes a full one
+    params: Dict[str, Any] = {"limit": 200, **_lang(rng)}
+    if rng.random() < 0.9:
+        params["since"] = (datetime.now(timezone.utc) - timedelta(minutes=rng.randint(1, 120))).isoformat()
+    return "GET /sync/changes", await client.get("/sync/changes", params=params)
+
+
+async def create_gonpa(client, catalog, rng):
+    name = f"Loadtest gonpa {rng.randrange(10 ** 9)}"
+    response = await client.post("/gonpa/", json={
+        "image": "https://example.com/images/loadtest.jpg",
+        "geo_location": f"{rng.uniform(26.5, 35.5):.5f},{rng.uniform(76, 97):.5f}",
+        "sect": rng.choice(["NYINGMA", "KAGYU", "SAKYA", "GELUG"]),
+        "type": rng.choice(["MONASTERY", "NUNNERY", "TEMPLE"]),
+        "contactId": rng.choice(catalog.contact_ids),
+        "translations": [_translation(rng, "en", name), _translation(rng, "bo", name)],
+    })
+    if response.status_code == 200:
+        catalog.ids["gonpa"].append(response.json()["id"])
+    return "POST /gonpa/", response
+
+
+async def patch_gonpa(client, catalog, rng):
+    body = {"translations": [{"languageCode": "en", "description": f"Updated {rng.randrange(10 ** 9)}"}]}
+    return "PATCH /gonpa/{gonpa_id}", await client.patch(f"/gonpa/{catalog.pick('gonpa')}", json=body)
+
+
+async def create_festival(client, catalog, rng):
+    start = datetime.now(timezone.utc) + timedelta(days=rng.randint(1, 365))
+    name = f"Loadtest festival {rng.randrange(10 ** 9)}"
+    response = await client.post("/festival/", json={
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=rng.randint(0, 4))).isoformat(),
+        "image": "https://example.com/images/loadtest.jpg",
+        "recurrence": rng.choice(["NONE", "NONE", "YEARLY", "YEARLY_LUNAR"]),
+        "translations": [_translation(rng, "en", name)],
+    })
+    if response.status_code == 200:
+        catalog.ids["festival"].append(response.json()["id"])
+    return "POST /festival/", response
+
+
+async def patch_festival(client, catalog, rng):
+    body = {"image": f"https://example.com/images/festival-{rng.randrange(10 ** 6)}.jpg"}
+    return "PATCH /festival/{festival_id}", await client.patch(f"/festival/{catalog.pick('festival')}", json=body)
+
+
+async def patch_statue(client, catalog, rng):
+    body = {"translations": [{"languageCode": "bo", "description": f"Updated {rng.randrange(10 ** 9)}"}]}
+    return "PATCH /statue/{statue_id}", await client.patch(f"/statue/{catalog.pick('statue')}", json=body)
+
+
+async def patch_pilgrim_site(client, catalog, rng):
+    body = {"image": f"https://example.com/images/pilgrim-{rng.randrange(10 ** 6)}.jpg"}
+    return "PATCH /pilgrim/{site_id}", await client.patch(f"/pilgrim/{catalog.pick('pilgrim')}", json=body)
+
+
+async def create_contact(client, catalog, rng):
+    response = await client.post("/contact/", json={
+        "email": f"loadtest{rng.randrange(10 ** 9)}@example.com",
+        "phone_number": f"+975 17 {rng.randint(100000, 999999)}",
+        "translations": [{"languageCode": "en", "address": "1 Dzong Road", "city": "Paro",
+                          "state": "Paro", "postal_code": "12001", "country": "Bhutan"}],
+    })
+    if response.status_code == 200:
+        catalog.contact_ids.append(response.json()["id"])
+    return "POST /contact/", response
+
+
+async def patch_contact(client, catalog, rng):
+    body = {"phone_number": f"+975 17 {rng.randint(100000, 999999)}"}
+    return "PATCH /contact/{contact_id}", await client.patch(f"/contact/{rng.choice(catalog.contact_ids)}", json=body)
+
+
+async def upload_form(client, catalog, rng):
+    # A small pool of images, so repeats exercise the content-hash deduplication
+    files = {"file": ("photo.jpg", rng.choice(catalog.images), "image/jpeg")}
+    return "POST /api/upload/", await client.post("/api/upload/", files=files)
+
+
+async def upload_stream(client, catalog, rng):
+    response = await client.post(
+        "/api/upload/stream",
+        params={"filename": "photo.jpg"},
+        content=rng.choice(catalog.images),
+        headers={"Content-Type": "image/jpeg"},
+    )
+    return "POST /api/upload/stream", response
+
+
+Scenario = Callable[[httpx.AsyncClient, Catalog, random.Random], Awaitable[Response]]
+
+SCENARIOS: List[Tuple[Scenario, int]] = [
+    (list_gonpas, 12), (get_gonpa, 14), (nearby_gonpas, 5),
+    (list_festivals, 5), (upcoming_festivals, 6), (get_festival, 6),
+    (list_statues, 5), (get_statue, 7),
+    (list_pilgrim_sites, 4), (get_pilgrim_site, 5),
+    (get_contact, 4),
+    (search, 4), (bundle_manifest, 1), (bundle_file, 1), (sync_changes, 2),
+    (create_gonpa, 2), (patch_gonpa, 3), (create_festival, 1), (patch_festival, 1),
+    (patch_statue, 2), (patch_pilgrim_site, 1), (create_contact, 1), (patch_contact, 1),
+    (upload_form, 1), (upload_stream, 1),
+]
+
+
+async def worker(client: httpx.AsyncClient, catalog: Catalog, recorder: Recorder, rng: random.Random, deadline: float) -> None:
+    scenarios, weights = zip(*SCENARIOS)
+    while time.monotonic() < deadline:
+        scenario = rng.choices(scenarios, weights)[0]
+        started = time.perf_counter()
+        try:
+            route, response = await scenario(client, catalog, rng)
+            status = response.status_code
+        except httpx.HTTPError:
+            route, status = f"{scenario.__name__} (connection error)", 599
+        recorder.record(route, time.perf_counter() - started, status)
+
+
+def _load_env_file(path: Path) -> Dict[str, str]:
+    values = {}
+    for line in path.read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith("#") and "=" in line:
+            key, _, value = line.partition("=")
+            values[key.strip()] = value.strip()
+    return values
+
+
+def start_app(port: int, workers: int) -> subprocess.Popen:
+    # The app calls load_dotenv(override=True), which would replace these settings with a developer's .env
+    if (REPO_ROOT / ".env").exists():
+        raise SystemExit("Move .env out of the repository root first: it would override the load-test settings")
+    env = {**os.environ, **_load_env_file(ENV_FILE)}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=REPO_ROOT,
+        env=env,
+    )
+
+
+async def wait_until_up(client: httpx.AsyncClient, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.head("/check/")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit("The app did not come up")
+
+
+async def smoke(client: httpx.AsyncClient, catalog: Catalog, rng: random.Random) -> None:
+    """Run each scenario once, so a broken route stops the run instead of showing up as errors in the report."""
+    failures = []
+    for scenario, _ in SCENARIOS:
+        route, response = await scenario(client, catalog, rng)
+        if response.status_code >= 400:
+            failures.append(f"{route}: {response.status_code} {response.text[:200]}")
+    if failures:
+        raise SystemExit("Smoke test failed:\n" + "\n".join(failures))
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Routes whose p95 grew by more than ``threshold`` (and 2 ms) against the baseline run."""
+    regressions = []
+    for route, current in report["routes"].items():
+        previous = baseline.get("routes", {}).get(route)
+        if not previous or not previous["p95_ms"]:
+            continue
+        growth = current["p95_ms"] / previous["p95_ms"] - 1
+        if growth > threshold and current["p95_ms"] - previous["p95_ms"] > 2:
+            regressions.append(f"{route}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms (+{growth:.0%})")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> int:
+    server = None
+    url = args.url
+    if url is None:
+        server = start_app(args.port, args.workers)
+        url = f"http://127.0.0.1:{args.port}"
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    headers = {"Accept-Encoding": "br, gzip"}
+    try:
+        async with httpx.AsyncClient(base_url=url, limits=limits, headers=headers, timeout=30) as client:
+            await wait_until_up(client)
+            catalog = Catalog(rng)
+            await catalog.load(client)
+            await smoke(client, catalog, rng)
+
+            started = time.monotonic()
+            deadline = started + args.warmup + args.duration
+            workers = [
+                asyncio.create_task(worker(client, catalog, recorder, random.Random(rng.random()), deadline))
+                for _ in range(args.concurrency)
+            ]
+            await asyncio.sleep(args.warmup)
+            recorder.counting = True
+            measured_from = time.monotonic()
+            await asyncio.gather(*workers)
+            measured = time.monotonic() - measured_from
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "settings": {
+            "url": url, "duration": args.duration, "warmup": args.warmup,
+            "concurrency": args.concurrency, "workers": args.workers, "seed": args.seed,
+        },
+        **recorder.report(measured),
+    }
+
+    out = Path(args.out) if args.out else Path(__file__).resolve().parent / "results" / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+
+    print(f"{'route':36} {'count':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, stats in report["routes"].items():
+        print(f"{route:36} {stats['count']:7} {stats['errors']:5} {stats['rps']:8} "
+              f"{stats['p50_ms']:8} {stats['p95_ms']:8} {stats['p99_ms']:8}")
+    totals = report["totals"]
+    print(f"{'total':36} {totals['requests']:7} {totals['errors']:5} {totals['rps']:8} "
+          f"{totals['p50_ms']:8} {totals['p95_ms']:8} {totals['p99_ms']:8}")
+    print(f"Report written to {out}")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="test an app that is already running instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--duration", type=float, default=60, help="seconds measured")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds before measuring starts")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="report path (default loadtest/results/<time>.json)")
+    parser.add_argument("--baseline", help="earlier report to compare p95 latencies with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p95 growth that counts as a regression")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
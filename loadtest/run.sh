@@ -0,0 +1,28 @@
+#!/usr/bin/env bash
+# Start Postgres and MinIO, migrate and seed a fresh catalog, then run the load test.
+# Arguments are passed to loadtest/run.py, e.g. ./loadtest/run.sh --duration 120 --baseline loadtest/results/main.json
+# Set KEEP_SERVICES=1 to leave the containers running afterwards.
+set -euo pipefail
+
+cd "$(dirname "$0")/.."
+COMPOSE="docker compose -f loadtest/docker-compose.yml"
+
+if [ -f .env ]; then
+    echo "Move .env out of the repository root first: the app loads it with override=True" >&2
+    exit 1
+fi
+
+$COMPOSE up -d --wait postgres minio
+$COMPOSE run --rm minio-bucket
+if [ -z "${KEEP_SERVICES:-}" ]; then
+    trap '$COMPOSE down -v' EXIT
+fi
+
+set -a
+. loadtest/loadtest.env
+set +a
+
+python -m prisma generate
+python -m prisma migrate deploy
+python -m loadtest.seed_catalog --scale "${SEED_SCALE:-1}"
+python -m loadtest.run "$@"
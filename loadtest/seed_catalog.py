@@ -0,0 +1,140 @@
+"""Seed the load-test database with a catalog shaped like the real one.
+
+    python -m loadtest.seed_catalog [--scale 1.0] [--seed 7]
+
+At scale 1: 300 contacts, 1,500 gonpas, 400 festivals (a third of them
+recurring), 800 statues and 300 pilgrim sites, each with English and Tibetan
+translations of realistic length. Records go through the same bulk importer
+as the /bulk routes. Run from the repository root with the load-test
+environment exported (run.sh does both).
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from Config.connection import prisma_connection
+from lib.bulk import import_records
+
+LANGUAGES = [("en", "English"), ("bo", "Tibetan"), ("dz", "Dzongkha"), ("hi", "Hindi")]
+SECTS = ["NYINGMA", "KAGYU", "SAKYA", "GELUG", "BHON", "JONANG", "OTHER"]
+GONPA_TYPES = ["MONASTERY", "NUNNERY", "TEMPLE"]
+
+# Himalayan bounding box, so /nearby queries find neighbours
+LATITUDES = (26.5, 35.5)
+LONGITUDES = (76.0, 97.0)
+
+_WORDS_EN = (
+    "monastery founded century lama lineage valley river assembly hall prayer wheels stupa "
+    "murals teachings retreat pilgrims festival mask dances ridge village monks nuns library "
+    "scriptures protector chapel courtyard butter lamps incense mountain pass"
+).split()
+_WORDS_BO = "དགོན་པ་ ལོ་རྒྱུས་ བླ་མ་ བརྒྱུད་པ་ ལུང་པ་ ཆུ་བོ་ འདུ་ཁང་ མཆོད་རྟེན་ མ་ཎི་ དུས་ཆེན་ འཆམ་ དཔེ་མཛོད་".split()
+
+
+def _text(rng: random.Random, words: List[str], count: int) -> str:
+    return " ".join(rng.choice(words) for _ in range(count))
+
+
+def _translations(rng: random.Random, kind: str, index: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "languageCode": "en",
+            "name": f"{kind.title()} {index}",
+            "description": _text(rng, _WORDS_EN, rng.randint(80, 400)),
+            "description_audio": f"https://example.com/audio/{kind}-{index}-en.mp3",
+        },
+        {
+            "languageCode": "bo",
+            "name": f"{kind} {index} ཞེས་པ",
+            "description": _text(rng, _WORDS_BO, rng.randint(60, 300)),
+            "description_audio": f"https://example.com/audio/{kind}-{index}-bo.mp3",
+        },
+    ]
+
+
+def _location(rng: random.Random) -> str:
+    return f"{rng.uniform(*LATITUDES):.5f},{rng.uniform(*LONGITUDES):.5f}"
+
+
+async def seed(scale: float, seed_value: int) -> None:
+    rng = random.Random(seed_value)
+    db = prisma_connection.prisma
+    await prisma_connection.connect()
+
+    for code, name in LANGUAGES:
+        await db.language.upsert(where={"code": code}, data={"create": {"code": code, "name": name}, "update": {}})
+
+    contact_ids = []
+    for i in range(int(300 * scale)):
+        contact = await db.contact.create(data={
+            "email": f"contact{i}@example.com",
+            "phone_number": f"+975 17 {rng.randint(100000, 999999)}",
+            "translations": {"create": [
+                {"languageCode": code, "address": f"{i} Monastery Road", "city": "Thimphu",
+                 "state": "Thimphu", "postal_code": "11001", "country": "Bhutan"}
+                for code in ("en", "bo")
+            ]},
+        })
+        contact_ids.append(contact.id)
+
+    gonpas = [
+        {
+            "image": f"https://example.com/images/gonpa-{i}.jpg",
+            "geo_location": _location(rng),
+            "sect": rng.choice(SECTS),
+            "type": rng.choice(GONPA_TYPES),
+            "contactId": rng.choice(contact_ids),
+            "translations": _translations(rng, "gonpa", i),
+        }
+        for i in range(int(1500 * scale))
+    ]
+
+    now = datetime.now(timezone.utc)
+    festivals = []
+    for i in range(int(400 * scale)):
+        start = now + timedelta(days=rng.randint(-400, 400), hours=rng.choice([0, 6, 9]))
+        festivals.append({
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=rng.randint(0, 6))).isoformat(),
+            "image": f"https://example.com/images/festival-{i}.jpg",
+            "recurrence": rng.choice(["NONE", "NONE", "YEARLY", "YEARLY_LUNAR"]) if i % 3 == 0 else "NONE",
+            "translations": _translations(rng, "festival", i),
+        })
+
+    statues = [
+        {"image": f"https://example.com/images/statue-{i}.jpg", "translations": _translations(rng, "statue", i)}
+        for i in range(int(800 * scale))
+    ]
+
+    pilgrim_sites = [
+        {
+            "image": f"https://example.com/images/pilgrim-{i}.jpg",
+            "geo_location": _location(rng),
+            "contactId": rng.choice(contact_ids) if rng.random() < 0.7 else None,
+            "translations": _translations(rng, "pilgrim site", i),
+        }
+        for i in range(int(300 * scale))
+    ]
+
+    for kind, records in (("gonpa", gonpas), ("festival", festivals), ("statue", statues), ("pilgrim", pilgrim_sites)):
+        report = await import_records(db, kind, records)
+        print(f"{kind}: imported {report['imported']} of {report['received']} ({report['failed']} failed)")
+        for error in report["errors"][:5]:
+            print(f"  record {error['index']}: {error['error']}")
+    print(f"contact: created {len(contact_ids)}")
+
+    await prisma_connection.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for every record count")
+    parser.add_argument("--seed", type=int, default=7, help="random seed, for identical catalogs across runs")
+    args = parser.parse_args()
+    asyncio.run(seed(args.scale, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from prisma import Prisma
 import uvicorn
 import os
+import asyncio
 from Config.connection import prisma_connection
+from Config.s3 import s3_connection
+from lib.media import shutdown_media_pool
+from lib.lunar import lunar_table
+from lib.compression import CompressionMiddleware
+from lib.metrics import MetricsMiddleware
+from lib.tracing import TracingMiddleware
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from routes.check import router as check_router
@@ -15,17 +23,26 @@ from routes.user import router as user_router
 from routes.festival import router as festival_router
 from routes.pilgrim import router as pilgrim_router
 from routes.s3 import router as s3Route
+from routes.search import router as search_router
+from routes.bundle import router as bundle_router
+from routes.sync import router as sync_router
+from routes.metrics import router as metrics_router
 
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await prisma_connection.connect()
+    await s3_connection.start()
+    # Build the lunar calendar table before the first festival request needs it
+    await asyncio.to_thread(lunar_table)
     yield
+    shutdown_media_pool()
+    await s3_connection.close()
     await prisma_connection.disconnect()
 
 load_dotenv(override=True)
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 app.add_middleware(
@@ -35,6 +52,11 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods (GET, POST, etc.)
     allow_headers=["*"],  # Allows all headers
 )
+app.add_middleware(CompressionMiddleware)
+# Inside MetricsMiddleware, which collects the request's queries
+app.add_middleware(TracingMiddleware)
+# Outermost, so it times the whole request and sees the bytes actually sent
+app.add_middleware(MetricsMiddleware, routes=app.routes)
 
 
 app.include_router(check_router,prefix='/check',tags=["check"])
@@ -46,6 +68,10 @@ app.include_router(user_router,prefix='/user',tags=["user"])
 app.include_router(festival_router,prefix='/festival',tags=["festival"])
 app.include_router(pilgrim_router,prefix='/pilgrim',tags=["pilgrim"])
 app.include_router(s3Route, prefix="/api/upload",tags=["file upload"])
+app.include_router(search_router,prefix='/search',tags=["search"])
+app.include_router(bundle_router,prefix='/bundle',tags=["offline bundle"])
+app.include_router(sync_router,prefix='/sync',tags=["offline sync"])
+app.include_router(metrics_router,prefix='/metrics',tags=["metrics"])
 
 def get_port():
     """Retrieve the PORT from environment variables, defaulting to 8000 if not set."""
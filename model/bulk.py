@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List
+
+class BulkError(BaseModel):
+    index: int  # position of the record in the input, from 0
+    error: str
+
+class BulkReport(BaseModel):
+    received: int
+    imported: int
+    failed: int
+    errors: List[BulkError]  # the first BULK_MAX_ERRORS failures
+    errors_truncated: bool
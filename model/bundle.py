@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import List
+
+class BundleManifest(BaseModel):
+    version: str  # catalog version, also the bundle's ETag
+    languages: List[str]
+    size: int  # bytes of the gzipped bundle
+    url: str
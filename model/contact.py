@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import datetime
 
 class ContactTranslationBase(BaseModel):
     languageCode: str
@@ -25,4 +26,29 @@ class TranslationUpdate(BaseModel):
 class ContactUpdate(BaseModel):
     email: Optional[str] = None
     phone_number: Optional[str] = None
-    translations: Optional[List[TranslationUpdate]] = None
\ No newline at end of file
+    translations: Optional[List[TranslationUpdate]] = None
+
+
+class ContactTranslationResponse(BaseModel):
+    id: str
+    contactId: str
+    languageCode: str
+    address: str
+    city: str
+    state: str
+    postal_code: Optional[str] = None
+    country: str
+
+    class Config:
+        from_attributes = True
+
+class ContactResponse(BaseModel):
+    id: str
+    email: str
+    phone_number: Optional[str] = None
+    createdAt: datetime
+    updatedAt: datetime
+    translations: Optional[List[ContactTranslationResponse]] = None
+
+    class Config:
+        from_attributes = True
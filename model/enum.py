@@ -17,4 +17,9 @@ class Sect(str, Enum):
 class GonpaType(str, Enum):
     MONASTERY = "MONASTERY"
     NUNNERY = "NUNNERY"
-    TEMPLE = "TEMPLE"
\ No newline at end of file
+    TEMPLE = "TEMPLE"
+
+class Recurrence(str, Enum):
+    NONE = "NONE"
+    YEARLY = "YEARLY"  # same Gregorian date every year
+    YEARLY_LUNAR = "YEARLY_LUNAR"  # same Tibetan month and day every year
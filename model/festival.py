@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
+from model.enum import Recurrence
 
 class FestivalTranslationBase(BaseModel):
     languageCode: str
@@ -19,6 +20,9 @@ class FestivalBase(BaseModel):
     start_date: datetime
     end_date: datetime
     image: str
+    recurrence: Recurrence = Recurrence.NONE
+    lunar_month: Optional[int] = Field(None, ge=1, le=12)  # Tibetan date; derived from start_date when omitted
+    lunar_day: Optional[int] = Field(None, ge=1, le=30)
 
 class FestivalCreate(FestivalBase):
     translations: List[FestivalTranslationBase]
@@ -49,5 +53,46 @@ class FestivalUpdate(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
     image: Optional[str] = None
+    recurrence: Optional[Recurrence] = None
+    lunar_month: Optional[int] = Field(None, ge=1, le=12)
+    lunar_day: Optional[int] = Field(None, ge=1, le=30)
     translations: Optional[List[FestivalTranslationUpdate]]  # List of translations
 
+
+class FestivalPatch(BaseModel):
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    image: Optional[str] = None
+    recurrence: Optional[Recurrence] = None
+    lunar_month: Optional[int] = Field(None, ge=1, le=12)
+    lunar_day: Optional[int] = Field(None, ge=1, le=30)
+    translations: Optional[List[FestivalTranslationUpdate]] = None  # Only the languages to change
+
+
+class FestivalResponse(BaseModel):
+    id: str
+    start_date: datetime
+    end_date: datetime
+    image: Optional[str] = None
+    imageVariants: Dict[str, str] = {}
+    recurrence: Recurrence = Recurrence.NONE
+    lunar_month: Optional[int] = None
+    lunar_day: Optional[int] = None
+    translations: Optional[List[FestivalTranslation]] = None
+    createdAt: Optional[datetime] = None
+    updatedAt: datetime
+
+    class Config:
+        from_attributes = True
+
+class FestivalSaved(BaseModel):
+    message: str
+    festival: FestivalResponse
+
+class FestivalDeleted(BaseModel):
+    message: str
+    site: FestivalResponse
+
+class FestivalTranslationDeleted(BaseModel):
+    message: str
+    translation: FestivalTranslation
@@ -1,6 +1,8 @@
 from pydantic import BaseModel
-from typing import List,Optional
+from typing import Dict, List, Optional
+from datetime import datetime
 from .enum import Sect, GonpaType
+from .contact import ContactResponse
 
 class GonpaTranslationBase(BaseModel):
     languageCode: str
@@ -36,4 +38,57 @@ class GonpaTranslationCreate(BaseModel):
     languageCode: str
     name: str
     description: str
-    description_audio: str
\ No newline at end of file
+    description_audio: str
+
+
+class GonpaTranslationPatch(BaseModel):
+    languageCode: str
+    name: Optional[str] = None
+    description: Optional[str] = None
+    description_audio: Optional[str] = None
+
+class GonpaPatch(BaseModel):
+    image: Optional[str] = None
+    geo_location: Optional[str] = None
+    sect: Optional[Sect] = None
+    type: Optional[GonpaType] = None
+    contactId: Optional[str] = None
+    translations: Optional[List[GonpaTranslationPatch]] = None  # Only the languages to change
+
+
+class GonpaTranslationResponse(GonpaTranslationBase):
+    id: str
+    gonpaId: str
+
+    class Config:
+        from_attributes = True
+
+class GonpaResponse(BaseModel):
+    id: str
+    image: str
+    imageVariants: Dict[str, str] = {}
+    geo_location: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    sect: str  # the database enum has more sects than Sect
+    type: str
+    contactId: Optional[str] = None
+    contact: Optional[ContactResponse] = None
+    translations: Optional[List[GonpaTranslationResponse]] = None
+    createdAt: datetime
+    updatedAt: datetime
+
+    class Config:
+        from_attributes = True
+
+class NearbyGonpa(BaseModel):
+    distance_km: float
+    gonpa: GonpaResponse
+
+class GonpaDeleted(BaseModel):
+    message: str
+    site: GonpaResponse
+
+class GonpaTranslationDeleted(BaseModel):
+    message: str
+    translation: GonpaTranslationResponse
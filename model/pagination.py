@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class PageParams(BaseModel):
+    limit: int
+    cursor: Optional[str] = None
+    include_total: bool = False
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    limit: int
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
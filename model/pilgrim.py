@@ -1,6 +1,7 @@
 from pydantic import BaseModel
-from typing import List,Optional
+from typing import Dict, List, Optional
 from datetime import datetime
+from .contact import ContactResponse
 
 class PilgrimSiteTranslationBase(BaseModel):
     languageCode: str
@@ -43,4 +44,37 @@ class PilgrimSiteTranslationCreate(PilgrimSiteTranslationBase):
     languageCode: str
     name: str
     description: str
-    description_audio: str
\ No newline at end of file
+    description_audio: str
+
+
+class PilgrimSiteTranslationPatch(BaseModel):
+    languageCode: str
+    name: Optional[str] = None
+    description: Optional[str] = None
+    description_audio: Optional[str] = None
+
+class PilgrimSitePatch(BaseModel):
+    image: Optional[str] = None
+    geo_location: Optional[str] = None
+    contactId: Optional[str] = None
+    translations: Optional[List[PilgrimSiteTranslationPatch]] = None  # Only the languages to change
+
+
+class PilgrimSiteResponse(PilgrimSite):
+    imageVariants: Dict[str, str] = {}
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    contact: Optional[ContactResponse] = None
+    translations: Optional[List[PilgrimSiteTranslation]] = None
+
+class NearbyPilgrimSite(BaseModel):
+    distance_km: float
+    site: PilgrimSiteResponse
+
+class PilgrimSiteDeleted(BaseModel):
+    message: str
+    site: PilgrimSiteResponse
+
+class PilgrimSiteTranslationDeleted(BaseModel):
+    message: str
+    translation: PilgrimSiteTranslation
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class SearchResult(BaseModel):
+    type: str
+    id: str
+    languageCode: str
+    name: str
+    score: float
+
+class SearchIndexStats(BaseModel):
+    built: bool
+    version: Optional[str] = None  # catalog version the index was built at
+    documents: int
+    entities: int
+    terms: int
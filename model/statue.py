@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class StatueTranslationBase(BaseModel):
@@ -12,9 +12,33 @@ class StatueCreate(BaseModel):
     image: str
     translations: List[StatueTranslationBase]
 
+class StatueTranslation(StatueTranslationBase):
+    id: str
+    statueId: str
+
+    class Config:
+        from_attributes = True
+
 class StatueResponse(BaseModel):
     id: str
     image: str
     createdAt: datetime
     updatedAt: datetime
-    translations: List[StatueTranslationBase]
\ No newline at end of file
+    imageVariants: Dict[str, str] = {}
+    translations: List[StatueTranslation]
+
+    class Config:
+        from_attributes = True
+
+class StatueTranslationPatch(BaseModel):
+    languageCode: str
+    name: Optional[str] = None
+    description: Optional[str] = None
+    description_audio: Optional[str] = None
+
+class StatuePatch(BaseModel):
+    image: Optional[str] = None
+    translations: Optional[List[StatueTranslationPatch]] = None  # Only the languages to change
+
+class StatueMessage(BaseModel):
+    message: str
@@ -0,0 +1,28 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import List, Optional
+from model.contact import ContactResponse
+from model.festival import FestivalResponse
+from model.gonpa import GonpaResponse
+from model.pilgrim import PilgrimSiteResponse
+from model.statue import StatueResponse
+
+class SyncTombstone(BaseModel):
+    type: str
+    id: str
+    languageCode: Optional[str] = None  # set when only this translation was deleted
+    deletedAt: datetime
+
+class SyncChanges(BaseModel):
+    gonpa: List[GonpaResponse]
+    festival: List[FestivalResponse]
+    statue: List[StatueResponse]
+    pilgrim: List[PilgrimSiteResponse]
+    contact: List[ContactResponse]
+
+class ChangesPage(BaseModel):
+    changes: SyncChanges
+    tombstones: List[SyncTombstone]
+    next: str  # pass as `since` to continue
+    has_more: bool
+    upto: datetime
@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class PresignRequest(BaseModel):
+    filename: str  # Original file name; only its extension is kept
+    content_type: str
+    size: int = Field(..., gt=0)  # Exact size in bytes of the file that will be uploaded
+    sha256: str = Field(..., pattern=r"^[0-9a-fA-F]{64}$")  # Hex SHA-256 of the file; S3 checks it on upload
+    multipart: bool = False  # Ask for per-part URLs (always used above the single upload limit)
+
+class UploadedPart(BaseModel):
+    PartNumber: int
+    ETag: str
+
+class CompleteUploadRequest(BaseModel):
+    token: str  # As returned by /presign
+    parts: Optional[List[UploadedPart]] = None  # Required for multipart uploads
@@ -0,0 +1,61 @@
+-- AlterTable
+ALTER TABLE "Gonpa" ADD COLUMN     "latitude" DOUBLE PRECISION,
+ADD COLUMN     "longitude" DOUBLE PRECISION;
+
+-- AlterTable
+ALTER TABLE "PilgrimSite" ADD COLUMN     "latitude" DOUBLE PRECISION,
+ADD COLUMN     "longitude" DOUBLE PRECISION;
+
+-- CreateIndex
+CREATE INDEX "Gonpa_latitude_longitude_idx" ON "Gonpa"("latitude", "longitude");
+
+-- CreateIndex
+CREATE INDEX "PilgrimSite_latitude_longitude_idx" ON "PilgrimSite"("latitude", "longitude");
+
+-- Backfill coordinates from the map URLs, as lib/geo.parse_geo_location does: the
+-- patterns are tried in order (Google "!3d<lat>!4d<lon>", then "@<lat>,<lon>", then any
+-- "<lat>,<lon>" pair), every match of each from left to right, and the first match in
+-- range wins.
+WITH candidates AS (
+    SELECT t."id", r.m[1]::DOUBLE PRECISION AS lat, r.m[2]::DOUBLE PRECISION AS lon, p.priority, r.ordinality
+    FROM "Gonpa" AS t
+    CROSS JOIN (VALUES
+        (1, '!3d(-?\d{1,3}(?:\.\d+)?)!4d(-?\d{1,3}(?:\.\d+)?)'),
+        (2, '@(-?\d{1,3}(?:\.\d+)?),\s*(-?\d{1,3}(?:\.\d+)?)'),
+        (3, '(-?\d{1,3}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)')
+    ) AS p(priority, pattern)
+    CROSS JOIN LATERAL regexp_matches(t."geo_location", p.pattern, 'g') WITH ORDINALITY AS r(m, ordinality)
+),
+chosen AS (
+    SELECT DISTINCT ON ("id") "id", lat, lon
+    FROM candidates
+    WHERE abs(lat) <= 90 AND abs(lon) <= 180
+    ORDER BY "id", priority, ordinality
+)
+UPDATE "Gonpa" AS g
+SET "latitude" = chosen.lat,
+    "longitude" = chosen.lon
+FROM chosen
+WHERE chosen."id" = g."id";
+
+WITH candidates AS (
+    SELECT t."id", r.m[1]::DOUBLE PRECISION AS lat, r.m[2]::DOUBLE PRECISION AS lon, p.priority, r.ordinality
+    FROM "PilgrimSite" AS t
+    CROSS JOIN (VALUES
+        (1, '!3d(-?\d{1,3}(?:\.\d+)?)!4d(-?\d{1,3}(?:\.\d+)?)'),
+        (2, '@(-?\d{1,3}(?:\.\d+)?),\s*(-?\d{1,3}(?:\.\d+)?)'),
+        (3, '(-?\d{1,3}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)')
+    ) AS p(priority, pattern)
+    CROSS JOIN LATERAL regexp_matches(t."geo_location", p.pattern, 'g') WITH ORDINALITY AS r(m, ordinality)
+),
+chosen AS (
+    SELECT DISTINCT ON ("id") "id", lat, lon
+    FROM candidates
+    WHERE abs(lat) <= 90 AND abs(lon) <= 180
+    ORDER BY "id", priority, ordinality
+)
+UPDATE "PilgrimSite" AS p
+SET "latitude" = chosen.lat,
+    "longitude" = chosen.lon
+FROM chosen
+WHERE chosen."id" = p."id";
@@ -0,0 +1,28 @@
+-- CreateTable
+CREATE TABLE "Tombstone" (
+    "id" TEXT NOT NULL,
+    "entityType" TEXT NOT NULL,
+    "entityId" TEXT NOT NULL,
+    "languageCode" TEXT,
+    "deletedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "Tombstone_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "Tombstone_deletedAt_id_idx" ON "Tombstone"("deletedAt", "id");
+
+-- CreateIndex
+CREATE INDEX "Contact_updatedAt_id_idx" ON "Contact"("updatedAt", "id");
+
+-- CreateIndex
+CREATE INDEX "Gonpa_updatedAt_id_idx" ON "Gonpa"("updatedAt", "id");
+
+-- CreateIndex
+CREATE INDEX "Festival_updatedAt_id_idx" ON "Festival"("updatedAt", "id");
+
+-- CreateIndex
+CREATE INDEX "Statue_updatedAt_id_idx" ON "Statue"("updatedAt", "id");
+
+-- CreateIndex
+CREATE INDEX "PilgrimSite_updatedAt_id_idx" ON "PilgrimSite"("updatedAt", "id");
@@ -0,0 +1,32 @@
+-- AlterTable
+ALTER TABLE "Gonpa" ADD COLUMN     "imageVariants" JSONB NOT NULL DEFAULT '{}';
+
+-- AlterTable
+ALTER TABLE "Festival" ADD COLUMN     "imageVariants" JSONB NOT NULL DEFAULT '{}';
+
+-- AlterTable
+ALTER TABLE "Statue" ADD COLUMN     "imageVariants" JSONB NOT NULL DEFAULT '{}';
+
+-- AlterTable
+ALTER TABLE "PilgrimSite" ADD COLUMN     "imageVariants" JSONB NOT NULL DEFAULT '{}';
+
+-- CreateTable
+CREATE TABLE "MediaAsset" (
+    "id" TEXT NOT NULL,
+    "key" TEXT NOT NULL,
+    "url" TEXT NOT NULL,
+    "contentType" TEXT NOT NULL,
+    "size" INTEGER NOT NULL,
+    "width" INTEGER,
+    "height" INTEGER,
+    "variants" JSONB NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "MediaAsset_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "MediaAsset_key_key" ON "MediaAsset"("key");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "MediaAsset_url_key" ON "MediaAsset"("url");
@@ -0,0 +1,16 @@
+-- CreateTable
+CREATE TABLE "StoredObject" (
+    "sha256" TEXT NOT NULL,
+    "key" TEXT NOT NULL,
+    "url" TEXT NOT NULL,
+    "contentType" TEXT NOT NULL,
+    "size" INTEGER NOT NULL,
+    "uploads" INTEGER NOT NULL DEFAULT 1,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "lastUploadedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "StoredObject_pkey" PRIMARY KEY ("sha256")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "StoredObject_key_key" ON "StoredObject"("key");
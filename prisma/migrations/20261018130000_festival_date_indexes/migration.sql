@@ -0,0 +1,5 @@
+-- CreateIndex
+CREATE INDEX "Festival_start_date_end_date_idx" ON "Festival"("start_date", "end_date");
+
+-- CreateIndex
+CREATE INDEX "Festival_end_date_start_date_idx" ON "Festival"("end_date", "start_date");
@@ -0,0 +1,10 @@
+-- CreateEnum
+CREATE TYPE "Recurrence" AS ENUM ('NONE', 'YEARLY', 'YEARLY_LUNAR');
+
+-- AlterTable
+ALTER TABLE "Festival" ADD COLUMN     "lunar_day" INTEGER,
+ADD COLUMN     "lunar_month" INTEGER,
+ADD COLUMN     "recurrence" "Recurrence" NOT NULL DEFAULT 'NONE';
+
+-- CreateIndex
+CREATE INDEX "Festival_recurrence_idx" ON "Festival"("recurrence");
@@ -0,0 +1,11 @@
+-- CreateTable
+CREATE TABLE "CompletedUpload" (
+    "key" TEXT NOT NULL,
+    "url" TEXT,
+    "contentType" TEXT NOT NULL,
+    "size" INTEGER NOT NULL,
+    "claimedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "completedAt" TIMESTAMP(3),
+
+    CONSTRAINT "CompletedUpload_pkey" PRIMARY KEY ("key")
+);
@@ -0,0 +1,11 @@
+-- CreateIndex
+CREATE INDEX "Gonpa_image_idx" ON "Gonpa"("image");
+
+-- CreateIndex
+CREATE INDEX "Festival_image_idx" ON "Festival"("image");
+
+-- CreateIndex
+CREATE INDEX "Statue_image_idx" ON "Statue"("image");
+
+-- CreateIndex
+CREATE INDEX "PilgrimSite_image_idx" ON "PilgrimSite"("image");
@@ -0,0 +1,58 @@
+import os
+import re
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+from prisma import Prisma
+from typing import List
+from Config.connection import get_db
+from lib.bundle import catalog_version, get_bundle
+from lib.conditional import Validators, not_modified, not_modified_response
+from lib.translation import parse_lang
+from model.bundle import BundleManifest
+
+router = APIRouter()
+
+BUNDLE_MAX_AGE = 300
+LANGUAGE_CODE = re.compile(r"[A-Za-z]{2,3}(-[A-Za-z0-9]{1,8})*")
+
+def bundle_languages(lang: str) -> List[str]:
+    languages = parse_lang(lang)
+    if not languages or not all(LANGUAGE_CODE.fullmatch(code) for code in languages):
+        raise HTTPException(status_code=400, detail="Invalid language list")
+    return languages
+
+@router.get("/{lang}/manifest", response_model=BundleManifest)
+async def get_bundle_manifest(lang: str, request: Request, db: Prisma = Depends(get_db)):
+    languages = bundle_languages(lang)
+    version = await catalog_version(db)
+    path = await get_bundle(db, languages, version)
+    return {
+        "version": version,
+        "languages": languages,
+        "size": os.path.getsize(path),
+        "url": str(request.url_for("get_bundle_file", lang=lang)),
+    }
+
+@router.get("/{lang}")
+async def get_bundle_file(lang: str, request: Request, db: Prisma = Depends(get_db)):
+    """Gzipped JSON snapshot of the catalog in the given language chain (e.g. bo,en).
+
+    Clients keep the ETag (the catalog version) and get a 304 until the
+    catalog changes; interrupted downloads can resume with a Range request.
+    """
+    languages = bundle_languages(lang)
+    version = await catalog_version(db)
+    validators = Validators(f'"{version}"', None)
+    if not_modified(request, validators):
+        return not_modified_response(validators)
+
+    path = await get_bundle(db, languages, version)
+    return FileResponse(
+        path,
+        media_type="application/gzip",
+        filename=os.path.basename(path),
+        headers={
+            "ETag": validators.etag,
+            "Cache-Control": f"public, max-age={BUNDLE_MAX_AGE}",
+        },
+    )
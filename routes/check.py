@@ -1,7 +1,22 @@
 from fastapi import APIRouter, HTTPException, Request
+from Config.connection import prisma_connection
+from Config.s3 import s3_connection
+from lib.cache import response_cache
 
 router = APIRouter()
 
 @router.head("/", status_code=200)
 async def check_translation(client_request: Request):
         return True
+
+@router.get("/db")
+async def check_db_pool():
+    return prisma_connection.stats()
+
+@router.get("/cache")
+async def check_cache():
+    return response_cache.stats()
+
+@router.get("/s3")
+async def check_s3_client():
+    return s3_connection.stats()
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from prisma import Prisma
-from model.contact import ContactBase,ContactUpdate
+from typing import List
+from model.contact import ContactBase,ContactUpdate,ContactResponse
 from Config.connection import get_db
+from lib.translation import language_preference, project_translations, translations_include
+from lib.cache import entity_tags
+from lib.events import entity_deleted, entity_saved
+from lib.conditional import conditional_get, entity_validators, fetch_entity_validators
+from lib.sync import record_deletion
+from lib.translatable import update_translatable
 
 
 router = APIRouter(
 )
 
-@router.post("/")
+@router.post("/", response_model=ContactResponse)
 async def create_contact(contact: ContactBase, db: Prisma = Depends(get_db)):
     try:
         translations_data = [
@@ -38,55 +45,82 @@ async def create_contact(contact: ContactBase, db: Prisma = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/{contact_id}")
-async def get_contact(contact_id: str, db: Prisma = Depends(get_db)):
-    contact = await db.contact.find_unique(
-        where={"id": contact_id},
-        include={"translations": True}
+@router.get("/{contact_id}", response_model=ContactResponse)
+async def get_contact(
+    contact_id: str,
+    request: Request,
+    response: Response,
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    async def load():
+        contact = await db.contact.find_unique(
+            where={"id": contact_id},
+            include={"translations": translations_include(languages)}
+        )
+        if not contact:
+            raise HTTPException(status_code=404, detail="Contact not found")
+        validators = entity_validators("contact", contact, languages)
+        return project_translations(contact, languages), validators
+
+    return await conditional_get(
+        request,
+        response,
+        ("contact", contact_id, tuple(languages)),
+        load,
+        lambda contact: entity_tags("contact", contact),
+        lambda: fetch_entity_validators(db, "contact", contact_id, languages),
+        ContactResponse
     )
-    if not contact:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    return contact
 
-@router.delete("/{contact_id}")
+@router.delete("/{contact_id}", response_model=ContactResponse)
 async def get_contact(contact_id: str, db: Prisma = Depends(get_db)):
-    contact = await db.contact.delete(
-        where={"id": contact_id}
-    )
-    if not contact:
-        raise HTTPException(status_code=404, detail="Contact not found")
+    async with db.tx() as tx:
+        contact = await tx.contact.delete(
+            where={"id": contact_id}
+        )
+        if not contact:
+            raise HTTPException(status_code=404, detail="Contact not found")
+        await record_deletion(tx, "contact", contact_id)
+    entity_deleted("contact", contact_id)
     return contact
 
 
-@router.put("/{contact_id}")
+@router.put("/{contact_id}", response_model=ContactResponse)
 async def update_contact(contact_id: str, contact: ContactUpdate, db: Prisma = Depends(get_db)):
-    existing_contact = await db.contact.find_unique(where={"id": contact_id})
-    if not existing_contact:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    
     try:
-        updated_contact = await db.contact.update(
-            where={"id": contact_id},
-            data={
-                "email": contact.email,
-                "phone_number": contact.phone_number,
-                "translations": {
-                    "deleteMany": {},  # Remove existing translations
-                    "create": [
-                        {
-                            "language": {"connect": {"code": t.languageCode}},
-                            "address": t.address,
-                            "city": t.city,
-                            "state": t.state,
-                            "postal_code": t.postal_code,
-                            "country": t.country
-                        }
-                        for t in contact.translations
-                    ]
-                }
-            },
-            include={"translations": True}
+        values = {
+            key: value
+            for key, value in contact.model_dump(exclude={"translations"}).items()
+            if value is not None
+        }
+        # The translations sent are the complete set; only the differences are written
+        translations = (
+            [t.model_dump(exclude_unset=True) for t in contact.translations]
+            if contact.translations else None
         )
+        updated_contact = await update_translatable(db, "contact", contact_id, values, translations, replace=True)
+        entity_saved("contact", updated_contact)
         return updated_contact
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.patch("/{contact_id}", response_model=ContactResponse)
+async def patch_contact(contact_id: str, contact: ContactUpdate, db: Prisma = Depends(get_db)):
+    try:
+        values = contact.model_dump(exclude={"translations"}, exclude_unset=True)
+        translations = (
+            [t.model_dump(exclude_unset=True) for t in contact.translations]
+            if contact.translations is not None else None
+        )
+        updated_contact = await update_translatable(db, "contact", contact_id, values, translations)
+        entity_saved("contact", updated_contact)
+        return updated_contact
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
@@ -1,12 +1,28 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+import asyncio
 from prisma import Prisma
 from typing import Optional, List
 from Config.connection import get_db
-from model.festival import FestivalCreate,festivalTranslationCreate,FestivalTranslationUpdate,FestivalUpdate
+from model.festival import FestivalCreate,festivalTranslationCreate,FestivalUpdate,FestivalPatch
+from model.festival import FestivalDeleted, FestivalResponse, FestivalSaved, FestivalTranslation, FestivalTranslationDeleted
+from model.pagination import Page, PageParams
+from lib.pagination import ID_ORDER, page_params, paginate
+from lib.dates import day_window, today
+from lib.recurrence import occurrence_page, recurrence_data, validators_where, window_where
+from lib.translation import language_preference, project_page, project_translations, translations_include
+from lib.cache import entity_tags, page_tags
+from lib.bulk import import_records, read_request_records
+from model.bulk import BulkReport
+from lib.export import export_response
+from lib.media import image_variants
+from lib.events import entities_imported, entity_deleted, entity_saved, translation_deleted, translation_saved
+from lib.conditional import conditional_get, entity_validators, fetch_entity_validators, fetch_list_validators, fetch_once
+from lib.sync import record_deletion
+from lib.translatable import add_translation, delete_translation, update_translatable
 
 router = APIRouter()
 
-@router.post("/")
+@router.post("/", response_model=FestivalResponse)
 async def create_festival(festival: FestivalCreate, db: Prisma = Depends(get_db)):
     try:
         translations_data = [
@@ -19,11 +35,16 @@ async def create_festival(festival: FestivalCreate, db: Prisma = Depends(get_db)
             for t in festival.translations
         ]
         
+        # Dates, recurrence and the Tibetan date of start_date
+        schedule = recurrence_data(festival.model_dump(
+            include={"start_date", "end_date", "recurrence", "lunar_month", "lunar_day"},
+            exclude_none=True
+        ))
         created_festival = await db.festival.create(
             data={
-                "start_date": festival.start_date,
-                "end_date": festival.end_date,
+                **schedule,
                 "image": festival.image,
+                **await image_variants(db, festival.image),
                 "translations": {
                     "create": translations_data
                 }
@@ -32,238 +53,243 @@ async def create_festival(festival: FestivalCreate, db: Prisma = Depends(get_db)
                 "translations": True
             }
         )
+        entity_saved("festival", created_festival, lists=True)
         return created_festival
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/{festival_id}")
-async def get_festival(festival_id: str, db: Prisma = Depends(get_db)):
-    festival = await db.festival.find_first(
-        where={"id": festival_id},
-        include={"translations": True}
+@router.post("/bulk", response_model=BulkReport)
+async def bulk_import_festivals(request: Request, db: Prisma = Depends(get_db)):
+    """Import many festival records from an NDJSON body (or a JSON array) of create payloads.
+
+    Invalid records are reported by their position in the input; the rest are imported.
+    """
+    report = await import_records(db, "festival", read_request_records(request))
+    if report["imported"]:
+        entities_imported("festival")
+    return report
+
+@router.get("/export")
+async def export_festivals(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    languages: List[str] = Depends(language_preference)
+):
+    return export_response("festival", export_format, languages)
+
+@router.get("/upcoming", response_model=Page[FestivalResponse])
+async def get_upcoming_festivals(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    """Festivals that have not ended yet (including ones on today), soonest first.
+
+    Recurring festivals appear once per coming occurrence, with its dates.
+    """
+    day = today()
+    window = (day, None)
+    where = validators_where(window_where({}, window))
+    key = ("festival:upcoming", day.date().isoformat(), page.limit, page.cursor, page.include_total, tuple(languages))
+
+    list_validators = fetch_once(lambda: fetch_list_validators(db, "festival", where, key))
+
+    async def load():
+        festivals, validators = await asyncio.gather(
+            occurrence_page(db, page, {}, window, {"translations": translations_include(languages)}),
+            list_validators()
+        )
+        return project_page(festivals, languages), validators
+
+    return await conditional_get(
+        request,
+        response,
+        key,
+        load,
+        lambda festivals: page_tags("festival", festivals),
+        list_validators,
+        Page[FestivalResponse]
     )
-    if not festival:
-        raise HTTPException(status_code=404, detail="Festival not found")
-    return festival
 
-@router.get("/")
+@router.get("/{festival_id}", response_model=FestivalResponse)
+async def get_festival(
+    festival_id: str,
+    request: Request,
+    response: Response,
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    async def load():
+        festival = await db.festival.find_first(
+            where={"id": festival_id},
+            include={"translations": translations_include(languages)}
+        )
+        if not festival:
+            raise HTTPException(status_code=404, detail="Festival not found")
+        validators = entity_validators("festival", festival, languages)
+        return project_translations(festival, languages), validators
+
+    return await conditional_get(
+        request,
+        response,
+        ("festival", festival_id, tuple(languages)),
+        load,
+        lambda festival: entity_tags("festival", festival),
+        lambda: fetch_entity_validators(db, "festival", festival_id, languages),
+        FestivalResponse
+    )
+
+@router.get("/", response_model=Page[FestivalResponse])
 async def get_festivals(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    on: Optional[str] = Query(None, description="Festivals taking place on this day (YYYY-MM-DD)"),
+    from_: Optional[str] = Query(None, alias="from", description="Festivals overlapping from this day on"),
+    to: Optional[str] = Query(None, description="Festivals overlapping up to and including this day"),
+    page: PageParams = Depends(page_params),
+    languages: List[str] = Depends(language_preference),
     db: Prisma = Depends(get_db)
 ):
-    where = {}
+    """List festivals. ``on`` or ``from``/``to`` return every festival occurring
+    on those days, ordered by start date, with recurring festivals expanded to
+    their occurrences; ``start_date``/``end_date`` keep their containment
+    meaning (starts on/after, ends on/before) on the stored dates."""
+    filters = {}
     if start_date:
-        where["start_date"] = {"gte": start_date}
+        filters["start_date"] = {"gte": start_date}
     if end_date:
-        where["end_date"] = {"lte": end_date}
-    
-    festivals = await db.festival.find_many(
-        where=where,
-        include={"translations": True}
+        filters["end_date"] = {"lte": end_date}
+
+    window = day_window(on, from_, to)
+    where = validators_where(window_where(filters, window)) if window is not None else filters
+    include = {"translations": translations_include(languages)}
+
+    key = ("festival:list", start_date, end_date, on, from_, to, page.limit, page.cursor, page.include_total, tuple(languages))
+
+    list_validators = fetch_once(lambda: fetch_list_validators(db, "festival", where, key))
+
+    async def load():
+        festivals, validators = await asyncio.gather(
+            occurrence_page(db, page, filters, window, include) if window is not None
+            else paginate(db.festival, page, where=where, include=include, order=ID_ORDER),
+            list_validators()
+        )
+        return project_page(festivals, languages), validators
+
+    return await conditional_get(
+        request,
+        response,
+        key,
+        load,
+        lambda festivals: page_tags("festival", festivals),
+        list_validators,
+        Page[FestivalResponse]
     )
-    return festivals
 
-@router.post("/{festival_id}/translations")
+@router.post("/{festival_id}/translations", response_model=FestivalTranslation)
 async def add_festival_translation(
     festival_id: str,
     translation: festivalTranslationCreate,
     db: Prisma = Depends(get_db)
 ):
     try:
-        # Check if the gonpa exists
-        existing_festival = await db.festival.find_first(where={"id": festival_id})
-        if not existing_festival:
-            raise HTTPException(status_code=404, detail="festival not found")
-            
-        # Check if translation for this language already exists
-        existing_translation = await db.festivaltranslation.find_first(
-            where={
-                "festivalId": festival_id,
-                "languageCode": translation.languageCode
-            }
-        )
-        if existing_translation:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Translation for language {translation.languageCode} already exists"
-            )
-
-        # Create new translation
-        new_translation = await db.festivaltranslation.create(
-            data={
-                "festival": {"connect": {"id": festival_id}},
-                "language": {"connect": {"code": translation.languageCode}},
-                "name": translation.name,
-                "description": translation.description,
-                "description_audio": translation.description_audio
-            }
-        )
+        new_translation = await add_translation(db, "festival", festival_id, translation.model_dump())
+        translation_saved("festival", festival_id, new_translation)
         return new_translation
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.delete("/{festival_id}/translations/{language_code}")
+@router.delete("/{festival_id}/translations/{language_code}", response_model=FestivalTranslationDeleted)
 async def delete_festival_translation(
-
     festival_id: str,
     language_code: str,
     db: Prisma = Depends(get_db)
 ):
     try:
-        # Check if the translation exists
-        existing_translation = await db.festivaltranslation.find_first(
-            where={
-                "festivalId": festival_id,
-                "languageCode": language_code
-            }
-        )
-        if not existing_translation:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Translation for language {language_code} not found"
-            )
-
-        # Get total translation count
-        translation_count = await db.festivaltranslation.count(
-            where={"festivalId": festival_id}
-        )
-        
-        # Prevent deletion if it's the last translation
-        if translation_count <= 1:
-            raise HTTPException(
-                status_code=400,
-                detail="Cannot delete the last translation. Gonpa must have at least one translation"
-            )
-
-        # Delete the translation
-        deleted_translation = await db.festivaltranslation.delete(
-            where={
-                "languageCode":  language_code,
-                "festivalId": festival_id
-
-            }
-        )
+        deleted_translation = await delete_translation(db, "festival", festival_id, language_code)
+        translation_deleted("festival", festival_id, language_code)
         return {
             "message": f"Translation for language {language_code} deleted successfully",
             "translation": deleted_translation
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
-    
 
-@router.delete("/{fest_id}")
+@router.delete("/{fest_id}", response_model=FestivalDeleted)
 async def delete_fest_site(fest_id: str, db: Prisma = Depends(get_db)):
     try:
         existing_gonpa = await db.festival.find_first(where={"id": fest_id})
         if not existing_gonpa:
             raise HTTPException(status_code=404, detail="festival not found")
             
-        deleted_site = await db.festival.delete(
-            where={"id": fest_id},
-            include={
-                "translations": True
-            }
-        )
+        async with db.tx() as tx:
+            deleted_site = await tx.festival.delete(
+                where={"id": fest_id},
+                include={
+                    "translations": True
+                }
+            )
+            await record_deletion(tx, "festival", fest_id)
+        entity_deleted("festival", fest_id)
         return {"message": "festival site deleted successfully", "site": deleted_site}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
 
-@router.put("/{festival_id}")
+@router.put("/{festival_id}", response_model=FestivalSaved)
 async def update_festival(
     festival_id: str,
     festival_data: FestivalUpdate,
     db: Prisma = Depends(get_db)
 ):
     try:
-        existing_festival = await db.festival.find_first(where={"id": festival_id})
-        if not existing_festival:
-            raise HTTPException(status_code=404, detail="Festival not found")
-
-        if festival_data.translations:
-            await db.festivaltranslation.delete_many(where={"festivalId": festival_id})
-        
-        # Prepare update data
-        update_data = {}
-        if festival_data.start_date:
-            update_data["start_date"] = festival_data.start_date
-        if festival_data.end_date:
-            update_data["end_date"] = festival_data.end_date
-        if festival_data.image:
-            update_data["image"] = festival_data.image
-
-        translations_data = [
-            {
-                "languageCode": t.languageCode,
-                "name": t.name,
-                "description": t.description,
-                "description_audio": t.description_audio,
-            }
-            for t in festival_data.translations
-        ] if festival_data.translations else []
-        # Update festival details
+        values = recurrence_data({
+            key: value
+            for key, value in festival_data.model_dump(exclude={"translations"}).items()
+            if value
+        })
 
-
-        update_data["translations"] = {
-                "createMany": {
-                    "data": translations_data
-                }
-            } if translations_data else {}
-        
-        updated_festival = await db.festival.update(
-            where={"id": festival_id},
-            data=update_data,
-            include={"translations": True}
+        # The translations sent are the complete set; only the differences are written
+        translations = (
+            [t.model_dump(exclude_unset=True) for t in festival_data.translations]
+            if festival_data.translations else None
         )
+        updated_festival = await update_translatable(db, "festival", festival_id, values, translations, replace=True)
 
+        entity_saved("festival", updated_festival, lists=True)
         return {"message": "Festival updated successfully", "festival": updated_festival}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.patch("/{festival_id}", response_model=FestivalSaved)
+async def patch_festival(
+    festival_id: str,
+    festival_patch: FestivalPatch,
+    db: Prisma = Depends(get_db)
+):
+    try:
+        values = recurrence_data(festival_patch.model_dump(exclude={"translations"}, exclude_unset=True))
+        translations = (
+            [t.model_dump(exclude_unset=True) for t in festival_patch.translations]
+            if festival_patch.translations is not None else None
+        )
+        updated_festival = await update_translatable(db, "festival", festival_id, values, translations)
 
-# @router.put("/{festival_id}/translations/{language_code}")
-# async def update_festival_translation(
-#     festival_id: str,
-#     language_code: str,
-#     translation_data: FestivalTranslationUpdate,
-#     db: Prisma = Depends(get_db)
-# ):
-#     try:
-#         # Check if translation exists
-#         existing_translation = await db.festivaltranslation.find_first(
-#             where={
-#                 "festivalId": festival_id,
-#                 "languageCode": language_code
-#             }
-#         )
-#         if not existing_translation:
-#             raise HTTPException(
-#                 status_code=404,
-#                 detail=f"Translation for language {language_code} not found"
-#             )
-
-#         # Prepare update data
-#         update_data = {}
-#         if translation_data.name:
-#             update_data["name"] = translation_data.name
-#         if translation_data.description:
-#             update_data["description"] = translation_data.description
-#         if translation_data.description_audio:
-#             update_data["description_audio"] = translation_data.description_audio
-
-#         # Update the translation
-#         updated_translation = await db.festivaltranslation.update(
-#             where={"id": existing_translation.id},
-#             data=update_data
-#         )
-
-#         return {
-#             "message": f"Translation for language {language_code} updated successfully",
-#             "translation": updated_translation
-#         }
-
-#     except Exception as e:
-#         raise HTTPException(status_code=400, detail=str(e))
-
+        entity_saved("festival", updated_festival, lists=True)
+        return {"message": "Festival updated successfully", "festival": updated_festival}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,15 +1,30 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+import asyncio
 from prisma import Prisma
 from typing import Optional
 from Config.connection import get_db
 from typing import List
-from model.gonpa import GonpaCreate,GonpaTranslationCreate,GonpaUpdate
+from model.gonpa import GonpaCreate,GonpaTranslationCreate,GonpaUpdate,GonpaPatch
+from model.gonpa import GonpaDeleted, GonpaResponse, GonpaTranslationDeleted, GonpaTranslationResponse, NearbyGonpa
 from model.enum import Sect, GonpaType
+from model.pagination import Page, PageParams
+from lib.pagination import page_params, paginate
+from lib.translation import language_preference, project_page, project_translations, translations_include
+from lib.cache import entity_tags, page_tags
+from lib.bulk import import_records, read_request_records
+from model.bulk import BulkReport
+from lib.export import export_response
+from lib.media import image_variants
+from lib.events import entities_imported, entity_deleted, entity_saved, translation_deleted, translation_saved
+from lib.conditional import conditional_get, entity_validators, fetch_entity_validators, fetch_list_validators, fetch_once
+from lib.geo import coordinates_data, nearest
+from lib.sync import record_deletion
+from lib.translatable import add_translation, delete_translation, update_translatable
 
 router = APIRouter(
 )
 
-@router.post("/")
+@router.post("/", response_model=GonpaResponse)
 async def create_gonpa(gonpa: GonpaCreate, db: Prisma = Depends(get_db)):
     try:
         translations_data = [
@@ -25,7 +40,9 @@ async def create_gonpa(gonpa: GonpaCreate, db: Prisma = Depends(get_db)):
         created_gonpa = await db.gonpa.create(
             data={
                 "image": gonpa.image,
+                **await image_variants(db, gonpa.image),
                 "geo_location": gonpa.geo_location,
+                **coordinates_data(gonpa.geo_location),
                 "sect": gonpa.sect,
                 "type": gonpa.type,
                 "contact": {"connect": {"id": gonpa.contactId}},
@@ -38,10 +55,22 @@ async def create_gonpa(gonpa: GonpaCreate, db: Prisma = Depends(get_db)):
                 "contact": True
             }
         )
+        entity_saved("gonpa", created_gonpa, lists=True)
         return created_gonpa
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/bulk", response_model=BulkReport)
+async def bulk_import_gonpas(request: Request, db: Prisma = Depends(get_db)):
+    """Import many gonpa records from an NDJSON body (or a JSON array) of create payloads.
+
+    Invalid records are reported by their position in the input; the rest are imported.
+    """
+    report = await import_records(db, "gonpa", read_request_records(request))
+    if report["imported"]:
+        entities_imported("gonpa")
+    return report
+
 @router.get("/types",response_model=List[str])
 async def get_gonpa_types():
     return [e.value for e in GonpaType]
@@ -50,88 +79,136 @@ async def get_gonpa_types():
 async def get_gonpa_types():
     return [e.value for e in Sect]
 
-@router.get("/types/{type}")
-async def get_gonpa_type(type: GonpaType, db: Prisma = Depends(get_db)):
-    return await db.gonpa.find_many(where={"type": type})
+@router.get("/types/{type}", response_model=Page[GonpaResponse])
+async def get_gonpa_type(
+    type: GonpaType,
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    return await list_gonpas(db, {"type": type}, page, languages, request, response)
 
-@router.get("/{gonpa_id}")
-async def get_gonpa(gonpa_id: str, db: Prisma = Depends(get_db)):
-    gonpa = await db.gonpa.find_first(
-        where={"id": gonpa_id},
-        include={
-            "translations": True,
-            "contact": {
-                "include": {
-                    "translations": True
-                }
-            }
-        }
+@router.get("/nearby", response_model=List[NearbyGonpa])
+async def get_nearby_gonpas(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(25, gt=0, le=2000, description="Search radius in kilometres"),
+    k: int = Query(20, ge=1, le=100),
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    ranked = await nearest(db.gonpa, lat, lon, radius, k)
+    if not ranked:
+        return []
+
+    gonpas = await db.gonpa.find_many(
+        where={"id": {"in": [gonpa_id for _, gonpa_id in ranked]}},
+        include=gonpa_include(languages)
+    )
+    by_id = {gonpa.id: project_translations(gonpa, languages) for gonpa in gonpas}
+    return [
+        {"distance_km": round(distance, 3), "gonpa": by_id[gonpa_id]}
+        for distance, gonpa_id in ranked
+        if gonpa_id in by_id
+    ]
+
+@router.get("/export")
+async def export_gonpas(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    languages: List[str] = Depends(language_preference)
+):
+    return export_response("gonpa", export_format, languages)
+
+@router.get("/{gonpa_id}", response_model=GonpaResponse)
+async def get_gonpa(
+    gonpa_id: str,
+    request: Request,
+    response: Response,
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    async def load():
+        gonpa = await db.gonpa.find_first(
+            where={"id": gonpa_id},
+            include=gonpa_include(languages)
+        )
+        if not gonpa:
+            raise HTTPException(status_code=404, detail="Gonpa not found")
+        validators = entity_validators("gonpa", gonpa, languages)
+        return project_translations(gonpa, languages), validators
+
+    return await conditional_get(
+        request,
+        response,
+        ("gonpa", gonpa_id, tuple(languages)),
+        load,
+        lambda gonpa: entity_tags("gonpa", gonpa),
+        lambda: fetch_entity_validators(db, "gonpa", gonpa_id, languages),
+        GonpaResponse
     )
-    if not gonpa:
-        raise HTTPException(status_code=404, detail="Gonpa not found")
-    return gonpa
 
 
-@router.put("/{gonpa_id}")
+@router.put("/{gonpa_id}", response_model=GonpaResponse)
 async def update_gonpa(
     gonpa_id: str, 
     gonpa_update: GonpaUpdate, 
     db: Prisma = Depends(get_db)
 ):
     try:
-        # Check if the Gonpa exists
-        existing_gonpa = await db.gonpa.find_first(where={"id": gonpa_id})
-        if not existing_gonpa:
-            raise HTTPException(status_code=404, detail="Gonpa not found")
+        values = {
+            key: value
+            for key, value in gonpa_update.model_dump(exclude={"translations"}).items()
+            if value is not None
+        }
+        if gonpa_update.geo_location:
+            values.update(coordinates_data(gonpa_update.geo_location))
 
-        # If translations are provided, delete old ones before inserting new ones
-        if gonpa_update.translations:
-            await db.gonpatranslation.delete_many(where={"gonpaId": gonpa_id})
+        # The translations sent are the complete set; only the differences are written
+        translations = [t.model_dump() for t in gonpa_update.translations] if gonpa_update.translations else None
+        updated_gonpa = await update_translatable(db, "gonpa", gonpa_id, values, translations, replace=True)
 
-        # Correctly structured translation data for Prisma
-        translations_data = [
-            {
-                "languageCode": t.languageCode,
-                "name": t.name,
-                "description": t.description,
-                "description_audio": t.description_audio,
-            }
-            for t in gonpa_update.translations
-        ] if gonpa_update.translations else []
-
-        # Prepare update data
-        update_data = {
-            "image": gonpa_update.image,
-            "geo_location": gonpa_update.geo_location,
-            "sect": gonpa_update.sect,
-            "type": gonpa_update.type,
-            "translations": {
-                "createMany": {
-                    "data": translations_data
-                }
-            } if translations_data else {}
-        }
+        entity_saved("gonpa", updated_gonpa, lists=True)
+        return updated_gonpa
 
-        # Ensure `contact` is only updated if provided
-        if gonpa_update.contactId:
-            update_data["contact"] = {"connect": {"id": gonpa_update.contactId}}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Perform the update
-        updated_gonpa = await db.gonpa.update(
-            where={"id": gonpa_id},
-            data=update_data,
-            include={"translations": True, "contact": True}
+@router.patch("/{gonpa_id}", response_model=GonpaResponse)
+async def patch_gonpa(
+    gonpa_id: str,
+    gonpa_patch: GonpaPatch,
+    db: Prisma = Depends(get_db)
+):
+    try:
+        values = gonpa_patch.model_dump(exclude={"translations"}, exclude_unset=True)
+        if "geo_location" in values:
+            values.update(coordinates_data(values["geo_location"]))
+        translations = (
+            [t.model_dump(exclude_unset=True) for t in gonpa_patch.translations]
+            if gonpa_patch.translations is not None else None
         )
+        updated_gonpa = await update_translatable(db, "gonpa", gonpa_id, values, translations)
 
+        entity_saved("gonpa", updated_gonpa, lists=True)
         return updated_gonpa
-
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-@router.get("/")
+
+@router.get("/", response_model=Page[GonpaResponse])
 async def get_gonpas(
+    request: Request,
+    response: Response,
     sect: Optional[Sect] = None,
     type: Optional[GonpaType] = None,
+    page: PageParams = Depends(page_params),
+    languages: List[str] = Depends(language_preference),
     db: Prisma = Depends(get_db)
 ):
     where = {}
@@ -140,122 +217,99 @@ async def get_gonpas(
     if type:
         where["type"] = type
 
-    gonpas = await db.gonpa.find_many(
-        where=where,
-        include={
-            "translations": True,
-            "contact": {
-                "include": {
-                    "translations": True
-                }
+    return await list_gonpas(db, where, page, languages, request, response)
+
+
+def gonpa_include(languages: List[str]) -> dict:
+    translations = translations_include(languages)
+    return {
+        "translations": translations,
+        "contact": {
+            "include": {
+                "translations": translations
             }
         }
-    )
-    return gonpas
+    }
+
+async def list_gonpas(
+    db: Prisma,
+    where: dict,
+    page: PageParams,
+    languages: List[str],
+    request: Request,
+    response: Response
+):
+    key = ("gonpa:list", tuple(sorted(where.items())), page.limit, page.cursor, page.include_total, tuple(languages))
+
+    list_validators = fetch_once(lambda: fetch_list_validators(db, "gonpa", where, key))
+
+    async def load():
+        gonpas, validators = await asyncio.gather(
+            paginate(db.gonpa, page, where=where, include=gonpa_include(languages)),
+            list_validators()
+        )
+        return project_page(gonpas, languages), validators
 
+    return await conditional_get(
+        request,
+        response,
+        key,
+        load,
+        lambda gonpas: page_tags("gonpa", gonpas),
+        list_validators,
+        Page[GonpaResponse]
+    )
 
 
-@router.post("/{gonpa_id}/translations")
+@router.post("/{gonpa_id}/translations", response_model=GonpaTranslationResponse)
 async def add_gonpa_translation(
     gonpa_id: str,
     translation: GonpaTranslationCreate,
     db: Prisma = Depends(get_db)
 ):
     try:
-        # Check if the gonpa exists
-        existing_gonpa = await db.gonpa.find_first(where={"id": gonpa_id})
-        if not existing_gonpa:
-            raise HTTPException(status_code=404, detail="Gonpa not found")
-            
-        # Check if translation for this language already exists
-        existing_translation = await db.gonpatranslation.find_first(
-            where={
-                "gonpaId": gonpa_id,
-                "languageCode": translation.languageCode
-            }
-        )
-        if existing_translation:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Translation for language {translation.languageCode} already exists"
-            )
-
-        # Create new translation
-        new_translation = await db.gonpatranslation.create(
-            data={
-                "gonpa": {"connect": {"id": gonpa_id}},
-                "language": {"connect": {"code": translation.languageCode}},
-                "name": translation.name,
-                "description": translation.description,
-                "description_audio": translation.description_audio
-            }
-        )
+        new_translation = await add_translation(db, "gonpa", gonpa_id, translation.model_dump())
+        translation_saved("gonpa", gonpa_id, new_translation)
         return new_translation
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.delete("/{gonpa_id}/translations/{language_code}")
+@router.delete("/{gonpa_id}/translations/{language_code}", response_model=GonpaTranslationDeleted)
 async def delete_gonpa_translation(
-
     gonpa_id: str,
     language_code: str,
     db: Prisma = Depends(get_db)
 ):
     try:
-        # Check if the translation exists
-        existing_translation = await db.gonpatranslation.find_first(
-            where={
-                "gonpaId": gonpa_id,
-                "languageCode": language_code
-            }
-        )
-        if not existing_translation:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Translation for language {language_code} not found"
-            )
-
-        # Get total translation count
-        translation_count = await db.gonpatranslation.count(
-            where={"gonpaId": gonpa_id}
-        )
-        
-        # Prevent deletion if it's the last translation
-        if translation_count <= 1:
-            raise HTTPException(
-                status_code=400,
-                detail="Cannot delete the last translation. Gonpa must have at least one translation"
-            )
-
-        # Delete the translation
-        deleted_translation = await db.gonpatranslation.delete(
-            where={
-                "gonpaId_languageCode": {
-                    "gonpaId": gonpa_id,
-                    "languageCode": language_code
-                }
-            }
-        )
+        deleted_translation = await delete_translation(db, "gonpa", gonpa_id, language_code)
+        translation_deleted("gonpa", gonpa_id, language_code)
         return {
             "message": f"Translation for language {language_code} deleted successfully",
             "translation": deleted_translation
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
-    
-@router.delete("/{gonpa_id}")
+
+@router.delete("/{gonpa_id}", response_model=GonpaDeleted)
 async def delete_gompa_site(gonpa_id: str, db: Prisma = Depends(get_db)):
     try:
         existing_gonpa = await db.gonpa.find_first(where={"id": gonpa_id})
         if not existing_gonpa:
             raise HTTPException(status_code=404, detail="Gonpa not found")
             
-        deleted_site = await db.gonpa.delete(
-            where={"id": gonpa_id},
-            include={
-                "translations": True
-            }
-        )
+        async with db.tx() as tx:
+            deleted_site = await tx.gonpa.delete(
+                where={"id": gonpa_id},
+                include={
+                    "translations": True
+                }
+            )
+            await record_deletion(tx, "gonpa", gonpa_id)
+        entity_deleted("gonpa", gonpa_id)
         return {"message": "Gonpa site deleted successfully", "site": deleted_site}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends
 from prisma import Prisma
-from typing import List
 from Config.connection import get_db
 from model.language import LanguageBase
+from model.pagination import Page, PageParams
+from lib.pagination import ID_ORDER, page_params, paginate
 
 router = APIRouter(
 )
@@ -20,9 +21,12 @@ async def create_language(language: LanguageBase, db: Prisma = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/", response_model=List[LanguageBase])
-async def get_languages(db: Prisma = Depends(get_db)):
-    return await db.language.find_many()
+@router.get("/", response_model=Page[LanguageBase])
+async def get_languages(
+    page: PageParams = Depends(page_params),
+    db: Prisma = Depends(get_db)
+):
+    return await paginate(db.language, page, order=ID_ORDER)
 
 @router.delete("/{language_code}", response_model=LanguageBase)
 async def delete_language(language_code: str, db: Prisma = Depends(get_db)):
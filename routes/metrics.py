@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from Config.connection import prisma_connection
+from Config.s3 import s3_connection
+from lib.cache import response_cache
+from lib.metrics import Counter, Gauge, render
+
+router = APIRouter()
+
+# Read from the existing stats counters at scrape time
+DB_POOL_IN_USE = Gauge("db_pool_in_use", "Database pool slots held by requests.")
+DB_POOL_WAITING = Gauge("db_pool_waiting", "Requests waiting for a database pool slot.")
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Requests refused because the database pool stayed full.")
+CACHE_ENTRIES = Gauge("response_cache_entries", "Entries in the response cache.")
+CACHE_LOOKUPS = Counter("response_cache_lookups_total", "Response cache lookups.", ["result"])
+S3_UPLOADS_IN_PROGRESS = Gauge("s3_uploads_in_progress", "Uploads holding an S3 upload slot.")
+
+
+def collect() -> None:
+    pool = prisma_connection.stats()
+    DB_POOL_IN_USE.set(value=pool["in_use"])
+    DB_POOL_WAITING.set(value=pool["waiting"])
+    DB_POOL_TIMEOUTS.set(value=pool["timeouts_total"])
+    cache = response_cache.stats()
+    CACHE_ENTRIES.set(value=cache["entries"])
+    CACHE_LOOKUPS.set(("hit",), cache["hits"])
+    CACHE_LOOKUPS.set(("miss",), cache["misses"])
+    S3_UPLOADS_IN_PROGRESS.set(value=s3_connection.uploading)
+
+
+@router.get("", response_class=PlainTextResponse)
+async def metrics():
+    collect()
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
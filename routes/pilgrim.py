@@ -1,14 +1,29 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+import asyncio
 from prisma import Prisma
 from typing import Optional
 from Config.connection import get_db
 from typing import List
-from model.pilgrim import PilgrimSiteCreate,PilgrimSiteTranslationCreate,PilgrimSiteUpdate
+from model.pilgrim import PilgrimSiteCreate,PilgrimSiteTranslationCreate,PilgrimSiteUpdate,PilgrimSitePatch
+from model.pilgrim import NearbyPilgrimSite, PilgrimSiteDeleted, PilgrimSiteResponse, PilgrimSiteTranslation, PilgrimSiteTranslationDeleted
+from model.pagination import Page, PageParams
+from lib.pagination import page_params, paginate
+from lib.translation import language_preference, project_page, project_translations, translations_include
+from lib.cache import entity_tags, page_tags
+from lib.bulk import import_records, read_request_records
+from model.bulk import BulkReport
+from lib.export import export_response
+from lib.media import image_variants
+from lib.events import entities_imported, entity_deleted, entity_saved, translation_deleted, translation_saved
+from lib.conditional import conditional_get, entity_validators, fetch_entity_validators, fetch_list_validators, fetch_once
+from lib.sync import record_deletion
+from lib.translatable import add_translation, delete_translation, update_translatable
+from lib.geo import coordinates_data, nearest
 
 router = APIRouter(
 )
 
-@router.post("/")
+@router.post("/", response_model=PilgrimSiteResponse)
 async def create_pilgrim_site(pilgrim_site: PilgrimSiteCreate, db: Prisma = Depends(get_db)):
     try:
         translations_data = [
@@ -24,7 +39,9 @@ async def create_pilgrim_site(pilgrim_site: PilgrimSiteCreate, db: Prisma = Depe
         # Prepare the data dictionary
         site_data = {
             "image": pilgrim_site.image,
+            **await image_variants(db, pilgrim_site.image),
             "geo_location": pilgrim_site.geo_location,
+            **coordinates_data(pilgrim_site.geo_location),
             "translations": {"create": translations_data}
         }
 
@@ -38,196 +55,222 @@ async def create_pilgrim_site(pilgrim_site: PilgrimSiteCreate, db: Prisma = Depe
             include={"translations": True, "contact": True}
         )
 
+        entity_saved("pilgrim", created_site, lists=True)
         return created_site
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/{site_id}")
-async def get_pilgrim_site(site_id: str, db: Prisma = Depends(get_db)):
-    site = await db.pilgrimsite.find_first(
-        where={"id": site_id},
-        include={
-            "translations": True,
-            "contact": {
-                "include": {
-                    "translations": True
-                }
-            }
-        }
+@router.post("/bulk", response_model=BulkReport)
+async def bulk_import_pilgrim_sites(request: Request, db: Prisma = Depends(get_db)):
+    """Import many pilgrim site records from an NDJSON body (or a JSON array) of create payloads.
+
+    Invalid records are reported by their position in the input; the rest are imported.
+    """
+    report = await import_records(db, "pilgrim", read_request_records(request))
+    if report["imported"]:
+        entities_imported("pilgrim")
+    return report
+
+@router.get("/nearby", response_model=List[NearbyPilgrimSite])
+async def get_nearby_pilgrim_sites(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(25, gt=0, le=2000, description="Search radius in kilometres"),
+    k: int = Query(20, ge=1, le=100),
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    ranked = await nearest(db.pilgrimsite, lat, lon, radius, k)
+    if not ranked:
+        return []
+
+    sites = await db.pilgrimsite.find_many(
+        where={"id": {"in": [site_id for _, site_id in ranked]}},
+        include=pilgrim_site_include(languages)
+    )
+    by_id = {site.id: project_translations(site, languages) for site in sites}
+    return [
+        {"distance_km": round(distance, 3), "site": by_id[site_id]}
+        for distance, site_id in ranked
+        if site_id in by_id
+    ]
+
+@router.get("/export")
+async def export_pilgrim_sites(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    languages: List[str] = Depends(language_preference)
+):
+    return export_response("pilgrim", export_format, languages)
+
+@router.get("/{site_id}", response_model=PilgrimSiteResponse)
+async def get_pilgrim_site(
+    site_id: str,
+    request: Request,
+    response: Response,
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    async def load():
+        site = await db.pilgrimsite.find_first(
+            where={"id": site_id},
+            include=pilgrim_site_include(languages)
+        )
+        if not site:
+            raise HTTPException(status_code=404, detail="Pilgrim site not found")
+        validators = entity_validators("pilgrim", site, languages)
+        return project_translations(site, languages), validators
+
+    return await conditional_get(
+        request,
+        response,
+        ("pilgrim", site_id, tuple(languages)),
+        load,
+        lambda site: entity_tags("pilgrim", site),
+        lambda: fetch_entity_validators(db, "pilgrim", site_id, languages),
+        PilgrimSiteResponse
     )
-    if not site:
-        raise HTTPException(status_code=404, detail="Pilgrim site not found")
-    return site
 
-@router.put("/{site_id}")
+@router.put("/{site_id}", response_model=PilgrimSiteResponse)
 async def update_pilgrim_site(
     site_id: str, 
     site_update: PilgrimSiteUpdate, 
     db: Prisma = Depends(get_db)
 ):
     try:
-        # Check if the Pilgrim Site exists
-        existing_site = await db.pilgrimsite.find_first(where={"id": site_id})
-        if not existing_site:
-            raise HTTPException(status_code=404, detail="Pilgrim site not found")
-
-        # Update translations by deleting old ones and inserting new ones
-        if site_update.translations:
-            await db.pilgrimsitetranslation.delete_many(where={"pilgrimSiteId": site_id})
-        
-        translations_data = [
-            {
-                "languageCode": t.languageCode,
-                "name": t.name,
-                "description": t.description,
-                "description_audio": t.description_audio,
-            }
-            for t in site_update.translations
-        ] if site_update.translations else []
-
-        update_data = {
+        values = {
             "image": site_update.image,
             "geo_location": site_update.geo_location,
-            "translations": {
-                "createMany": {
-                    "data": translations_data
-                }
-            } if translations_data else {}
+            **coordinates_data(site_update.geo_location),
         }
-    
         if site_update.contactId:
-            update_data["contact"] = {"connect": {"id": site_update.contactId}}
+            values["contactId"] = site_update.contactId
 
-        # Perform the update
-        updated_site = await db.pilgrimsite.update(
-            where={"id": site_id},
-            data=update_data,
-            include={
-                "translations": True,
-                "contact": True
-            }
+        # The translations sent are the complete set; only the differences are written
+        translations = [t.model_dump() for t in site_update.translations] if site_update.translations else None
+        updated_site = await update_translatable(db, "pilgrim", site_id, values, translations, replace=True)
+
+        entity_saved("pilgrim", updated_site)
+        return updated_site
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.patch("/{site_id}", response_model=PilgrimSiteResponse)
+async def patch_pilgrim_site(
+    site_id: str,
+    site_patch: PilgrimSitePatch,
+    db: Prisma = Depends(get_db)
+):
+    try:
+        values = site_patch.model_dump(exclude={"translations"}, exclude_unset=True)
+        if "geo_location" in values:
+            values.update(coordinates_data(values["geo_location"]))
+        translations = (
+            [t.model_dump(exclude_unset=True) for t in site_patch.translations]
+            if site_patch.translations is not None else None
         )
+        updated_site = await update_translatable(db, "pilgrim", site_id, values, translations)
 
+        entity_saved("pilgrim", updated_site)
         return updated_site
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/")
-async def get_pilgrim_sites(db: Prisma = Depends(get_db)):
-    sites = await db.pilgrimsite.find_many(
-        include={
-            "translations": True,
-            "contact": {
-                "include": {
-                    "translations": True
-                }
+@router.get("/", response_model=Page[PilgrimSiteResponse])
+async def get_pilgrim_sites(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    key = ("pilgrim:list", page.limit, page.cursor, page.include_total, tuple(languages))
+
+    list_validators = fetch_once(lambda: fetch_list_validators(db, "pilgrim", {}, key))
+
+    async def load():
+        sites, validators = await asyncio.gather(
+            paginate(db.pilgrimsite, page, include=pilgrim_site_include(languages)),
+            list_validators()
+        )
+        return project_page(sites, languages), validators
+
+    return await conditional_get(
+        request,
+        response,
+        key,
+        load,
+        lambda sites: page_tags("pilgrim", sites),
+        list_validators,
+        Page[PilgrimSiteResponse]
+    )
+
+
+def pilgrim_site_include(languages: List[str]) -> dict:
+    translations = translations_include(languages)
+    return {
+        "translations": translations,
+        "contact": {
+            "include": {
+                "translations": translations
             }
         }
-    )
-    return sites 
+    }
 
-@router.delete("/{site_id}")
+@router.delete("/{site_id}", response_model=PilgrimSiteDeleted)
 async def delete_pilgrim_site(site_id: str, db: Prisma = Depends(get_db)):
     try:
         existing_site = await db.pilgrimsite.find_first(where={"id": site_id})
         if not existing_site:
             raise HTTPException(status_code=404, detail="Pilgrim site not found")
             
-        deleted_site = await db.pilgrimsite.delete(
-            where={"id": site_id},
-            include={
-                "translations": True
-            }
-        )
+        async with db.tx() as tx:
+            deleted_site = await tx.pilgrimsite.delete(
+                where={"id": site_id},
+                include={
+                    "translations": True
+                }
+            )
+            await record_deletion(tx, "pilgrim", site_id)
+        entity_deleted("pilgrim", site_id)
         return {"message": "Pilgrim site deleted successfully", "site": deleted_site}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
 
-@router.post("/{site_id}/translations")
+@router.post("/{site_id}/translations", response_model=PilgrimSiteTranslation)
 async def add_pilgrim_site_translation(
     site_id: str,
     translation: PilgrimSiteTranslationCreate,
     db: Prisma = Depends(get_db)
 ):
     try:
-        # Check if the pilgrim site exists
-        existing_site = await db.pilgrimsite.find_first(where={"id": site_id})
-        if not existing_site:
-            raise HTTPException(status_code=404, detail="Pilgrim site not found")
-            
-        # Check if translation for this language already exists
-        existing_translation = await db.pilgrimsitetranslation.find_first(
-            where={
-                "pilgrimSiteId": site_id,
-                "languageCode": translation.languageCode
-            }
-        )
-        if existing_translation:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Translation for language {translation.languageCode} already exists"
-            )
-
-        # Create new translation
-        new_translation = await db.pilgrimsitetranslation.create(
-            data={
-                "pilgrimSite": {"connect": {"id": site_id}},
-                "language": {"connect": {"code": translation.languageCode}},
-                "name": translation.name,
-                "description": translation.description,
-                "description_audio": translation.description_audio
-            }
-        )
+        new_translation = await add_translation(db, "pilgrim", site_id, translation.model_dump())
+        translation_saved("pilgrim", site_id, new_translation)
         return new_translation
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.delete("/{site_id}/translations/{language_code}")
+@router.delete("/{site_id}/translations/{language_code}", response_model=PilgrimSiteTranslationDeleted)
 async def delete_pilgrim_site_translation(
     site_id: str,
     language_code: str,
     db: Prisma = Depends(get_db)
 ):
     try:
-        # Check if the translation exists
-        existing_translation = await db.pilgrimsitetranslation.find_first(
-            where={
-                "pilgrimSiteId": site_id,
-                "languageCode": language_code
-            }
-        )
-        if not existing_translation:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Translation for language {language_code} not found"
-            )
-
-        # Get total translation count
-        translation_count = await db.pilgrimsitetranslation.count(
-            where={"pilgrimSiteId": site_id}
-        )
-        
-        # Prevent deletion if it's the last translation
-        if translation_count <= 1:
-            raise HTTPException(
-                status_code=400,
-                detail="Cannot delete the last translation. Pilgrim site must have at least one translation"
-            )
-
-        # Delete the translation
-        deleted_translation = await db.pilgrimsitetranslation.delete(
-            where={
-                "pilgrimSiteId_languageCode": {
-                    "pilgrimSiteId": site_id,
-                    "languageCode": language_code
-                }
-            }
-        )
+        deleted_translation = await delete_translation(db, "pilgrim", site_id, language_code)
+        translation_deleted("pilgrim", site_id, language_code)
         return {
             "message": f"Translation for language {language_code} deleted successfully",
             "translation": deleted_translation
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,22 +1,171 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
+from prisma import Prisma
+from Config.connection import get_db, prisma_connection
+from Config.s3 import s3_connection
 from lib.upload_file_to_s3 import upload_file_to_s3  # Assuming your existing file is named s3_upload.py
+from lib.stream_upload import check_declared_size, stream_to_s3
+from lib.form_upload import receive_form_file
+from lib.presigned_upload import complete_upload, presign_upload
+from lib.media import MEDIA_MAX_IMAGE_BYTES, create_variants, create_variants_from_s3, image_bytes, is_image, variant_urls
+from lib.dedup import dedup_report, find_existing, record_object
+from model.upload import CompleteUploadRequest, PresignRequest
 import uuid
+from typing import Optional
 
 router = APIRouter()
 
-@router.post("/")
-async def upload_file(file: UploadFile = File(...)):
+FORM_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        }}},
+    }
+}
+
+@router.post("/", openapi_extra=FORM_UPLOAD_BODY)
+async def upload_file(request: Request):
+    """Upload a file sent as the ``file`` field of a multipart form.
+
+    A database slot is held only around the lookups and writes, not while
+    the body arrives or goes to S3, so slow uploads cannot starve the pool.
+    """
+    # Hashed while it is spooled, so the same file uploaded again can reuse the stored object
+    upload = await receive_form_file(request)
     try:
         # Generate a unique filename
-        file_extension = file.filename.split(".")[-1]
+        file_extension = upload.filename.split(".")[-1]
         unique_filename = f"{uuid.uuid4()}.{file_extension}"
 
+        async with prisma_connection.acquire() as db:
+            existing = await find_existing(db, upload.sha256)
+            if existing is not None:
+                return JSONResponse(
+                    content={
+                        "message": "File uploaded successfully",
+                        "file_url": existing,
+                        "variants": await variant_urls(db, existing),
+                        "deduplicated": True,
+                    },
+                    status_code=200
+                )
+
         # Upload file to S3
-        file_url = await upload_file_to_s3(file.file, file.content_type, unique_filename)
+        await upload_file_to_s3(upload.file, upload.content_type, unique_filename)
+        image = None
+        if is_image(upload.content_type) and upload.size <= MEDIA_MAX_IMAGE_BYTES:
+            image = await upload.read()
 
-        return JSONResponse(content={"message": "File uploaded successfully", "file_url": file_url}, status_code=200)
+        async with prisma_connection.acquire() as db:
+            file_url = await record_object(db, upload.sha256, unique_filename, upload.content_type, upload.size)
+            if file_url != s3_connection.object_url(unique_filename):
+                variants = await variant_urls(db, file_url)
+            elif image is not None:
+                variants = await create_variants(db, unique_filename, upload.content_type, image)
+            else:
+                variants = {}
+
+        return JSONResponse(
+            content={"message": "File uploaded successfully", "file_url": file_url, "variants": variants, "deduplicated": False},
+            status_code=200
+        )
+    except HTTPException:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+    finally:
+        upload.close()
+
+async def find_existing_object(sha256: str) -> Optional[str]:
+    async with prisma_connection.acquire() as db:
+        return await find_existing(db, sha256)
+
+@router.post("/stream")
+async def upload_file_stream(
+    request: Request,
+    filename: str = Query(..., description="Original file name; only its extension is kept"),
+):
+    """Stream the raw request body (sent with the file's Content-Type) straight into S3.
+
+    Nothing is spooled to disk: the body is cut into multipart parts that
+    upload in parallel while the rest is still arriving. A database slot is
+    held only around the lookups and writes.
+    """
+    check_declared_size(request.headers.get("content-length"))
+    try:
+        file_extension = filename.split(".")[-1]
+        unique_filename = f"{uuid.uuid4()}.{file_extension}"
+        content_type = request.headers.get("content-type", "application/octet-stream")
+
+        kept = bytearray()
+        result = await stream_to_s3(
+            image_bytes(request.stream(), content_type, kept),
+            unique_filename,
+            content_type,
+            find_existing=find_existing_object,
+        )
+        async with prisma_connection.acquire() as db:
+            if not result["deduplicated"]:
+                result["file_url"] = await record_object(db, result["sha256"], unique_filename, content_type, result["size"])
+            if result["file_url"] == s3_connection.object_url(unique_filename) and kept:
+                variants = await create_variants(db, unique_filename, content_type, bytes(kept))
+            else:
+                variants = await variant_urls(db, result["file_url"])
+
+        return {"message": "File uploaded successfully", **result, "variants": variants}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+@router.post("/presign")
+async def presign_file_upload(request: PresignRequest, db: Prisma = Depends(get_db)):
+    """Presigned URL(s) to upload straight to S3; call /complete afterwards with the token.
+
+    When the file is already stored (same SHA-256), its URL is returned
+    with ``deduplicated`` set and there is nothing to upload.
+    """
+    try:
+        presigned = await presign_upload(
+            db, request.filename, request.content_type, request.size, request.sha256, request.multipart
+        )
+        if presigned["deduplicated"]:
+            presigned["variants"] = await variant_urls(db, presigned["file_url"])
+        return presigned
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+@router.post("/complete")
+async def complete_file_upload(request: CompleteUploadRequest, db: Prisma = Depends(get_db)):
+    try:
+        parts = [part.model_dump() for part in request.parts] if request.parts else None
+        upload = await complete_upload(db, request.token, parts)
+        if upload["repeated"] or upload["deduplicated"]:
+            variants = await variant_urls(db, upload["file_url"])
+        else:
+            variants = await create_variants_from_s3(db, upload["key"], upload["content_type"], upload["size"])
+        return {
+            "message": "File uploaded successfully",
+            "file_url": upload["file_url"],
+            "variants": variants,
+            "deduplicated": upload["deduplicated"],
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+@router.get("/dedup")
+async def upload_dedup_report(db: Prisma = Depends(get_db)):
+    """How many uploads were served from an already stored object, and the bytes that saved."""
+    try:
+        return await dedup_report(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from prisma import Prisma
+from typing import List, Optional
+from Config.connection import get_db
+from model.pagination import Page, PageParams
+from model.search import SearchIndexStats, SearchResult
+from lib.pagination import encode_cursor, decode_cursor, page_params
+from lib.search import SEARCHABLE, search_index
+from lib.translation import language_preference
+
+router = APIRouter()
+
+@router.get("/", response_model=Page[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[str] = Query(None, description="Comma separated: gonpa,festival,statue,pilgrim"),
+    languages: List[str] = Depends(language_preference),
+    page: PageParams = Depends(page_params),
+    db: Prisma = Depends(get_db)
+):
+    kinds = [kind.strip() for kind in types.split(",") if kind.strip()] if types else []
+    unknown = [kind for kind in kinds if kind not in SEARCHABLE]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(unknown)}")
+
+    offset = 0
+    if page.cursor:
+        try:
+            offset = int(decode_cursor(page.cursor))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    await search_index.ensure_built(db)
+    hits = search_index.search(q, languages=languages, types=kinds)
+
+    items = hits[offset:offset + page.limit]
+    next_offset = offset + page.limit
+    return {
+        "items": [hit._asdict() for hit in items],
+        "limit": page.limit,
+        "next_cursor": encode_cursor(str(next_offset)) if next_offset < len(hits) else None,
+        "total": len(hits) if page.include_total else None,
+    }
+
+@router.get("/stats", response_model=SearchIndexStats)
+async def search_stats():
+    return search_index.stats()
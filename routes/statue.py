@@ -1,6 +1,6 @@
 # app/models/statue.py
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List
 from datetime import datetime
 
 class StatueTranslationBase(BaseModel):
@@ -18,15 +18,29 @@ class StatueResponse(BaseModel):
     image: str
     createdAt: datetime
     updatedAt: datetime
+    imageVariants: Dict[str, str] = {}
     translations: List[StatueTranslationBase]
 
 # app/routes/statue.py
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+import asyncio
 from prisma import Prisma
 from typing import List, Optional
 from Config.connection import get_db
 
-from model.statue import StatueCreate, StatueResponse, StatueTranslationBase
+from model.statue import StatueCreate, StatueMessage, StatuePatch, StatueResponse, StatueTranslation, StatueTranslationBase
+from model.pagination import Page, PageParams
+from lib.pagination import page_params, paginate
+from lib.translation import language_preference, project_page, project_translations, translations_include
+from lib.cache import entity_tags, page_tags
+from lib.bulk import import_records, read_request_records
+from model.bulk import BulkReport
+from lib.export import export_response
+from lib.media import image_variants
+from lib.events import entities_imported, entity_deleted, entity_saved, translation_deleted, translation_saved
+from lib.conditional import conditional_get, entity_validators, fetch_entity_validators, fetch_list_validators, fetch_once
+from lib.sync import record_deletion
+from lib.translatable import add_translation, delete_translation, update_translatable
 
 router = APIRouter(
 )
@@ -47,6 +61,7 @@ async def create_statue(statue: StatueCreate, db: Prisma = Depends(get_db)):
         created_statue = await db.statue.create(
             data={
                 "image": statue.image,
+                **await image_variants(db, statue.image),
                 "translations": {
                     "create": translations_data
                 }
@@ -55,42 +70,94 @@ async def create_statue(statue: StatueCreate, db: Prisma = Depends(get_db)):
                 "translations": True
             }
         )
+        entity_saved("statue", created_statue, lists=True)
         return created_statue
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/bulk", response_model=BulkReport)
+async def bulk_import_statues(request: Request, db: Prisma = Depends(get_db)):
+    """Import many statue records from an NDJSON body (or a JSON array) of create payloads.
+
+    Invalid records are reported by their position in the input; the rest are imported.
+    """
+    report = await import_records(db, "statue", read_request_records(request))
+    if report["imported"]:
+        entities_imported("statue")
+    return report
+
+@router.get("/export")
+async def export_statues(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    languages: List[str] = Depends(language_preference)
+):
+    return export_response("statue", export_format, languages)
+
 @router.get("/{statue_id}", response_model=StatueResponse)
-async def get_statue(statue_id: str, db: Prisma = Depends(get_db)):
-    statue = await db.statue.find_unique(
-        where={"id": statue_id},
-        include={"translations": True}
+async def get_statue(
+    statue_id: str,
+    request: Request,
+    response: Response,
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    async def load():
+        statue = await db.statue.find_unique(
+            where={"id": statue_id},
+            include={"translations": translations_include(languages)}
+        )
+        if not statue:
+            raise HTTPException(status_code=404, detail="Statue not found")
+        validators = entity_validators("statue", statue, languages)
+        return project_translations(statue, languages), validators
+
+    return await conditional_get(
+        request,
+        response,
+        ("statue", statue_id, tuple(languages)),
+        load,
+        lambda statue: entity_tags("statue", statue),
+        lambda: fetch_entity_validators(db, "statue", statue_id, languages),
+        StatueResponse
     )
-    if not statue:
-        raise HTTPException(status_code=404, detail="Statue not found")
-    return statue
 
-@router.get("/", response_model=List[StatueResponse])
+@router.get("/", response_model=Page[StatueResponse])
 async def get_statues(
+    request: Request,
+    response: Response,
     language: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    languages: List[str] = Depends(language_preference),
     db: Prisma = Depends(get_db)
 ):
-    where = {}
-    include = {
-        "translations": True
-    }
-    
-    if language:
-        include["translations"] = {
-            "where": {
-                "languageCode": language
-            }
-        }
-
-    statues = await db.statue.find_many(
-        where=where,
-        include=include
+    # `language` is the older single-language filter, kept for existing clients
+    if language and not languages:
+        languages = [language]
+
+    key = ("statue:list", page.limit, page.cursor, page.include_total, tuple(languages))
+
+    list_validators = fetch_once(lambda: fetch_list_validators(db, "statue", {}, key))
+
+    async def load():
+        statues, validators = await asyncio.gather(
+            paginate(
+                db.statue,
+                page,
+                include={"translations": translations_include(languages)}
+            ),
+            list_validators()
+        )
+        return project_page(statues, languages), validators
+
+    return await conditional_get(
+        request,
+        response,
+        key,
+        load,
+        lambda statues: page_tags("statue", statues),
+        list_validators,
+        Page[StatueResponse]
     )
-    return statues
 
 @router.put("/{statue_id}", response_model=StatueResponse)
 async def update_statue(
@@ -99,109 +166,83 @@ async def update_statue(
     db: Prisma = Depends(get_db)
 ):
     try:
-        # First, delete existing translations
-        await db.statuetranslation.delete_many(
-            where={"statueId": statue_id}
+        # The translations sent are the complete set; only the differences are written
+        updated_statue = await update_translatable(
+            db,
+            "statue",
+            statue_id,
+            {"image": statue.image},
+            [t.model_dump() for t in statue.translations],
+            replace=True,
         )
-        
-        # Then update the statue with new data
-        updated_statue = await db.statue.update(
-            where={"id": statue_id},
-            data={
-                "image": statue.image,
-                "translations": {
-                    "create": [
-                        {
-                            "language": {"connect": {"code": t.languageCode}},
-                            "name": t.name,
-                            "description": t.description,
-                            "description_audio": t.description_audio
-                        }
-                        for t in statue.translations
-                    ]
-                }
-            },
-            include={
-                "translations": True
-            }
+        entity_saved("statue", updated_statue)
+        return updated_statue
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.patch("/{statue_id}", response_model=StatueResponse)
+async def patch_statue(
+    statue_id: str,
+    statue_patch: StatuePatch,
+    db: Prisma = Depends(get_db)
+):
+    try:
+        values = statue_patch.model_dump(exclude={"translations"}, exclude_unset=True)
+        translations = (
+            [t.model_dump(exclude_unset=True) for t in statue_patch.translations]
+            if statue_patch.translations is not None else None
         )
+        updated_statue = await update_translatable(db, "statue", statue_id, values, translations)
+        entity_saved("statue", updated_statue)
         return updated_statue
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.delete("/{statue_id}")
+@router.delete("/{statue_id}", response_model=StatueMessage)
 async def delete_statue(statue_id: str, db: Prisma = Depends(get_db)):
     try:
-        await db.statue.delete(
-            where={"id": statue_id}
-        )
+        async with db.tx() as tx:
+            deleted_statue = await tx.statue.delete(
+                where={"id": statue_id}
+            )
+            if deleted_statue:
+                await record_deletion(tx, "statue", statue_id)
+        entity_deleted("statue", statue_id)
         return {"message": "Statue deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.post("/{statue_id}/translations")
+@router.post("/{statue_id}/translations", response_model=StatueTranslation)
 async def add_statue_translation(
     statue_id: str,
     translation: StatueTranslationBase,
     db: Prisma = Depends(get_db)
 ):
     try:
-        # Check if the statue exists
-        existing_statue = await db.statue.find_first(where={"id": statue_id})
-        if not existing_statue:
-            raise HTTPException(status_code=404, detail="Statue not found")
-            
-        # Check if translation for this language already exists
-        existing_translation = await db.statuetranslation.find_first(
-            where={
-                "statueId": statue_id,
-                "languageCode": translation.languageCode
-            }
-        )
-        if existing_translation:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Translation for language {translation.languageCode} already exists"
-            )
-
-        # Create new translation
-        new_translation = await db.statuetranslation.create(
-            data={
-                "statue": {"connect": {"id": statue_id}},
-                "language": {"connect": {"code": translation.languageCode}},
-                "name": translation.name,
-                "description": translation.description,
-                "description_audio": translation.description_audio
-            }
-        )
+        new_translation = await add_translation(db, "statue", statue_id, translation.model_dump())
+        translation_saved("statue", statue_id, new_translation)
         return new_translation
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-
-@router.delete("/{statue_id}/translations/{language_code}")
+@router.delete("/{statue_id}/translations/{language_code}", response_model=StatueMessage)
 async def delete_statue_translation(
     statue_id: str,
     language_code: str,
     db: Prisma = Depends(get_db)
 ):
     try:
-        # Check if the translation exists
-        existing_translation = await db.statuetranslation.find_first(
-            where={
-                "statueId": statue_id,
-                "languageCode": language_code
-            }
-        )
-        if not existing_translation:
-            raise HTTPException(status_code=404, detail="Translation not found")
-
-        # Delete translation
-        await db.statuetranslation.delete(
-            where={"id": existing_translation.id}
-        )
-
+        await delete_translation(db, "statue", statue_id, language_code)
+        translation_deleted("statue", statue_id, language_code)
         return {"message": "Translation deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query
+from prisma import Prisma
+from typing import List, Optional
+from Config.connection import get_db
+from lib.sync import DEFAULT_SYNC_LIMIT, MAX_SYNC_LIMIT, changes_since
+from lib.translation import language_preference
+from model.sync import ChangesPage
+
+router = APIRouter()
+
+@router.get("/changes", response_model=ChangesPage)
+async def get_changes(
+    since: Optional[str] = Query(None, description="ISO timestamp or the `next` token of the previous response; omit for a full sync"),
+    limit: int = Query(DEFAULT_SYNC_LIMIT, ge=1, le=MAX_SYNC_LIMIT),
+    languages: List[str] = Depends(language_preference),
+    db: Prisma = Depends(get_db)
+):
+    """Everything created, updated or deleted since the last sync.
+
+    Keep calling with the returned `next` token while `has_more` is true,
+    then store it for the next sync.
+    """
+    return await changes_since(db, since, limit, languages)
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from typing import Optional
 from prisma import Prisma
 from model.enum import Role
 from Config.connection import get_db
+from model.pagination import Page, PageParams
+from lib.pagination import ID_ORDER, page_params, paginate
 
 router = APIRouter()
 
@@ -51,10 +53,12 @@ async def create_user(user: UserCreate, db: Prisma = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 # Get all users
-@router.get("/", response_model=List[UserResponse])
-async def get_users(db: Prisma = Depends(get_db)):
-    users = await db.user.find_many()
-    return users
+@router.get("/", response_model=Page[UserResponse])
+async def get_users(
+    page: PageParams = Depends(page_params),
+    db: Prisma = Depends(get_db)
+):
+    return await paginate(db.user, page, order=ID_ORDER)
 
 # Get a specific user by ID
 @router.get("/{user_email}", response_model=UserResponse)
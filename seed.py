@@ -1,5 +1,7 @@
 import asyncio
+import sys
 from Config.connection import db,prisma_connection
+from lib.bulk import IMPORTERS, import_records, read_ndjson_file
 
 
 
@@ -59,6 +61,17 @@ async def main():
         }
     )
 
+    # Optional datasets: python seed.py gonpa=gonpas.ndjson statue=statues.ndjson ...
+    for arg in sys.argv[1:]:
+        kind, _, path = arg.partition("=")
+        if kind not in IMPORTERS or not path:
+            print(f"Skipping {arg}: expected <{'|'.join(IMPORTERS)}>=<file.ndjson>")
+            continue
+        report = await import_records(db, kind, read_ndjson_file(path))
+        print(f"{kind}: imported {report['imported']} of {report['received']} ({report['failed']} failed)")
+        for error in report["errors"][:20]:
+            print(f"  record {error['index']}: {error['error']}")
+
     print("✅ Seeding completed!")
 
     await prisma_connection.disconnect()